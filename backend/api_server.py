@@ -1,18 +1,29 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 from sse_starlette.sse import EventSourceResponse
 
 from automation_manager import AutomationRun, automation_manager
+from blob_store import blob_store
+from device_inventory import device_inventory
+from live_stream import LIVE_STREAM_BOUNDARY, multipart_chunk
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry as metrics_registry
+from pdf_service import pdf_service
+from report_index import report_index
+from reports import recover_orphaned_journals
+from run_store import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, RunStoreError
 
 
 class RunCreateRequest(BaseModel):
@@ -32,6 +43,7 @@ class ScreenshotEntry(BaseModel):
     url: str
     timestamp: datetime
     step: Optional[str] = None
+    digest: Optional[str] = None
 
 
 class ReportEntry(BaseModel):
@@ -44,6 +56,76 @@ class ReportEntry(BaseModel):
     createdAt: Optional[datetime] = None
 
 
+class PdfRegenerateRequest(BaseModel):
+    reportIds: List[str] = Field(default_factory=list)
+    all: bool = False
+
+
+class PdfRegenerateResult(BaseModel):
+    id: str
+    pdfPath: Optional[str] = None
+    error: Optional[str] = None
+
+
+class PdfRegenerateResponse(BaseModel):
+    items: List[PdfRegenerateResult] = Field(default_factory=list)
+    seconds: float
+
+
+class ReportIndexSyncResponse(BaseModel):
+    scanned: int
+    indexed: int
+    unchanged: int
+    failed: int
+    removed: int
+    seconds: float
+
+
+class IndexedRun(BaseModel):
+    id: str
+    prompt: Optional[str] = None
+    status: Optional[str] = None
+    startTime: Optional[datetime] = None
+    durationMs: Optional[int] = None
+    totalSteps: int = 0
+    failedSteps: int = 0
+
+
+class PromptStats(BaseModel):
+    prompt: str
+    runs: int
+    failures: int
+
+
+class ActionStats(BaseModel):
+    action: str
+    steps: int
+    failures: int
+    avgMs: Optional[float] = None
+    maxMs: Optional[int] = None
+
+
+class LocatorStats(BaseModel):
+    strategy: str
+    value: str
+    failures: int
+
+
+class RunSummary(BaseModel):
+    id: str
+    prompt: str
+    status: str
+    createdAt: datetime
+    updatedAt: datetime
+    deviceType: Optional[str] = None
+    reportPath: Optional[str] = None
+
+
+class RunListResponse(BaseModel):
+    items: List[RunSummary] = Field(default_factory=list)
+    nextCursor: Optional[str] = None
+
+
 class RunResponse(BaseModel):
     id: str
     prompt: str
@@ -68,6 +150,18 @@ def _serialize_run(run: AutomationRun) -> Dict[str, Any]:
     return payload
 
 
+def _serialize_summary(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "prompt": row["prompt"],
+        "status": row["status"],
+        "createdAt": row["created_at"],
+        "updatedAt": row["updated_at"],
+        "deviceType": row.get("device_type"),
+        "reportPath": row.get("report_path"),
+    }
+
+
 app = FastAPI(
     title="Automation Control API",
     version="0.1.0",
@@ -92,9 +186,24 @@ def healthcheck() -> Dict[str, str]:
     return {"status": "ok"}
 
 
-@app.get("/api/runs", response_model=List[RunResponse])
-def list_runs() -> List[Dict[str, Any]]:
-    return [_serialize_run(run) for run in automation_manager.list_runs()]
+@app.get("/metrics")
+def get_metrics() -> Response:
+    """Prometheus text exposition of the in-process metric registry."""
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/api/runs", response_model=RunListResponse)
+def list_runs(
+    status: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """List run summaries, newest first. Logs/screenshots are on /api/runs/{id}."""
+    try:
+        rows, next_cursor = automation_manager.list_runs(status=status, limit=limit, cursor=cursor)
+    except RunStoreError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"items": [_serialize_summary(row) for row in rows], "nextCursor": next_cursor}
 
 
 @app.get("/api/runs/{run_id}", response_model=RunResponse)
@@ -119,6 +228,18 @@ async def cancel_run(run_id: str) -> Dict[str, str]:
         raise HTTPException(status_code=500, detail=f"Failed to cancel run: {str(e)}")
 
 
+@app.delete("/api/runs/{run_id}")
+def delete_run(run_id: str) -> Dict[str, str]:
+    """Delete a finished run; its screenshots are freed by the next blob gc."""
+    try:
+        deleted = automation_manager.delete_run(run_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
+    return {"status": "deleted", "message": f"Run {run_id} has been deleted"}
+
+
 @app.post("/api/runs", response_model=RunResponse, status_code=201)
 async def create_run(payload: RunCreateRequest) -> Dict[str, Any]:
     run = await automation_manager.create_run(payload.prompt)
@@ -153,6 +274,10 @@ def list_run_logs(run_id: str) -> List[Dict[str, Any]]:
 
 @app.get("/api/runs/{run_id}/report", response_model=Optional[ReportEntry])
 def get_run_report(run_id: str) -> Optional[Dict[str, Any]]:
+    indexed = report_index.for_run(run_id)
+    if indexed is not None:
+        indexed.pop("runId", None)
+        return indexed
     if not automation_manager.has_run(run_id):
         raise HTTPException(status_code=404, detail="Run not found")
     run = automation_manager.get_run(run_id)
@@ -166,158 +291,219 @@ def get_run_report(run_id: str) -> Optional[Dict[str, Any]]:
     return reports[-1] if reports else None
 
 
+@app.post("/api/reports/reindex", response_model=ReportIndexSyncResponse)
+async def reindex_reports() -> Dict[str, Any]:
+    """Ingest new or changed JSON reports into the query index."""
+    started = asyncio.get_running_loop().time()
+    counts = await asyncio.to_thread(report_index.sync, _reports_path)
+    return {**counts, "seconds": round(asyncio.get_running_loop().time() - started, 3)}
+
+
+@app.get("/api/reports/runs", response_model=List[IndexedRun])
+def search_indexed_runs(
+    status: Optional[str] = Query(None),
+    prompt: Optional[str] = Query(None, description="Substring of the prompt"),
+    since: Optional[str] = Query(None, description="ISO date or timestamp"),
+    until: Optional[str] = Query(None, description="ISO date or timestamp"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+) -> List[Dict[str, Any]]:
+    return report_index.search(status=status, prompt=prompt, since=since, until=until, limit=limit)
+
+
+@app.get("/api/reports/stats/prompts", response_model=List[PromptStats])
+def get_prompt_stats(
+    since: Optional[str] = Query(None, description="ISO date"),
+    until: Optional[str] = Query(None, description="ISO date"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+) -> List[Dict[str, Any]]:
+    """Prompts with the most failed runs in the window."""
+    return report_index.prompt_stats(since=since, until=until, limit=limit)
+
+
+@app.get("/api/reports/stats/actions", response_model=List[ActionStats])
+def get_action_stats(
+    since: Optional[str] = Query(None, description="ISO date"),
+    until: Optional[str] = Query(None, description="ISO date"),
+) -> List[Dict[str, Any]]:
+    """Step counts, failures and latency per tool action."""
+    return report_index.action_stats(since=since, until=until)
+
+
+@app.get("/api/reports/stats/locators", response_model=List[LocatorStats])
+def get_locator_stats(
+    since: Optional[str] = Query(None, description="ISO date"),
+    until: Optional[str] = Query(None, description="ISO date"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+) -> List[Dict[str, Any]]:
+    """Locators that failed most often."""
+    return report_index.locator_stats(since=since, until=until, limit=limit)
+
+
+@app.get("/api/reports/{report_id}", response_model=ReportEntry)
+def get_report(report_id: str) -> Dict[str, Any]:
+    entry = report_index.get(report_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    entry.pop("runId", None)
+    return entry
+
+
+def _report_json_path(report_id: str) -> Optional[Path]:
+    """JSON report for a client-supplied id, or None if it would leave the reports directory.
+
+    Indexed reports use their recorded path; otherwise the id must be a plain
+    file name stem (no separators or "..").
+    """
+    entry = report_index.get(report_id)
+    if entry and entry.get("path"):
+        source = Path(entry["path"])
+    elif report_id and Path(report_id).name == report_id and not report_id.startswith("."):
+        source = _reports_path / f"{report_id}.json"
+    else:
+        return None
+    reports_root = _reports_path.resolve()
+    source = source.resolve()
+    if not source.is_relative_to(reports_root):
+        return None
+    return source
+
+
+@app.post("/api/reports/pdf", response_model=PdfRegenerateResponse)
+async def regenerate_report_pdfs(payload: PdfRegenerateRequest) -> Dict[str, Any]:
+    """Render (or reuse cached) PDFs for stored JSON reports in parallel."""
+    report_ids = [entry["id"] for entry in report_index.all()] if payload.all else payload.reportIds
+    if not report_ids:
+        raise HTTPException(status_code=400, detail="Provide reportIds or set all")
+
+    items: List[Dict[str, Any]] = []
+    sources: List[Path] = []
+    for report_id in report_ids:
+        source = _report_json_path(report_id)
+        if source is None:
+            items.append({"id": report_id, "error": "Invalid report id"})
+            continue
+        if not source.is_file():
+            items.append({"id": report_id, "error": "Report JSON not found"})
+            continue
+        items.append({"id": report_id})
+        sources.append(source)
+
+    started = asyncio.get_running_loop().time()
+    rendered = iter(await pdf_service.regenerate(sources))
+    for item in items:
+        if item.get("error"):
+            continue
+        pdf_path = next(rendered)
+        if pdf_path is None:
+            item["error"] = "PDF generation failed"
+        else:
+            item["pdfPath"] = str(pdf_path)
+    return {"items": items, "seconds": round(asyncio.get_running_loop().time() - started, 3)}
+
+
+@app.get("/api/runs/{run_id}/report.pdf")
+async def get_run_report_pdf(run_id: str) -> FileResponse:
+    """PDF of the run's report, rendered on first request and cached by content."""
+    indexed = report_index.for_run(run_id)
+    report_path = indexed.get("path") if indexed else None
+    if not report_path:
+        if not automation_manager.has_run(run_id):
+            raise HTTPException(status_code=404, detail="Run not found")
+        report_path = automation_manager.get_run(run_id).report_path
+    if not report_path or not Path(report_path).is_file():
+        raise HTTPException(status_code=404, detail="Report not available")
+
+    pdf_path = await pdf_service.cached_pdf(Path(report_path))
+    if pdf_path is None:
+        raise HTTPException(status_code=500, detail="PDF generation failed")
+    return FileResponse(
+        str(pdf_path),
+        media_type="application/pdf",
+        filename=f"{Path(report_path).stem}.pdf",
+        content_disposition_type="inline",
+    )
+
+
+@app.get("/api/runs/{run_id}/live")
+async def run_live_stream(run_id: str) -> StreamingResponse:
+    """Multipart stream of changed device frames while the run is active."""
+    stream = automation_manager.get_live_stream(run_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail="No live stream for this run")
+
+    async def frame_generator():
+        async for frame in stream.frames():
+            yield multipart_chunk(frame)
+
+    return StreamingResponse(
+        frame_generator(),
+        media_type=f"multipart/x-mixed-replace; boundary={LIVE_STREAM_BOUNDARY}",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+@app.get("/api/runs/{run_id}/live/latest")
+def run_live_latest(run_id: str) -> Response:
+    stream = automation_manager.get_live_stream(run_id)
+    if stream is None or stream.latest is None:
+        raise HTTPException(status_code=404, detail="No live frame available")
+    return Response(content=stream.latest, media_type="image/png", headers={"Cache-Control": "no-store"})
+
+
+@app.get("/api/blobs/stats")
+def get_blob_stats() -> Dict[str, Any]:
+    """Screenshot store usage: stored vs. logical bytes and dedup ratio."""
+    return blob_store.stats()
+
+
+@app.post("/api/blobs/gc")
+async def collect_blobs() -> Dict[str, Any]:
+    """Delete screenshot blobs no run or report references any more."""
+    result = await asyncio.to_thread(blob_store.gc)
+    return {**result, "stats": blob_store.stats()}
+
+
+@app.get("/api/device/inventory")
+async def get_device_inventory() -> Dict[str, Any]:
+    """Cached device inventory with hit-rate and probe counters."""
+    devices = await device_inventory.devices()
+    return {"devices": devices, "stats": device_inventory.stats()}
+
+
+@app.on_event("startup")
+async def _sync_report_index() -> None:
+    # In the background so a large reports/ backlog does not delay startup
+    started_at = time.time()
+
+    async def _sync() -> None:
+        try:
+            # Journals of runs killed before they finalized (e.g. with the previous server)
+            await asyncio.to_thread(recover_orphaned_journals, _reports_path, modified_before=started_at)
+            counts = await asyncio.to_thread(report_index.sync, _reports_path)
+            print(f"[INFO] Report index synced: {counts}")
+        except Exception as exc:
+            print(f"[WARN] Report index sync failed: {exc}")
+
+    asyncio.create_task(_sync())
+
+
+@app.on_event("shutdown")
+async def _shutdown_services() -> None:
+    await device_inventory.stop()
+    pdf_service.shutdown()
+
+
 @app.get("/api/device/info")
-def get_device_info() -> Dict[str, Any]:
+async def get_device_info() -> Dict[str, Any]:
     """Get connected device information."""
     try:
         import requests
-        import subprocess
-        
+
         MCP_SERVER_URL = os.getenv('MCP_SERVER_URL', 'http://127.0.0.1:8080')
-        
-        # Try to detect iOS devices first (macOS only)
-        ios_devices = []
-        try:
-            idevice_result = subprocess.run(
-                ["idevice_id", "-l"],
-                capture_output=True,
-                text=True,
-                timeout=2
-            )
-            if idevice_result.returncode == 0 and idevice_result.stdout.strip():
-                device_ids = idevice_result.stdout.strip().split('\n')
-                for device_id in device_ids:
-                    if device_id.strip():
-                        device_id = device_id.strip()
-                        device_name = None
-                        is_tablet = False
-                        try:
-                            name_result = subprocess.run(
-                                ["ideviceinfo", "-u", device_id, "-k", "DeviceName"],
-                                capture_output=True,
-                                text=True,
-                                timeout=2
-                            )
-                            if name_result.returncode == 0:
-                                device_name = name_result.stdout.strip()
-                            
-                            # Check if iPad
-                            model_result = subprocess.run(
-                                ["ideviceinfo", "-u", device_id, "-k", "ProductType"],
-                                capture_output=True,
-                                text=True,
-                                timeout=2
-                            )
-                            if model_result.returncode == 0:
-                                product_type = model_result.stdout.strip()
-                                is_tablet = "iPad" in product_type or "ipad" in product_type.lower()
-                        except:
-                            pass
-                        
-                        ios_devices.append({
-                            "id": device_id,
-                            "name": device_name or device_id,
-                            "isTablet": is_tablet
-                        })
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            # idevice_id not available
-            pass
-        except Exception:
-            pass
-        
-        # Try to get Android devices via ADB
-        android_devices = []
-        try:
-            result = subprocess.run(
-                ["adb", "devices"],
-                capture_output=True,
-                text=True,
-                timeout=3
-            )
-            if result.returncode == 0:
-                lines = result.stdout.strip().split('\n')[1:]  # Skip header
-                devices = []
-                for line in lines:
-                    if line.strip() and '\tdevice' in line:
-                        device_id = line.split('\t')[0].strip()
-                        if device_id:
-                            # Get device model/name
-                            device_name = None
-                            try:
-                                name_result = subprocess.run(
-                                    ["adb", "-s", device_id, "shell", "getprop", "ro.product.model"],
-                                    capture_output=True,
-                                    text=True,
-                                    timeout=2
-                                )
-                                if name_result.returncode == 0:
-                                    device_name = name_result.stdout.strip()
-                            except:
-                                pass
-                            
-                            # Get device brand
-                            device_brand = None
-                            try:
-                                brand_result = subprocess.run(
-                                    ["adb", "-s", device_id, "shell", "getprop", "ro.product.brand"],
-                                    capture_output=True,
-                                    text=True,
-                                    timeout=2
-                                )
-                                if brand_result.returncode == 0:
-                                    device_brand = brand_result.stdout.strip()
-                            except:
-                                pass
-                            
-                            # Get screen size to determine form factor
-                            screen_size = None
-                            is_tablet = False
-                            try:
-                                # Get screen density and size
-                                density_result = subprocess.run(
-                                    ["adb", "-s", device_id, "shell", "wm", "size"],
-                                    capture_output=True,
-                                    text=True,
-                                    timeout=2
-                                )
-                                if density_result.returncode == 0:
-                                    size_output = density_result.stdout.strip()
-                                    # Parse screen size (e.g., "Physical size: 1080x2340")
-                                    if "Physical size:" in size_output:
-                                        size_part = size_output.split("Physical size:")[-1].strip()
-                                        if "x" in size_part:
-                                            try:
-                                                # Extract dimensions (e.g., "1080x2340" or "1080 x 2340")
-                                                dims = size_part.split("x")
-                                                if len(dims) == 2:
-                                                    width = int(dims[0].strip())
-                                                    height = int(dims[1].strip().split()[0] if " " in dims[1] else dims[1].strip())
-                                                    short_side = min(width, height)
-                                                    long_side = max(width, height)
-                                                    aspect_ratio = (long_side / short_side) if short_side else 0
-                                                    # Consider device a tablet if the short side is large (>= 1200)
-                                                    # or the aspect ratio indicates a more square/tablet display (<= 1.6)
-                                                    if short_side >= 1200 or aspect_ratio <= 1.6:
-                                                        is_tablet = True
-                                            except (ValueError, IndexError):
-                                                pass
-                            except:
-                                pass
-                            
-                            full_name = f"{device_brand} {device_name}".strip() if device_brand and device_name else (device_name or device_id)
-                            android_devices.append({
-                                "id": device_id,
-                                "name": full_name,
-                                "model": device_name,
-                                "brand": device_brand,
-                                "isTablet": is_tablet
-                            })
-        except Exception as adb_error:
-            pass
-        
-        # Combine iOS and Android devices
-        all_devices = ios_devices + android_devices
-        
+
+        # iOS devices are listed first, then Android devices via ADB
+        all_devices = await device_inventory.devices()
+
         if all_devices:
             return {
                 "connected": True,
@@ -329,7 +515,7 @@ def get_device_info() -> Dict[str, Any]:
         
         # Fallback: check MCP server
         try:
-            response = requests.get(f"{MCP_SERVER_URL}/health", timeout=2)
+            response = await asyncio.to_thread(requests.get, f"{MCP_SERVER_URL}/health", timeout=2)
             if response.status_code == 200:
                 return {
                     "connected": False,
@@ -180,8 +180,7 @@ async function runNamedTool(helper: AppiumHelper, tool: string, args: any): Prom
             if (searchText && typeof searchText === 'string' && searchText.length > 0) {
               console.log(`⚠️  Element not found, trying OCR coordinate tapping for: ${searchText}`);
               
-              // Take screenshot and find text coordinates
-              const screenshotPath = await (h as any).takeScreenshot(`ocr_click_${Date.now()}.png`);
+              // findTextOnScreen captures the screen itself (in memory)
               const coordinates = await (h as any).findTextOnScreen(searchText);
               
               if (coordinates) {
@@ -518,6 +517,12 @@ async function runNamedTool(helper: AppiumHelper, tool: string, args: any): Prom
       const activityName = await h.getCurrentActivity();
       return { success: true, package: packageName, activity: activityName, message: `Current app: ${packageName}/${activityName}` };
     }
+    case 'session-heartbeat': {
+      // Cheap command proxied through the instrumentation server (UiAutomator2/WDA),
+      // so a dead instrumentation process surfaces as an error here
+      await h.getOrientation();
+      return { success: true };
+    }
     case 'get-current-package': {
       const pkg = await h.getCurrentPackage();
       return { success: true, result: pkg, data: pkg };
@@ -1099,6 +1104,48 @@ app.post('/tools/verify-with-diff', async (req, res) => {
   }
 });
 
+// Capture screenshot as raw PNG (no file under screenshots/, no JSON/base64 wrapping)
+app.get('/tools/screenshot', async (req, res) => {
+  try {
+    const sessionId = typeof req.query.sessionId === 'string' ? req.query.sessionId : undefined;
+    const helper = sessionId ? activeSessions.get(sessionId) : getDefaultSession();
+    if (!helper) {
+      return res.status(400).json({ success: false, error: 'No active Appium session' });
+    }
+    const image: Buffer = await (helper as any).captureScreenshot();
+    res.set('Content-Type', 'image/png');
+    res.set('Cache-Control', 'no-store');
+    res.send(image);
+  } catch (error) {
+    res.status(500).json({
+      success: false,
+      error: error instanceof Error ? error.message : 'Unknown error'
+    });
+  }
+});
+
+// Extract text (OCR) from one frame: the PNG in the request body (as fetched
+// from /tools/screenshot), or a fresh capture
+app.post('/tools/extract-text', express.raw({ type: 'image/*', limit: '25mb' }), async (req, res) => {
+  try {
+    const sessionId = typeof req.query.sessionId === 'string' ? req.query.sessionId : undefined;
+    const helper = sessionId ? activeSessions.get(sessionId) : getDefaultSession();
+    if (!helper) {
+      return res.status(400).json({ success: false, error: 'No active Appium session' });
+    }
+    const image: Buffer = Buffer.isBuffer(req.body) && req.body.length > 0
+      ? req.body
+      : await (helper as any).captureScreenshot();
+    const result = await (helper as any).extractTextFromScreenshot(image);
+    res.json({ success: true, ...result });
+  } catch (error) {
+    res.status(500).json({
+      success: false,
+      error: error instanceof Error ? error.message : 'Unknown error'
+    });
+  }
+});
+
 // Generic tool dispatcher leveraging AppiumHelper-backed implementations
 app.post('/tools/run', async (req, res) => {
   try {
@@ -1157,9 +1204,12 @@ function getDefaultSession(): AppiumHelper | null {
   if (activeSessions.size === 0) {
     return null;
   }
-  // Return the first (most recent) session
-  const session = activeSessions.values().next().value;
-  return session || null;
+  // Return the most recently initialized session (a recovered session replaces a crashed one)
+  let session: AppiumHelper | null = null;
+  for (const helper of activeSessions.values()) {
+    session = helper;
+  }
+  return session;
 }
 
 // Note: All simple endpoints (like /click, /send_keys, /get_page_source, etc.) have been removed
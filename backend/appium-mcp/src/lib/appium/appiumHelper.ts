@@ -1395,6 +1395,29 @@ export class AppiumHelper {
   /**
    * W3C Screenshots and Visual Testing
    */
+  /**
+   * Capture the screen as PNG bytes without writing a file
+   */
+  async captureScreenshot(): Promise<Buffer> {
+    if (!this.driver) {
+      throw new AppiumError(
+        "Appium driver not initialized. Call initializeDriver first."
+      );
+    }
+
+    try {
+      const screenshot = await this.driver.takeScreenshot();
+      return Buffer.from(screenshot, "base64");
+    } catch (error) {
+      throw new AppiumError(
+        `Failed to take screenshot: ${
+          error instanceof Error ? error.message : String(error)
+        }`,
+        error instanceof Error ? error : undefined
+      );
+    }
+  }
+
   async takeScreenshot(name: string = "screenshot", silent: boolean = false): Promise<string> {
     if (!this.driver) {
       throw new AppiumError(
@@ -1409,8 +1432,7 @@ export class AppiumHelper {
       const filename = `${name}_${timestamp}.png`;
       const filepath = path.join(this.screenshotDir, filename);
 
-      const screenshot = await this.driver.takeScreenshot();
-      await fs.writeFile(filepath, Buffer.from(screenshot, "base64"));
+      await fs.writeFile(filepath, await this.captureScreenshot());
 
       // Only log if not silent (silent for OCR/internal screenshots)
       if (!silent) {
@@ -3012,12 +3034,12 @@ export class AppiumHelper {
     }
 
     try {
-      // Take screenshot for OCR analysis (silent - don't log)
-      const screenshotPath = await this.takeScreenshot(`ocr_search_${Date.now()}.png`, true);
+      // OCR works on the in-memory capture; nothing is written to disk
+      const screenshot = await this.captureScreenshot();
       
       // Use Claude Vision OCR to find text coordinates
       const ocr = await this.getTitanOCR();
-      const coordinates = await ocr.findTextCoordinates(screenshotPath, searchText);
+      const coordinates = await ocr.findTextCoordinates(screenshot, searchText);
       
       if (coordinates) {
         return { x: coordinates.x, y: coordinates.y };
@@ -3108,7 +3130,7 @@ export class AppiumHelper {
   /**
    * Extract text from screenshot using Claude Sonnet Vision OCR
    */
-  async extractTextFromScreenshot(screenshotPath: string): Promise<{ text: string[]; boundingBoxes: any[]; confidence: number }> {
+  async extractTextFromScreenshot(screenshotPath: string | Buffer): Promise<{ text: string[]; boundingBoxes: any[]; confidence: number }> {
     try {
       const ocr = await this.getTitanOCR();
       return await ocr.extractTextFromScreenshot(screenshotPath);
@@ -3170,9 +3192,9 @@ export class AppiumHelper {
       let ocrConfidence = 0.0;
       
       try {
-        // Take screenshot for OCR analysis (silent - don't log)
-        const screenshotPath = await this.takeScreenshot(`perception_${Date.now()}.png`, true);
-        const ocrResult = await this.extractTextFromScreenshot(screenshotPath);
+        // OCR the in-memory capture (no perception_*.png round-trip)
+        const screenshot = await this.captureScreenshot();
+        const ocrResult = await this.extractTextFromScreenshot(screenshot);
         ocrTexts = ocrResult.text || [];
         ocrConfidence = ocrResult.confidence || 0.0;
         
@@ -14,6 +14,9 @@ export interface OCRCacheEntry {
   screenshotHash: string;
 }
 
+/** A screenshot on disk, or the image bytes themselves (no disk round-trip). */
+export type ScreenshotSource = string | Buffer;
+
 export interface OCRCacheConfig {
   maxSize: number;
   ttl: number; // Time to live in milliseconds
@@ -49,7 +52,10 @@ export class OCRCache {
   /**
    * Calculate file hash for cache key
    */
-  private async getFileHash(filePath: string): Promise<string> {
+  private async getFileHash(filePath: ScreenshotSource): Promise<string> {
+    if (Buffer.isBuffer(filePath)) {
+      return crypto.createHash('md5').update(filePath).digest('hex');
+    }
     try {
       const stats = await fs.stat(filePath);
       const content = await fs.readFile(filePath);
@@ -67,7 +73,7 @@ export class OCRCache {
   /**
    * Get cached OCR result
    */
-  async get(screenshotPath: string, searchText?: string): Promise<OCRCacheEntry | null> {
+  async get(screenshotPath: ScreenshotSource, searchText?: string): Promise<OCRCacheEntry | null> {
     const fileHash = await this.getFileHash(screenshotPath);
     const cacheKey = this.generateCacheKey(fileHash, searchText);
 
@@ -95,7 +101,7 @@ export class OCRCache {
    * Store OCR result in cache
    */
   async set(
-    screenshotPath: string,
+    screenshotPath: ScreenshotSource,
     text: string[],
     boundingBoxes: Array<{ text: string; x: number; y: number; width: number; height: number; confidence: number }>,
     searchText?: string
@@ -5,7 +5,7 @@
 
 import { BedrockRuntimeClient, InvokeModelCommand } from '@aws-sdk/client-bedrock-runtime';
 import * as fs from 'fs/promises';
-import { OCRCache, OCRCacheEntry } from './ocrCache.js';
+import { OCRCache, OCRCacheEntry, ScreenshotSource } from './ocrCache.js';
 
 export interface TextBoundingBox {
   text: string;
@@ -62,7 +62,7 @@ export class TitanOCR {
    * Extract all text from screenshot with bounding boxes
    * Uses Claude Sonnet with vision capabilities to read text from images
    */
-  async extractTextFromScreenshot(screenshotPath: string): Promise<OCRResult> {
+  async extractTextFromScreenshot(screenshotPath: ScreenshotSource): Promise<OCRResult> {
     // Check cache first
     const cached = await this.cache.get(screenshotPath);
     if (cached) {
@@ -74,14 +74,12 @@ export class TitanOCR {
     }
 
     try {
-      // Read image file
-      const imageBuffer = await fs.readFile(screenshotPath);
+      // Use the in-memory capture when given one; read the file otherwise
+      const imageBuffer = Buffer.isBuffer(screenshotPath) ? screenshotPath : await fs.readFile(screenshotPath);
       const imageBase64 = imageBuffer.toString('base64');
       
-      // Detect image format from file extension or buffer
-      const imageFormat = screenshotPath.toLowerCase().endsWith('.png') ? 'image/png' : 
-                         screenshotPath.toLowerCase().endsWith('.jpg') || screenshotPath.toLowerCase().endsWith('.jpeg') ? 'image/jpeg' :
-                         'image/png'; // default to PNG
+      // Detect image format from the JPEG signature (PNG otherwise)
+      const imageFormat = imageBuffer[0] === 0xff && imageBuffer[1] === 0xd8 ? 'image/jpeg' : 'image/png';
 
       // Claude Sonnet vision API format
       const prompt = `Extract ALL visible text from this mobile app screenshot. 
@@ -204,7 +202,7 @@ Return ONLY the JSON array, no other text.`;
   /**
    * Find coordinates of specific text in screenshot
    */
-  async findTextCoordinates(screenshotPath: string, searchText: string): Promise<TextCoordinates | null> {
+  async findTextCoordinates(screenshotPath: ScreenshotSource, searchText: string): Promise<TextCoordinates | null> {
     // Check cache with search text
     const cached = await this.cache.get(screenshotPath, searchText);
     if (cached) {
@@ -9,11 +9,66 @@ import os
 import re
 import time
 import xml.etree.ElementTree as ET
+from typing import Optional
+
+from device_inventory import platform_capabilities
+from locator_memory import locator_memory
+from locator_preflight import locator_snapshot, missing_element_error
+from metrics import MCP_TOOL_LATENCY
+from ocr_reader import ocr_reader
+from session_health import is_session_crashed_error, session_monitor
+from timing import step_timer, timed_sleep
 
 # Load URL from environment, with a default
 # Use 127.0.0.1 instead of localhost for better Windows compatibility
 MCP_SERVER_URL = os.getenv('MCP_SERVER_URL', 'http://127.0.0.1:8080')
 
+# Requests sent to the MCP server by this process (for locator memory savings)
+_mcp_round_trips = 0
+# ...of which were spent finding out which screen a failed click was on
+_memory_overhead = 0
+# App versions by package, looked up once per process
+_app_versions: dict[str, str] = {}
+# Screen each (strategy, value) last failed to click on, for learn_click_locator()
+_failed_click_screens: dict[tuple[str, str], tuple[str, str, str]] = {}
+_FAILED_CLICK_SCREENS_MAX = 64
+
+
+def _tool_name(url: str, payload) -> str:
+    if isinstance(payload, dict) and payload.get("tool"):
+        return payload["tool"]
+    return url.rsplit("/", 1)[-1]
+
+
+def _post(url: str, phase: str = "mcp_http", **kwargs) -> requests.Response:
+    """requests.post() to the MCP server, timed as phase and per tool."""
+    global _mcp_round_trips
+    _mcp_round_trips += 1
+    started = time.perf_counter()
+    try:
+        with session_monitor.in_flight(), step_timer.span(phase):
+            response = requests.post(url, **kwargs)
+        return response
+    finally:
+        tool = _tool_name(url, kwargs.get("json"))
+        MCP_TOOL_LATENCY.labels(tool).observe(time.perf_counter() - started)
+        locator_snapshot.note_tool(tool)
+
+
+def _get(url: str, phase: str = "mcp_http", **kwargs) -> requests.Response:
+    """requests.get() to the MCP server, timed as phase and per tool."""
+    global _mcp_round_trips
+    _mcp_round_trips += 1
+    started = time.perf_counter()
+    try:
+        with session_monitor.in_flight(), step_timer.span(phase):
+            response = requests.get(url, **kwargs)
+        return response
+    finally:
+        tool = _tool_name(url, None)
+        MCP_TOOL_LATENCY.labels(tool).observe(time.perf_counter() - started)
+        locator_snapshot.note_tool(tool)
+
 
 def initialize_appium_session(capabilities: dict = None):
     """Initialize an Appium session. If capabilities are not provided, uses defaults."""
@@ -31,7 +86,7 @@ def initialize_appium_session(capabilities: dict = None):
         if capabilities:
             payload.update(capabilities)
         
-        response = requests.post(f"{MCP_SERVER_URL}/tools/initialize-appium", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/initialize-appium", json=payload)
         response.raise_for_status()
         result = response.json()
         if result.get('success'):
@@ -45,67 +100,69 @@ def initialize_appium_session(capabilities: dict = None):
         return None
 
 
-def _is_session_crashed_error(error_msg: str) -> bool:
-    """Check if error indicates session crash."""
-    if not error_msg:
-        return False
-    error_lower = error_msg.lower()
-    crash_indicators = [
-        'instrumentation process is not running',
-        'cannot be proxied to uiautomator2',
-        'probably crashed',
-        'session.*crashed',
-        'instrumentation.*crashed'
-    ]
-    return any(indicator in error_lower for indicator in crash_indicators)
+def _session_heartbeat() -> Optional[str]:
+    """Cheap round-trip through the instrumentation server; None if it answered.
 
-
-def _try_recover_session() -> bool:
-    """Attempt to recover crashed session by reinitializing."""
+    Sent from the monitor thread, so it bypasses _post() (not step time).
+    """
     try:
-        print("\n--- [RECOVERY] Detected session crash. Attempting to recover...")
-        # Detect device type
-        device_type = "Android"
-        automation_name = "UiAutomator2"
-        
+        response = requests.post(
+            f"{MCP_SERVER_URL}/tools/run", json={"tool": "session-heartbeat", "args": {}}, timeout=5
+        )
+        result = response.json()
+    except (requests.RequestException, ValueError) as e:
+        return f"Heartbeat failed: {e}"
+    if isinstance(result, dict) and result.get('success'):
+        return None
+    return str(result.get('error') if isinstance(result, dict) else result)
+
+
+def _reinitialize_session() -> Optional[str]:
+    """Create a replacement session and drop the crashed one; returns the new id."""
+    print("\n--- [RECOVERY] Detected session crash. Attempting to recover...")
+    # Device type comes from the inventory snapshot (no re-probe)
+    device_type, automation_name = platform_capabilities()
+    print(f"--- [INFO] {device_type} device detected for recovery")
+
+    default_capabilities = {
+        "platformName": device_type,
+        "appium:automationName": automation_name,
+        "appium:noReset": True,
+    }
+
+    crashed_session_id = session_monitor.session_id
+    session_id = initialize_appium_session(default_capabilities)
+    if not session_id:
+        print("--- [ERROR] Failed to recover session")
+        return None
+    print(f"--- [OK] Session recovered: {session_id}")
+    if crashed_session_id:
         try:
-            import subprocess
-            adb_result = subprocess.run(
-                ["adb", "devices"],
-                capture_output=True,
-                text=True,
-                timeout=2
-            )
-            if adb_result.returncode == 0 and "device" in adb_result.stdout:
-                device_type = "Android"
-                automation_name = "UiAutomator2"
-                print("--- [INFO] Android device detected for recovery")
-        except:
+            _post(f"{MCP_SERVER_URL}/tools/close-appium-session", json={"sessionId": crashed_session_id}, timeout=5)
+        except requests.RequestException:
             pass
-        
-        default_capabilities = {
-            "platformName": device_type,
-            "appium:automationName": automation_name,
-            "appium:noReset": True,
-        }
-        
-        session_id = initialize_appium_session(default_capabilities)
-        if session_id:
-            print(f"--- [OK] Session recovered: {session_id}")
-            return True
-        else:
-            print("--- [ERROR] Failed to recover session")
-            return False
+    return session_id
+
+
+def _try_recover_session() -> bool:
+    """Wait for a working session after a crash (recovering now if the monitor has not)."""
+    try:
+        return session_monitor.recover()
     except Exception as e:
         print(f"--- [ERROR] Session recovery failed: {e}")
         return False
 
 
+def start_session_monitor(session_id: Optional[str] = None) -> None:
+    """Start heartbeats and background recovery for the current session."""
+    session_monitor.start(session_id, _session_heartbeat, _reinitialize_session)
+
+
 def get_page_source():
     """Gets the XML page source from the appium-mcp server."""
     try:
         payload = {"tool": "get_page_source", "args": {}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", phase="page_source", json=payload)
         
         # Parse response
         try:
@@ -120,16 +177,15 @@ def get_page_source():
         if result.get('success') is False:
             error_msg = result.get('error', 'Unknown error')
             # Check if this is a session crash
-            if _is_session_crashed_error(error_msg):
+            if is_session_crashed_error(error_msg):
                 print(f"❌ Error: Session crashed - {error_msg}")
                 # Try to recover session
                 if _try_recover_session():
                     # Retry once after recovery
-                    time.sleep(1)
-                    retry_response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload, timeout=10)
+                    retry_response = _post(f"{MCP_SERVER_URL}/tools/run", phase="page_source", json=payload, timeout=10)
                     retry_result = retry_response.json() if retry_response.headers.get('content-type', '').startswith('application/json') else {}
                     if retry_result.get('success'):
-                        return retry_result.get('value') or retry_result.get('xml', '')
+                        return _snapshot_page_source(retry_result)
                     else:
                         return {"success": False, "error": retry_result.get('error', 'Session recovery failed')}
                 else:
@@ -140,36 +196,41 @@ def get_page_source():
         # Handle HTTP error status codes
         if response.status_code == 400:
             error_msg = result.get('error', 'Unknown error')
-            if _is_session_crashed_error(error_msg):
+            if is_session_crashed_error(error_msg):
                 if _try_recover_session():
-                    time.sleep(1)
-                    retry_response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload, timeout=10)
+                    retry_response = _post(f"{MCP_SERVER_URL}/tools/run", phase="page_source", json=payload, timeout=10)
                     retry_result = retry_response.json() if retry_response.headers.get('content-type', '').startswith('application/json') else {}
                     if retry_result.get('success'):
-                        return retry_result.get('value') or retry_result.get('xml', '')
+                        return _snapshot_page_source(retry_result)
             print(f"❌ Error: Failed to get page source: {error_msg}")
             return {"success": False, "error": error_msg}
         if response.status_code == 500:
             error_msg = result.get('error', f'500 Server Error: {response.text[:200]}')
-            if _is_session_crashed_error(error_msg):
+            if is_session_crashed_error(error_msg):
                 if _try_recover_session():
-                    time.sleep(1)
-                    retry_response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload, timeout=10)
+                    retry_response = _post(f"{MCP_SERVER_URL}/tools/run", phase="page_source", json=payload, timeout=10)
                     retry_result = retry_response.json() if retry_response.headers.get('content-type', '').startswith('application/json') else {}
                     if retry_result.get('success'):
-                        return retry_result.get('value') or retry_result.get('xml', '')
+                        return _snapshot_page_source(retry_result)
             print(f"❌ Error: Failed to get page source: {error_msg}")
             return {"success": False, "error": error_msg}
         
         response.raise_for_status() 
         # Success case - return XML string
-        return result.get('value') or result.get('xml', '')
+        return _snapshot_page_source(result)
     except requests.RequestException as e:
         error_msg = str(e)
         print(f"❌ Error: Failed to get page source: {error_msg}")
         return {"success": False, "error": error_msg}
 
 
+def _snapshot_page_source(result: dict) -> str:
+    """XML of a successful get_page_source response, kept for locator preflight."""
+    xml = result.get('value') or result.get('xml', '')
+    locator_snapshot.update(xml)
+    return xml
+
+
 def _normalize_for_match(value: str) -> str:
     """Normalize text for fuzzy matching: remove whitespace and lowercase."""
     if not value:
@@ -254,12 +315,147 @@ def _extract_target_from_xpath(xpath: str) -> tuple[str, str] | None:
     return None
 
 
+def _app_version(package: str) -> str:
+    """versionName of an installed Android package ("" if unknown)."""
+    if package in _app_versions:
+        return _app_versions[package]
+    version = ""
+    if re.fullmatch(r"[\w.]+", package or "") and platform_capabilities()[0] == "Android":
+        try:
+            payload = {"tool": "run-adb-shell", "args": {"command": f"dumpsys package {package} | grep -m1 versionName"}}
+            response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+            if response.ok:
+                match = re.search(r"versionName=(\S+)", str(response.json().get('result', '')))
+                if match:
+                    version = match.group(1)
+        except (requests.RequestException, ValueError):
+            pass
+    _app_versions[package] = version
+    return version
+
+
+def screen_context() -> tuple[str, str, str] | None:
+    """(package, activity, app version) of the foreground app, or None."""
+    try:
+        payload = {"tool": "get_current_package_activity", "args": {}}
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response.raise_for_status()
+        result = response.json()
+    except (requests.RequestException, ValueError):
+        return None
+    if not isinstance(result, dict) or not result.get('package'):
+        return None
+    package = str(result['package'])
+    return package, str(result.get('activity') or ''), _app_version(package)
+
+
+def _click_once(strategy: str, value: str) -> dict:
+    """Single click request; failures come back as {"success": False, "error": ...}."""
+    try:
+        payload = {"tool": "click", "args": {"strategy": strategy, "value": value}}
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        if response.status_code == 400:
+            return {"success": False, "error": response.json().get('error', 'Unknown error')}
+        response.raise_for_status()
+        result = response.json()
+    except (requests.RequestException, ValueError) as e:
+        return {"success": False, "error": str(e)}
+    return result if isinstance(result, dict) else {"success": False, "error": str(result)}
+
+
+def _preflight(strategy: str, value: str) -> tuple[str, str, str | None]:
+    """Check a locator against the last page source before sending it.
+
+    Returns:
+        (strategy, value) to send, which may be rewritten to the element's
+        resource-id, and an error if the element is not on screen (no
+        request should be made)
+    """
+    resolution = locator_snapshot.resolve(strategy, value)
+    if resolution.status == "missing":
+        step_timer.count("round_trips_saved")
+        return strategy, value, missing_element_error(strategy, value, resolution)
+    if resolution.rewritten:
+        print(f"--- 🎯 Preflight: Using strategy={resolution.strategy}, value={resolution.value} (same element)")
+    return resolution.strategy, resolution.value, None
+
+
+def _click_learned_locator(strategy: str, value: str) -> tuple[dict | None, tuple[str, str, str] | None]:
+    """Try the locator that worked last time for this request on this screen.
+
+    Returns:
+        (click result or None if there was nothing to try or it failed,
+        screen context if it was fetched)
+    """
+    if not locator_memory.knows(strategy, value):
+        return None, None
+    started = _mcp_round_trips
+    context = screen_context()
+    if context is None:
+        return None, None
+    key = (context[0], context[1], strategy, value)
+    learned = locator_memory.lookup(key, context[2])
+    if learned is None:
+        return None, context
+
+    print(f"--- 🧠 Memory: Trying learned locator strategy={learned['strategy']}, value={learned['value']}")
+    result = _click_once(learned['strategy'], learned['value'])
+    if result.get('success'):
+        saved = locator_memory.record_hit(key, _mcp_round_trips - started)
+        step_timer.count("locator_memory_hits")
+        step_timer.count("round_trips_saved", saved)
+        print(f"--- ✅ RESULT: {result} (learned locator, {saved} round-trips saved)")
+        return result, context
+    print(f"--- ⚠️ Learned locator failed, forgetting it: {result.get('error')}")
+    locator_memory.forget(key)
+    return None, context
+
+
+def round_trip_mark() -> tuple[int, int]:
+    """Snapshot of the round-trip counters, for learn_click_locator()."""
+    return _mcp_round_trips, _memory_overhead
+
+
+def learn_click_locator(strategy: str, value: str, learned: dict, since: tuple[int, int]) -> None:
+    """Remember that learned worked after click(strategy, value) failed.
+
+    Used when a retry outside click() (e.g. an alternate selector) succeeds.
+
+    Args:
+        strategy: Requested locator strategy that failed
+        value: Requested locator value that failed
+        learned: {"strategy", "value"} that succeeded
+        since: round_trip_mark() taken before the first failed attempt
+    """
+    failed_screen = _failed_click_screens.pop((strategy, value), None)
+    if failed_screen is None or (learned.get("strategy"), learned.get("value")) == (strategy, value):
+        return
+    cost = (_mcp_round_trips - since[0]) - (_memory_overhead - since[1])
+    locator_memory.remember(
+        (failed_screen[0], failed_screen[1], strategy, value),
+        {"strategy": learned["strategy"], "value": learned["value"]},
+        cost=cost,
+        app_version=failed_screen[2],
+    )
+
+
 def click(strategy: str, value: str):
     """Tells the appium-mcp server to click an element."""
+    global _memory_overhead
     print(f"--- 💪 ACT: Clicking element (strategy={strategy}, value={value})")
     try:
-        payload = {"tool": "click", "args": {"strategy": strategy, "value": value}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        learned_result, click_screen = _click_learned_locator(strategy, value)
+        if learned_result is not None:
+            return learned_result
+
+        sent_strategy, sent_value, preflight_error = _preflight(strategy, value)
+        if preflight_error:
+            print(f"--- ❌ RESULT: {{'success': False, 'error': '{preflight_error}'}}")
+            return f"Error: {preflight_error}"
+
+        started = _mcp_round_trips
+        payload = {"tool": "click", "args": {"strategy": sent_strategy, "value": sent_value}}
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"--- ❌ RESULT: {{'success': False, 'error': '{error_msg}'}}")
@@ -276,9 +472,21 @@ def click(strategy: str, value: str):
         if success:
             return result
 
+        # Screen the request failed on, so a working fallback can be learned
+        learning_overhead = 0
+        if locator_memory.enabled and click_screen is None:
+            before_context = _mcp_round_trips
+            click_screen = screen_context()
+            learning_overhead = _mcp_round_trips - before_context
+            _memory_overhead += learning_overhead
+        if click_screen is not None:
+            if len(_failed_click_screens) >= _FAILED_CLICK_SCREENS_MAX:
+                _failed_click_screens.pop(next(iter(_failed_click_screens)))
+            _failed_click_screens[(strategy, value)] = click_screen
+
         # Attempt intelligent fallbacks when the primary locator fails
         fallback_candidates: list[dict[str, str]] = []
-        seen_locators: set[tuple[str, str]] = {(strategy, value)}
+        seen_locators: set[tuple[str, str]] = {(strategy, value), (sent_strategy, sent_value)}
         attempted_fallbacks: list[tuple[str, str]] = []
         target_text: str | None = None
 
@@ -351,7 +559,7 @@ def click(strategy: str, value: str):
             if isinstance(wait_res, dict) and wait_res.get('success'):
                 try:
                     fallback_payload = {"tool": "click", "args": {"strategy": key[0], "value": key[1]}}
-                    fallback_response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=fallback_payload)
+                    fallback_response = _post(f"{MCP_SERVER_URL}/tools/run", json=fallback_payload)
                     if fallback_response.status_code == 400:
                         error_msg = fallback_response.json().get('error', 'Unknown error')
                         print(f"--- ❌ RESULT: {{'success': False, 'error': '{error_msg}'}}")
@@ -363,6 +571,13 @@ def click(strategy: str, value: str):
                     print_prefix_fb = "✅" if fallback_success else "⚠️"
                     print(f"--- {print_prefix_fb} RESULT: {fallback_result}")
                     if fallback_success:
+                        if click_screen is not None:
+                            locator_memory.remember(
+                                (click_screen[0], click_screen[1], strategy, value),
+                                {"strategy": key[0], "value": key[1]},
+                                cost=_mcp_round_trips - started - learning_overhead,
+                                app_version=click_screen[2],
+                            )
                         return fallback_result
                     aggregated_errors.append(str(fallback_result))
                 except requests.RequestException as inner_error:
@@ -475,9 +690,13 @@ def send_keys(strategy: str, value: str, text: str):
     
     original_value = value  # Keep original for retry
     print(f"--- ⌨️  ACT: Sending keys '{text}' to element (strategy={strategy}, value={value})")
+    strategy, value, preflight_error = _preflight(strategy, value)
+    if preflight_error:
+        print(f"--- ❌ RESULT: {{'success': False, 'error': '{preflight_error}'}}")
+        return f"Error: {preflight_error}"
     try:
         payload = {"tool": "send_keys", "args": {"strategy": strategy, "value": value, "text": text}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"--- ❌ RESULT: {{'success': False, 'error': '{error_msg}'}}")
@@ -488,7 +707,7 @@ def send_keys(strategy: str, value: str, text: str):
                     strategy, value = edittext_info
                     print(f"🔄 Retrying with auto-detected EditText: {value}")
                     payload = {"tool": "send_keys", "args": {"strategy": strategy, "value": value, "text": text}}
-                    response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+                    response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
                     if response.status_code == 200:
                         result = response.json()
                         print(f"--- ✅ RESULT: {result}")
@@ -508,7 +727,7 @@ def wait_for_element(strategy: str, value: str, timeoutMs: int = 5000):
     print(f"--- ⏳ ACT: Waiting for element (strategy={strategy}, value={value}, timeout={timeoutMs}ms)")
     try:
         payload = {"tool": "wait_for_element", "args": {"strategy": strategy, "value": value, "timeoutMs": timeoutMs}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"--- ❌ RESULT: {{'success': False, 'error': '{error_msg}'}}")
@@ -603,6 +822,20 @@ def wait_for_text_ocr(value: str, timeoutSeconds: int = 5, sessionId: str = None
         # STEP 2: XML failed - AUTOMATICALLY try OCR fallback (works for custom UIs)
         print(f"   Step 2: XML not found, automatically trying OCR fallback...")
         
+        # Frames are OCR'd once per distinct screenshot; an unchanged screen is a cache hit
+        found = ocr_reader.wait_for_texts([value], timeoutSeconds, session_id=sessionId)
+        if found is not None:
+            match = found.get(value)
+            if match:
+                print("   ✅ Found via OCR (XML fallback worked)")
+                result = {"success": True, "method": "ocr", "text": value}
+                if "center" in match:
+                    result["coordinates"] = match["center"]
+                return result
+            print(f"   ❌ OCR also failed: '{value}' not on screen")
+            return {"success": False, "error": f"Text '{value}' not found via XML or OCR", "method": "none"}
+        
+        # Screen could not be read locally (older MCP server): let the server wait on OCR
         payload = {
             "locator": {"by": "text", "value": value},
             "fallback_locators": [],
@@ -610,7 +843,7 @@ def wait_for_text_ocr(value: str, timeoutSeconds: int = 5, sessionId: str = None
             "sessionId": sessionId,
             "useOcr": True
         }
-        response = requests.post(f"{MCP_SERVER_URL}/tools/wait-for-element", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/wait-for-element", json=payload)
         
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
@@ -621,7 +854,7 @@ def wait_for_text_ocr(value: str, timeoutSeconds: int = 5, sessionId: str = None
         result = response.json()
         
         if result.get('success'):
-            print(f"   ✅ Found via OCR (XML fallback worked)")
+            print("   ✅ Found via OCR (XML fallback worked)")
         else:
             print(f"   ❌ OCR failed: {result.get('error', 'Unknown error')}")
         
@@ -707,7 +940,9 @@ def assert_activity(expectedActivity: str, timeoutSeconds: int = 10):
         last = activity
         if expectedActivity and expectedActivity in activity:
             return {"success": True, "activity": activity}
-        time.sleep(0.5)
+        timed_sleep(0.5)
+        # The screen may have moved on while polling
+        locator_snapshot.invalidate()
     return {"success": False, "activity": last, "error": f"Activity did not match '{expectedActivity}' in {timeoutSeconds}s"}
 
 def scroll(direction: str, distance: float = 0.5):
@@ -715,7 +950,7 @@ def scroll(direction: str, distance: float = 0.5):
     print(f"📜 Scroll: {direction}")
     try:
         payload = {"tool": "scroll", "args": {"direction": direction, "distance": distance}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -732,7 +967,7 @@ def swipe(startX: int, startY: int, endX: int, endY: int, duration: int = 800):
     print(f"--- 👆 ACT: Swiping from ({startX}, {startY}) to ({endX}, {endY})")
     try:
         payload = {"tool": "swipe", "args": {"startX": startX, "startY": startY, "endX": endX, "endY": endY, "duration": duration}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -747,9 +982,13 @@ def swipe(startX: int, startY: int, endX: int, endY: int, duration: int = 800):
 def long_press(strategy: str, value: str, duration: int = 1000):
     """Long presses on a UI element."""
     print(f"--- 👆 ACT: Long pressing element (strategy={strategy}, value={value}, duration={duration}ms)")
+    strategy, value, preflight_error = _preflight(strategy, value)
+    if preflight_error:
+        print(f"❌ Error: {preflight_error}")
+        return f"Error: {preflight_error}"
     try:
         payload = {"tool": "long_press", "args": {"strategy": strategy, "value": value, "duration": duration}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -767,7 +1006,7 @@ def take_screenshot(filename: str = None):
     try:
         args = {"filename": filename} if filename else {}
         payload = {"tool": "take_screenshot", "args": args}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", phase="screenshot", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -779,12 +1018,62 @@ def take_screenshot(filename: str = None):
         return f"Error: {e}"
 
 
+def capture_screenshot(timeout: float = 15.0, sessionId: str = None) -> Optional[bytes]:
+    """Returns the current screen as PNG bytes, without the MCP server writing a file.
+
+    Returns:
+        PNG bytes, or None if the capture failed (or the server predates
+        /tools/screenshot)
+    """
+    params = {"sessionId": sessionId} if sessionId else None
+    try:
+        response = _get(f"{MCP_SERVER_URL}/tools/screenshot", phase="screenshot", params=params, timeout=timeout)
+    except requests.RequestException as e:
+        print(f"Error capturing screenshot: {e}")
+        return None
+    if response.status_code != 200 or not response.content.startswith(b"\x89PNG"):
+        return None
+    return response.content
+
+
+def extract_screen_text(image: bytes, sessionId: str = None, timeout: float = 60.0) -> Optional[dict]:
+    """OCR a captured frame on the MCP server.
+
+    Returns:
+        {"text", "boundingBoxes", "confidence"}, or None if the call failed
+        (or the server predates /tools/extract-text)
+    """
+    params = {"sessionId": sessionId} if sessionId else None
+    try:
+        response = _post(
+            f"{MCP_SERVER_URL}/tools/extract-text", phase="ocr", params=params, data=image,
+            headers={"Content-Type": "image/png"}, timeout=timeout,
+        )
+    except requests.RequestException as e:
+        print(f"Error extracting screen text: {e}")
+        return None
+    if response.status_code != 200:
+        return None
+    result = response.json()
+    return result if result.get("success") else None
+
+
+ocr_reader.configure(
+    capture=lambda session_id: capture_screenshot(sessionId=session_id),
+    extract=lambda image, session_id: extract_screen_text(image, sessionId=session_id),
+)
+
+
 def get_element_text(strategy: str, value: str):
     """Gets the text content from a UI element."""
     print(f"--- 📖 ACT: Getting text from element (strategy={strategy}, value={value})")
+    strategy, value, preflight_error = _preflight(strategy, value)
+    if preflight_error:
+        print(f"❌ Error: {preflight_error}")
+        return f"Error: {preflight_error}"
     try:
         payload = {"tool": "get_element_text", "args": {"strategy": strategy, "value": value}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -800,9 +1089,13 @@ def get_element_text(strategy: str, value: str):
 def clear_element(strategy: str, value: str):
     """Clears the text content from an editable element."""
     print(f"--- 🧹 ACT: Clearing element (strategy={strategy}, value={value})")
+    strategy, value, preflight_error = _preflight(strategy, value)
+    if preflight_error:
+        print(f"❌ Error: {preflight_error}")
+        return f"Error: {preflight_error}"
     try:
         payload = {"tool": "clear_element", "args": {"strategy": strategy, "value": value}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -819,7 +1112,7 @@ def press_home_button():
     print("--- 🏠 ACT: Pressing home button")
     try:
         payload = {"tool": "press_home_button", "args": {}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -836,7 +1129,7 @@ def press_back_button():
     print("--- ⬅️  ACT: Pressing back button")
     try:
         payload = {"tool": "press_back_button", "args": {}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -853,7 +1146,7 @@ def get_current_package_activity():
     print("--- 📱 ACT: Getting current package and activity...")
     try:
         payload = {"tool": "get_current_package_activity", "args": {}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -875,7 +1168,7 @@ def launch_app(packageName: str = None, activityName: str = None):
             if activityName:
                 args["activityName"] = activityName
         payload = {"tool": "launch_app", "args": args}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -892,7 +1185,7 @@ def close_app():
     print("--- ❌ ACT: Closing app...")
     try:
         payload = {"tool": "close_app", "args": {}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -909,7 +1202,7 @@ def reset_app():
     print("--- 🔄 ACT: Resetting app...")
     try:
         payload = {"tool": "reset_app", "args": {}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -926,7 +1219,7 @@ def scroll_to_element(strategy: str, value: str, maxScrolls: int = 10):
     print(f"--- 📜 ACT: Scrolling to element (strategy={strategy}, value={value})")
     try:
         payload = {"tool": "scroll_to_element", "args": {"strategy": strategy, "value": value, "maxScrolls": maxScrolls}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -943,7 +1236,7 @@ def get_orientation():
     print("--- 📱 ACT: Getting device orientation...")
     try:
         payload = {"tool": "get_orientation", "args": {}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -961,7 +1254,7 @@ def set_orientation(orientation: str):
     print(f"--- 🔄 ACT: Setting orientation to {orientation}...")
     try:
         payload = {"tool": "set_orientation", "args": {"orientation": orientation}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -978,7 +1271,7 @@ def hide_keyboard():
     print("--- ⌨️  ACT: Hiding keyboard...")
     try:
         payload = {"tool": "hide_keyboard", "args": {}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -996,7 +1289,7 @@ def lock_device(duration: int = None):
     try:
         args = {"duration": duration} if duration else {}
         payload = {"tool": "lock_device", "args": args}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -1013,7 +1306,7 @@ def unlock_device():
     print("--- 🔓 ACT: Unlocking device...")
     try:
         payload = {"tool": "unlock_device", "args": {}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -1030,7 +1323,7 @@ def get_battery_info():
     print("--- 🔋 ACT: Getting battery info...")
     try:
         payload = {"tool": "get_battery_info", "args": {}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -1048,7 +1341,7 @@ def get_contexts():
     print("--- 🌐 ACT: Getting contexts...")
     try:
         payload = {"tool": "get-contexts", "args": {}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -1065,7 +1358,7 @@ def switch_context(context: str):
     print(f"--- 🔀 ACT: Switching to context: {context}...")
     try:
         payload = {"tool": "switch-context", "args": {"context": context}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -1082,7 +1375,7 @@ def open_notifications():
     print("--- 🔔 ACT: Opening notifications...")
     try:
         payload = {"tool": "open-notifications", "args": {}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -1099,7 +1392,7 @@ def is_app_installed(bundleId: str):
     print(f"--- 📦 ACT: Checking if app is installed: {bundleId}...")
     try:
         payload = {"tool": "is_app_installed", "args": {"bundleId": bundleId}}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/run", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/run", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"❌ Error: {error_msg}")
@@ -1158,7 +1451,7 @@ def get_perception_summary(sessionId: str = None, useOcr: bool = False):
     print("--- 🧠 ACT: Getting perception summary (XML first, OCR auto-fallback if needed)...")
     try:
         payload = {"sessionId": sessionId, "useOcr": useOcr} if sessionId else {"useOcr": useOcr}
-        response = requests.post(f"{MCP_SERVER_URL}/tools/get-perception-summary", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/get-perception-summary", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"--- ❌ RESULT: {{'success': False, 'error': '{error_msg}'}}")
@@ -1187,7 +1480,7 @@ def verify_action_with_diff(expectedKeywords: list, beforeScreenshot: str, after
         }
         if sessionId:
             payload["sessionId"] = sessionId
-        response = requests.post(f"{MCP_SERVER_URL}/tools/verify-with-diff", json=payload)
+        response = _post(f"{MCP_SERVER_URL}/tools/verify-with-diff", json=payload)
         if response.status_code == 400:
             error_msg = response.json().get('error', 'Unknown error')
             print(f"--- ❌ RESULT: {{'success': False, 'error': '{error_msg}'}}")
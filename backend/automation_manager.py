@@ -3,31 +3,39 @@ from __future__ import annotations
 import asyncio
 import contextlib
 import os
-import shutil
 import time
 import uuid
 from collections import defaultdict
 from dataclasses import dataclass, field, asdict
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, AsyncIterator, DefaultDict, Dict, List, Literal, Optional
+from typing import Any, AsyncIterator, DefaultDict, Dict, List, Literal, Optional, Tuple
 
 import appium_tools
 from automation_runner import (
+    AUTOMATION_PUBLIC_BASE_URL,
     AutomationRunner,
     AutomationRunnerError,
-    REPORTS_DIR,
-    REPORTS_PUBLIC_URL,
 )
+from blob_store import blob_store
+from device_inventory import DEVICE_SNAPSHOT_ENV, device_inventory
+from device_probe import primary_device_info
+from live_stream import LiveScreenStream, read_screenshot_file
+from metrics import RUN_DURATION, RUN_QUEUE_WAIT, RUNS, RUNS_ACTIVE, SSE_QUEUE_LAG, SSE_SUBSCRIBERS
+from report_index import report_index
+from run_store import DEFAULT_PAGE_SIZE, RunStore
 
 RunStatus = Literal["pending", "running", "completed", "failed", "cancelled"]
 DeviceType = Literal["android", "ios"]
 APP_MCP_DIR = (Path(__file__).resolve().parent / "appium-mcp").resolve()
-# Fast polling for device screen viewer (real-time updates)
+# Device-side capture interval for the live screen stream (real-time updates)
 # Separate from screenshot gallery - this is just for live screen viewing
 DEVICE_SCREEN_POLL_INTERVAL = float(os.getenv("AUTOMATION_DEVICE_SCREEN_INTERVAL", "0.5"))
 # Screenshot gallery polling (disabled - screenshots only after meaningful steps)
 SCREENSHOT_POLL_INTERVAL = float(os.getenv("AUTOMATION_SCREENSHOT_INTERVAL", "0"))
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+# Finished runs older than this many days are deleted at startup (0 keeps them all)
+RUN_RETENTION_DAYS = float(os.getenv("AUTOMATION_RUN_RETENTION_DAYS", "0"))
 
 
 def _utc_now() -> datetime:
@@ -57,19 +65,68 @@ class AutomationRun:
         payload["updated_at"] = self.updated_at.isoformat() + "Z"
         return payload
 
+    def to_summary(self) -> Dict[str, Any]:
+        """Indexed columns for the run store (fixed-width, sortable timestamps)."""
+        return {
+            "id": self.id,
+            "prompt": self.prompt,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(timespec="microseconds"),
+            "updated_at": self.updated_at.isoformat(timespec="microseconds"),
+            "device_type": self.device_type,
+            "report_path": self.report_path,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "AutomationRun":
+        def _parse(value: Any) -> datetime:
+            try:
+                return datetime.fromisoformat(str(value).rstrip("Z"))
+            except ValueError:
+                return _utc_now()
+
+        return cls(
+            id=payload["id"],
+            prompt=payload.get("prompt", ""),
+            status=payload.get("status", "failed"),
+            created_at=_parse(payload.get("created_at")),
+            updated_at=_parse(payload.get("updated_at")),
+            device_type=payload.get("device_type"),
+            report_path=payload.get("report_path"),
+            logs=list(payload.get("logs") or []),
+            screenshots=list(payload.get("screenshots") or []),
+            events=list(payload.get("events") or []),
+        )
+
 
 class AutomationManager:
-    """Coordinates automation runs and streams events to subscribers."""
+    """Coordinates automation runs and streams events to subscribers.
+
+    Active runs live in memory; every status change is written through to the
+    run store and finished runs are evicted once persisted, so listing and
+    detail lookups for history are served from SQLite.
+    """
 
-    def __init__(self) -> None:
+    def __init__(self, store: Optional[RunStore] = None) -> None:
         self._runs: Dict[str, AutomationRun] = {}
+        self._store = store or RunStore()
+        # Runs still active when the previous process exited can never finish
+        self._store.mark_interrupted()
+        self.prune_runs()
         self._subscribers: DefaultDict[str, List[asyncio.Queue]] = defaultdict(list)
         self._lock = asyncio.Lock()
         self._runner = AutomationRunner()
         self._screenshot_pollers: Dict[str, asyncio.Task] = {}
+        self._live_streams: Dict[str, LiveScreenStream] = {}
+        # run id -> [created, started] (monotonic) while the run is active
+        self._run_clock: Dict[str, List[Optional[float]]] = {}
+        SSE_SUBSCRIBERS.set_function(self._subscriber_count)
+
+    def _subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
 
     def has_run(self, run_id: str) -> bool:
-        return run_id in self._runs
+        return run_id in self._runs or self._store.exists(run_id)
 
     async def create_run(self, prompt: str) -> AutomationRun:
         async with self._lock:
@@ -82,19 +139,64 @@ class AutomationManager:
         return run
 
     def get_run(self, run_id: str) -> AutomationRun:
-        if run_id not in self._runs:
+        run = self._runs.get(run_id)
+        if run is not None:
+            return run
+        stored = self._store.load(run_id)
+        if stored is None:
             raise KeyError(f"Run {run_id} not found")
-        return self._runs[run_id]
-
-    def list_runs(self) -> List[AutomationRun]:
-        return sorted(self._runs.values(), key=lambda run: run.created_at, reverse=True)
+        return AutomationRun.from_dict(stored)
+
+    def list_runs(
+        self,
+        status: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return a page of run summaries (newest first) and the next cursor."""
+        return self._store.query(status=status, limit=limit, cursor=cursor)
+
+    def delete_run(self, run_id: str) -> bool:
+        """Delete a finished run and release its screenshot references.
+
+        Returns:
+            False if the run does not exist
+
+        Raises:
+            ValueError: If the run is still active
+        """
+        if run_id in self._runs:
+            raise ValueError(f"Run {run_id} is still active")
+        if not self._store.delete(run_id):
+            return False
+        blob_store.release(f"run:{run_id}")
+        return True
+
+    def prune_runs(self, retention_days: float = RUN_RETENTION_DAYS) -> int:
+        """Delete finished runs older than retention_days (0 disables).
+
+        Returns:
+            Number of runs deleted
+        """
+        if retention_days <= 0:
+            return 0
+        cutoff = (_utc_now() - timedelta(days=retention_days)).isoformat(timespec="microseconds")
+        run_ids = self._store.prune(cutoff)
+        for run_id in run_ids:
+            blob_store.release(f"run:{run_id}")
+        if run_ids:
+            print(f"[INFO] Deleted {len(run_ids)} run(s) older than {retention_days:g} days")
+        return len(run_ids)
+
+    def _persist(self, run: AutomationRun) -> None:
+        try:
+            self._store.save(run.to_summary(), run.to_dict())
+        except Exception as exc:
+            print(f"[WARN] Failed to persist run {run.id}: {exc}")
 
     async def cancel_run(self, run_id: str) -> None:
         """Cancel a running automation run."""
-        if run_id not in self._runs:
-            raise KeyError(f"Run {run_id} not found")
-        
-        run = self._runs[run_id]
+        run = self.get_run(run_id)
         if run.status not in {"pending", "running"}:
             return  # Already completed/failed/cancelled
         
@@ -115,29 +217,33 @@ class AutomationManager:
         # The runner will terminate the subprocess
 
     async def event_stream(self, run_id: str) -> AsyncIterator[Dict[str, Any]]:
-        if run_id not in self._runs:
-            raise KeyError(f"Run {run_id} not found")
+        run = self.get_run(run_id)
 
         queue: asyncio.Queue = asyncio.Queue()
         self._subscribers[run_id].append(queue)
 
-        run = self._runs[run_id]
         try:
             for event in run.events:
                 yield event
+            if run_id not in self._runs:
+                # Finished run restored from the store: nothing more will arrive
+                return
 
             while True:
-                event = await queue.get()
+                emitted_at, event = await queue.get()
+                SSE_QUEUE_LAG.observe(time.monotonic() - emitted_at)
                 yield event
                 if (
                     event["type"] == "status"
-                    and event.get("status") in {"completed", "failed", "cancelled"}
+                    and event.get("status") in TERMINAL_STATUSES
                 ):
                     break
         finally:
             subscribers = self._subscribers.get(run_id)
             if subscribers and queue in subscribers:
                 subscribers.remove(queue)
+            if not subscribers:
+                self._subscribers.pop(run_id, None)
 
     def _emit_event(self, run_id: str, event: Dict[str, Any]) -> None:
         if run_id not in self._runs:
@@ -152,184 +258,77 @@ class AutomationManager:
         event_type = payload.get("type")
         if event_type == "status":
             run.status = payload.get("status", run.status)
+            self._record_status(run_id, run.status)
+            self._persist(run)
         elif event_type == "log":
             run.logs.append(payload)
         elif event_type == "screenshot":
             screenshot = payload.get("screenshot")
             if isinstance(screenshot, dict):
                 run.screenshots.append(screenshot)
+                if screenshot.get("digest"):
+                    blob_store.add_ref(f"run:{run_id}", screenshot["digest"])
         elif event_type == "device":
             device_type = payload.get("deviceType")
             if device_type in {"android", "ios"}:
                 run.device_type = device_type  # type: ignore[assignment]
         elif event_type == "report":
-            report_path = payload.get("report", {}).get("path")
-            if report_path:
-                run.report_path = report_path
+            report = payload.get("report") or {}
+            if report.get("path"):
+                run.report_path = report["path"]
+            if report.get("id"):
+                try:
+                    report_index.add(report, run_id=run_id)
+                except Exception as exc:
+                    print(f"[WARN] Failed to index report {report.get('id')}: {exc}")
+                if report.get("path"):
+                    asyncio.create_task(self._ingest_report(report["path"]))
+
+        subscribers = self._subscribers.get(run_id)
+        if subscribers:
+            emitted_at = time.monotonic()
+            for queue in subscribers:
+                queue.put_nowait((emitted_at, payload))
+
+    def _record_status(self, run_id: str, status: str) -> None:
+        """Update run metrics; each run counts once per status it reaches."""
+        now = time.monotonic()
+        if status in TERMINAL_STATUSES:
+            # A cancelled run can still report "failed" afterwards
+            clock = self._run_clock.pop(run_id, None)
+            if clock is None:
+                return
+            RUNS_ACTIVE.dec()
+            RUNS.labels(status).inc()
+            RUN_DURATION.labels(status).observe(now - (clock[1] or clock[0]))
+        elif status == "pending":
+            if run_id in self._run_clock:
+                return
+            self._run_clock[run_id] = [now, None]
+            RUNS_ACTIVE.inc()
+            RUNS.labels(status).inc()
+        elif status == "running":
+            clock = self._run_clock.get(run_id)
+            if clock is None or clock[1] is not None:
+                return
+            clock[1] = now
+            RUNS.labels(status).inc()
+            RUN_QUEUE_WAIT.observe(now - clock[0])
 
-        for queue in self._subscribers.get(run_id, []):
-            queue.put_nowait(payload)
+    async def _ingest_report(self, report_path: str) -> None:
+        """Add a finished report's steps to the historical query index."""
+        try:
+            await asyncio.to_thread(report_index.ingest_file, Path(report_path))
+        except Exception as exc:
+            print(f"[WARN] Failed to ingest report {report_path}: {exc}")
 
     async def _run_automation(self, run_id: str, prompt: str) -> None:
         self._emit_event(run_id, {"type": "status", "status": "running"})
         
         # Fetch and emit full device information at the start of automation
         try:
-            import subprocess
-            import requests
-            import os
-            
-            MCP_SERVER_URL = os.getenv('MCP_SERVER_URL', 'http://127.0.0.1:8080')
-            device_info = {"deviceType": "android", "deviceName": None, "isTablet": False}
-            
-            # Try to detect iOS devices first (macOS only)
-            ios_device_detected = False
-            try:
-                # Check for iOS devices using idevice_id (requires libimobiledevice)
-                idevice_result = subprocess.run(
-                    ["idevice_id", "-l"],
-                    capture_output=True,
-                    text=True,
-                    timeout=2
-                )
-                if idevice_result.returncode == 0 and idevice_result.stdout.strip():
-                    device_ids = idevice_result.stdout.strip().split('\n')
-                    if device_ids and device_ids[0]:
-                        device_id = device_ids[0].strip()
-                        # Get device name using ideviceinfo
-                        try:
-                            name_result = subprocess.run(
-                                ["ideviceinfo", "-u", device_id, "-k", "DeviceName"],
-                                capture_output=True,
-                                text=True,
-                                timeout=2
-                            )
-                            device_name = name_result.stdout.strip() if name_result.returncode == 0 else None
-                            
-                            # Get device model to determine if it's iPad
-                            try:
-                                model_result = subprocess.run(
-                                    ["ideviceinfo", "-u", device_id, "-k", "ProductType"],
-                                    capture_output=True,
-                                    text=True,
-                                    timeout=2
-                                )
-                                product_type = model_result.stdout.strip() if model_result.returncode == 0 else ""
-                                is_tablet = "iPad" in product_type or "ipad" in product_type.lower()
-                            except:
-                                is_tablet = False
-                            
-                            device_info = {
-                                "deviceType": "ios",
-                                "deviceName": device_name or device_id,
-                                "isTablet": is_tablet
-                            }
-                            ios_device_detected = True
-                        except:
-                            device_info = {
-                                "deviceType": "ios",
-                                "deviceName": device_id,
-                                "isTablet": False
-                            }
-                            ios_device_detected = True
-            except (FileNotFoundError, subprocess.TimeoutExpired):
-                # idevice_id not available (not macOS or libimobiledevice not installed)
-                pass
-            except Exception:
-                pass
-            
-            # If no iOS device found, try Android devices via ADB
-            if not ios_device_detected:
-                try:
-                    result = subprocess.run(
-                        ["adb", "devices"],
-                        capture_output=True,
-                        text=True,
-                        timeout=3
-                    )
-                    if result.returncode == 0:
-                        lines = result.stdout.strip().split('\n')[1:]  # Skip header
-                        for line in lines:
-                            if line.strip() and '\tdevice' in line:
-                                device_id = line.split('\t')[0].strip()
-                                if not device_id:
-                                    continue
-
-                                # Get device model/name
-                                device_name = None
-                                try:
-                                    name_result = subprocess.run(
-                                        ["adb", "-s", device_id, "shell", "getprop", "ro.product.model"],
-                                        capture_output=True,
-                                        text=True,
-                                        timeout=2
-                                    )
-                                    if name_result.returncode == 0:
-                                        device_name = name_result.stdout.strip()
-                                except Exception:
-                                    pass
-
-                                # Get device brand
-                                device_brand = None
-                                try:
-                                    brand_result = subprocess.run(
-                                        ["adb", "-s", device_id, "shell", "getprop", "ro.product.brand"],
-                                        capture_output=True,
-                                        text=True,
-                                        timeout=2
-                                    )
-                                    if brand_result.returncode == 0:
-                                        device_brand = brand_result.stdout.strip()
-                                except Exception:
-                                    pass
-
-                                # Get screen size to determine form factor
-                                is_tablet = False
-                                try:
-                                    density_result = subprocess.run(
-                                        ["adb", "-s", device_id, "shell", "wm", "size"],
-                                        capture_output=True,
-                                        text=True,
-                                        timeout=2
-                                    )
-                                    if density_result.returncode == 0:
-                                        size_output = density_result.stdout.strip()
-                                        if "Physical size:" in size_output and "x" in size_output:
-                                            try:
-                                                size_part = size_output.split("Physical size:")[-1].strip()
-                                                dims = size_part.split("x")
-                                                if len(dims) == 2:
-                                                    width = int(dims[0].strip())
-                                                    height = int(dims[1].strip().split()[0] if " " in dims[1] else dims[1].strip())
-                                                    short_side = min(width, height)
-                                                    long_side = max(width, height)
-                                                    aspect_ratio = (long_side / short_side) if short_side else 0
-                                                    # Consider device a tablet if the short side is large (>= 1200)
-                                                    # or the aspect ratio is closer to tablet ratios (<= 1.6)
-                                                    if short_side >= 1200 or aspect_ratio <= 1.6:
-                                                        is_tablet = True
-                                            except (ValueError, IndexError):
-                                                pass
-                                except Exception:
-                                    pass
-
-                                full_name = f"{device_brand} {device_name}".strip() if device_brand and device_name else (device_name or device_id)
-                                device_info = {
-                                    "deviceType": "android",
-                                    "deviceName": full_name,
-                                    "isTablet": is_tablet
-                                }
-                                break
-                except Exception:
-                    pass
-            
-            # Emit device info event with full details
-            self._emit_event(run_id, {
-                "type": "device",
-                "deviceType": device_info["deviceType"],
-                "deviceName": device_info["deviceName"],
-                "isTablet": device_info["isTablet"]
-            })
+            device_info = primary_device_info(await device_inventory.devices())
+            self._emit_event(run_id, {"type": "device", **device_info})
         except Exception:
             # Fallback to default if device info fetch fails
             self._emit_event(run_id, {"type": "device", "deviceType": "android"})
@@ -340,7 +339,7 @@ class AutomationManager:
         poller_task: Optional[asyncio.Task] = None
         # Start fast polling for device screen viewer (real-time updates)
         if DEVICE_SCREEN_POLL_INTERVAL > 0:
-            poller_task = asyncio.create_task(self._poll_live_screenshots(run_id, DEVICE_SCREEN_POLL_INTERVAL))
+            poller_task = asyncio.create_task(self._stream_live_screen(run_id, DEVICE_SCREEN_POLL_INTERVAL))
             self._screenshot_pollers[run_id] = poller_task
 
         try:
@@ -349,7 +348,12 @@ class AutomationManager:
             if run and run.status == "cancelled":
                 return
             
-            await self._runner.run(prompt, forward)
+            # Hand the inventory to main.py so it does not re-probe devices
+            await self._runner.run(
+                prompt,
+                forward,
+                env_overrides={DEVICE_SNAPSHOT_ENV: device_inventory.snapshot_json()},
+            )
             
             # Check again after run completes
             run = self._runs.get(run_id)
@@ -396,140 +400,65 @@ class AutomationManager:
                 poller.cancel()
                 with contextlib.suppress(asyncio.CancelledError):
                     await poller
-
-    async def _poll_live_screenshots(self, run_id: str, interval: float) -> None:
-        """Poll for live device screen updates for real-time viewing."""
+            run = self._runs.get(run_id)
+            if run is not None and run.status in TERMINAL_STATUSES:
+                # Final write carries the report path and all trailing logs;
+                # open subscribers already hold the terminal status event.
+                self._persist(run)
+                self._runs.pop(run_id, None)
+
+    def get_live_stream(self, run_id: str) -> Optional[LiveScreenStream]:
+        return self._live_streams.get(run_id)
+
+    async def _mcp_screenshot(self) -> Optional[bytes]:
+        """Fallback frame source via the MCP server (iOS / no adb)."""
+        frame = await asyncio.to_thread(appium_tools.capture_screenshot)
+        if frame:
+            return frame
+        # Older MCP servers can only write the capture to a file
+        try:
+            response = await asyncio.to_thread(appium_tools.take_screenshot)
+        except Exception:
+            return None
+        if not (isinstance(response, dict) and response.get("success")):
+            return None
+        raw_path = response.get("screenshotPath") or response.get("path")
+        if not raw_path:
+            return None
+        source_path = Path(raw_path)
+        if not source_path.is_absolute():
+            source_path = (APP_MCP_DIR / source_path).resolve()
+        return await read_screenshot_file(source_path)
+
+    async def _stream_live_screen(self, run_id: str, interval: float) -> None:
+        """Stream the device screen for real-time viewing while the run is active."""
         interval = max(interval, 0.0)
         if interval <= 0:
             return
 
-        await asyncio.sleep(0.2)  # Reduced initial delay for faster first update
-
-        while True:
-            run = self._runs.get(run_id)
-            if not run or run.status in {"completed", "failed", "cancelled"}:
-                break
-
-            try:
-                # Use ADB directly for faster screenshot capture (bypasses MCP server overhead)
-                import subprocess
-                device_id = None
-                try:
-                    # Get the first connected device
-                    result = subprocess.run(
-                        ["adb", "devices"],
-                        capture_output=True,
-                        text=True,
-                        timeout=1
-                    )
-                    if result.returncode == 0:
-                        lines = result.stdout.strip().split('\n')[1:]
-                        for line in lines:
-                            if line.strip() and '\tdevice' in line:
-                                device_id = line.split('\t')[0].strip()
-                                break
-                except Exception:
-                    pass
-                
-                if device_id:
-                    # Use ADB screencap directly for faster capture
-                    try:
-                        # Capture screenshot to device (non-blocking)
-                        subprocess.run(
-                            ["adb", "-s", device_id, "shell", "screencap", "-p", "/sdcard/live_screen.png"],
-                            capture_output=True,
-                            timeout=1.5
-                        )
-                        # Pull screenshot to local temp file
-                        temp_path = REPORTS_DIR / f"{run_id}_device_screen_temp.png"
-                        temp_path.parent.mkdir(parents=True, exist_ok=True)
-                        pull_result = subprocess.run(
-                            ["adb", "-s", device_id, "pull", "/sdcard/live_screen.png", str(temp_path)],
-                            capture_output=True,
-                            timeout=1.5
-                        )
-                        if pull_result.returncode == 0 and temp_path.exists():
-                            # Move to final location
-                            dest_name = f"{run_id}_device_screen.png"
-                            dest_path = (REPORTS_DIR / dest_name).resolve()
-                            shutil.move(str(temp_path), str(dest_path))
-                            
-                            # Emit immediately with timestamp for cache busting
-                            self._emit_event(
-                                run_id,
-                                {
-                                    "type": "screenshot",
-                                    "screenshot": {
-                                        "id": f"{dest_path.stem}",
-                                        "url": f"{REPORTS_PUBLIC_URL}/{dest_path.name}?t={int(time.time() * 1000)}",
-                                        "timestamp": _iso_now(),
-                                        "step": "Live Screen"
-                                    }
-                                }
-                            )
-                    except Exception:
-                        # Fallback to MCP server method if ADB direct fails
-                        try:
-                            response = appium_tools.take_screenshot()
-                            if isinstance(response, dict) and response.get("success"):
-                                raw_path = response.get("screenshotPath") or response.get("path")
-                                if raw_path:
-                                    source_path = Path(raw_path)
-                                    if not source_path.is_absolute():
-                                        source_path = (APP_MCP_DIR / source_path).resolve()
-                                    if source_path.exists():
-                                        dest_name = f"{run_id}_device_screen.png"
-                                        dest_path = (REPORTS_DIR / dest_name).resolve()
-                                        dest_path.parent.mkdir(parents=True, exist_ok=True)
-                                        shutil.copyfile(source_path, dest_path)
-                                        self._emit_event(
-                                            run_id,
-                                            {
-                                                "type": "screenshot",
-                                                "screenshot": {
-                                                    "id": f"{dest_path.stem}",
-                                                    "url": f"{REPORTS_PUBLIC_URL}/{dest_path.name}?t={int(time.time() * 1000)}",
-                                                    "timestamp": _iso_now(),
-                                                    "step": "Live Screen"
-                                                }
-                                            }
-                                        )
-                        except Exception:
-                            pass
-                else:
-                    # Fallback to MCP server method if no device found
-                    try:
-                        response = appium_tools.take_screenshot()
-                        if isinstance(response, dict) and response.get("success"):
-                            raw_path = response.get("screenshotPath") or response.get("path")
-                            if raw_path:
-                                source_path = Path(raw_path)
-                                if not source_path.is_absolute():
-                                    source_path = (APP_MCP_DIR / source_path).resolve()
-                                if source_path.exists():
-                                    dest_name = f"{run_id}_device_screen.png"
-                                    dest_path = (REPORTS_DIR / dest_name).resolve()
-                                    dest_path.parent.mkdir(parents=True, exist_ok=True)
-                                    shutil.copyfile(source_path, dest_path)
-                                    self._emit_event(
-                                        run_id,
-                                        {
-                                            "type": "screenshot",
-                                            "screenshot": {
-                                                "id": f"{dest_path.stem}",
-                                                "url": f"{REPORTS_PUBLIC_URL}/{dest_path.name}?t={int(time.time() * 1000)}",
-                                                "timestamp": _iso_now(),
-                                                "step": "Live Screen"
-                                            }
-                                        }
-                                    )
-                    except Exception:
-                        pass
-            except Exception:
-                pass
-
-            await asyncio.sleep(interval)
-
+        serials = await device_inventory.adb_serials()
+        serial = serials[0] if serials else None
+        stream = LiveScreenStream(serial, interval=interval, fallback=self._mcp_screenshot)
+        self._live_streams[run_id] = stream
+        # The viewer points its <img> at the multipart endpoint once; frames
+        # then arrive over that single connection instead of per-frame events.
+        self._emit_event(
+            run_id,
+            {
+                "type": "screenshot",
+                "screenshot": {
+                    "id": f"{run_id}_live",
+                    "url": f"{AUTOMATION_PUBLIC_BASE_URL}/api/runs/{run_id}/live",
+                    "timestamp": _iso_now(),
+                    "step": "Live Screen",
+                },
+            },
+        )
+        try:
+            await stream.run()
+        finally:
+            await stream.close()
+            self._live_streams.pop(run_id, None)
 
 automation_manager = AutomationManager()
 
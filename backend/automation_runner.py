@@ -5,14 +5,26 @@ import json
 import os
 import platform
 import re
-import shutil
 import signal
 import subprocess
 import sys
 import time
 import uuid
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterable, Optional
+from typing import Any, Callable, Dict, Optional
+
+from blob_store import BLOB_DIR, blob_store
+from metrics import merge_metrics_marker
+from patterns import (
+    LOG_ACTION_NAME_PATTERN,
+    LOG_BRACKET_TAG_PATTERN,
+    LOG_STATS_PATTERN,
+    LOG_TEXT_ARG_PATTERN,
+    LOG_VALUE_ARG_PATTERN,
+    STEP_CLICK_TARGET_PATTERN,
+    STEP_TYPED_TEXT_PATTERN,
+)
+from reports import recover_orphaned_journals
 
 AutomationEventCallback = Callable[[Dict[str, Any]], None]
 
@@ -23,6 +35,32 @@ AUTOMATION_PUBLIC_BASE_URL = os.getenv(
     "AUTOMATION_PUBLIC_BASE_URL", "http://127.0.0.1:8000"
 ).rstrip("/")
 REPORTS_PUBLIC_URL = f"{AUTOMATION_PUBLIC_BASE_URL}/reports"
+# main.py announces the finalized report with "[REPORT] Report: <path>"
+REPORT_MARKER_RE = re.compile(r"\[REPORT\] Report:\s*(.+?)\s*$")
+
+
+def parse_report_marker(message: str) -> Optional[Path]:
+    """Return the report path handed over by main.py, if the line carries one."""
+    match = REPORT_MARKER_RE.search(message)
+    if not match:
+        return None
+    path = Path(match.group(1))
+    if not path.is_absolute():
+        # main.py runs with cwd=BASE_DIR
+        path = (BASE_DIR / path).resolve()
+    return path
+
+
+def store_screenshot(path: Path) -> Dict[str, Any]:
+    """Blob for a captured screenshot; main.py already writes captures into
+    the store, so those are used in place instead of hashed and copied."""
+    return blob_store.describe(path) or blob_store.put_file(path)
+
+
+def blob_url(blob: Dict[str, Any]) -> str:
+    """Public URL of a stored screenshot (blobs live under reports/)."""
+    relative = Path(blob["path"]).relative_to(BLOB_DIR).as_posix()
+    return f"{REPORTS_PUBLIC_URL}/blobs/{relative}"
 
 
 class AutomationRunnerError(Exception):
@@ -128,6 +166,7 @@ class AutomationRunner:
         self,
         prompt: str,
         emit: AutomationEventCallback,
+        env_overrides: Optional[Dict[str, str]] = None,
     ) -> None:
         """
         Execute the automation workflow for the provided prompt.
@@ -135,9 +174,12 @@ class AutomationRunner:
         Args:
             prompt: Natural language goal to execute.
             emit: Callback invoked with automation events (log/screenshot/report/status).
+            env_overrides: Extra environment variables for the subprocess.
         """
-        existing_reports = set(self._iter_report_files())
-        started_at = time.time()
+        # Report paths announced by main.py; the last one is the final report
+        reported_paths: list[Path] = []
+        # Journals written after this belong to this run (runs do not overlap)
+        run_started = time.time()
 
         emit(
             {
@@ -150,12 +192,13 @@ class AutomationRunner:
 
         # Ensure environment variables are passed through
         env = os.environ.copy()
+        if env_overrides:
+            env.update(env_overrides)
         
         # On Windows, we need to use ProactorEventLoop for subprocess support
         # or use a thread-based approach. Let's use a thread executor for cross-platform compatibility.
         if platform.system() == "Windows":
             # Use thread executor for Windows compatibility
-            import subprocess
             from concurrent.futures import ThreadPoolExecutor
             
             # Ensure UTF-8 encoding for subprocess on Windows
@@ -217,8 +260,13 @@ class AutomationRunner:
                     try:
                         level, message = await asyncio.wait_for(message_queue.get(), timeout=0.1)
                         # Collect stderr messages for error reporting
+                        if merge_metrics_marker(message):
+                            continue
                         if level == "stderr":
                             stderr_lines.append(message)
+                        report_marker = parse_report_marker(message)
+                        if report_marker:
+                            reported_paths.append(report_marker)
                         
                         # Check for screenshot message and emit immediately
                         if "[SCREENSHOT] Captured after:" in message and "| PATH:" in message:
@@ -231,14 +279,10 @@ class AutomationRunner:
                                     # Resolve relative paths relative to APP_MCP_DIR
                                     if not screenshot_path.is_absolute():
                                         screenshot_path = (APP_MCP_DIR / screenshot_path).resolve()
-                                    # Copy screenshot to reports directory for frontend access
+                                    # Store screenshot under reports/blobs for frontend access
                                     if screenshot_path.exists():
-                                        # Get run_id from context (we need to pass it or get it from somewhere)
-                                        # For now, use a timestamp-based name
-                                        screenshot_name = f"screenshot_{int(time.time() * 1000)}.png"
-                                        dest_path = (self.reports_dir / screenshot_name).resolve()
-                                        dest_path.parent.mkdir(parents=True, exist_ok=True)
-                                        shutil.copyfile(screenshot_path, dest_path)
+                                        # Stored once by content; repeats of a screen reuse the blob
+                                        blob = store_screenshot(screenshot_path)
                                         
                                         # Extract step description
                                         step_desc = message.split("Captured after:")[-1].split("| PATH:")[0].strip()
@@ -247,8 +291,9 @@ class AutomationRunner:
                                         emit({
                                             "type": "screenshot",
                                             "screenshot": {
-                                                "id": dest_path.stem,
-                                                "url": f"{REPORTS_PUBLIC_URL}/{dest_path.name}",
+                                                "id": f"screenshot_{int(time.time() * 1000)}",
+                                                "url": blob_url(blob),
+                                                "digest": blob["digest"],
                                                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
                                                 "step": step_desc or "Automation step",
                                             },
@@ -381,8 +426,7 @@ class AutomationRunner:
                             # Extract what we're clicking on
                             if "value':" in simplified_message or "'value':" in simplified_message:
                                 try:
-                                    import re
-                                    match = re.search(r"['\"]value['\"]:\s*['\"]([^'\"]+)['\"]", simplified_message)
+                                    match = LOG_VALUE_ARG_PATTERN.search(simplified_message)
                                     if match:
                                         item = match.group(1)
                                         # Clean up item name (remove IDs, keep readable text)
@@ -399,8 +443,7 @@ class AutomationRunner:
                             # Extract what we're typing
                             if "text':" in simplified_message or "'text':" in simplified_message:
                                 try:
-                                    import re
-                                    match = re.search(r"['\"]text['\"]:\s*['\"]([^'\"]+)['\"]", simplified_message)
+                                    match = LOG_TEXT_ARG_PATTERN.search(simplified_message)
                                     if match:
                                         text = match.group(1)
                                         simplified_message = f"Type: {text}"
@@ -434,8 +477,13 @@ class AutomationRunner:
                             while not message_queue.empty():
                                 try:
                                     level, message = message_queue.get_nowait()
+                                    if merge_metrics_marker(message):
+                                        continue
                                     if level == "stderr":
                                         stderr_lines.append(message)
+                                    report_marker = parse_report_marker(message)
+                                    if report_marker:
+                                        reported_paths.append(report_marker)
                                     
                                     # Check for screenshot message and emit immediately (same as above)
                                     if "[SCREENSHOT] Captured after:" in message and "| PATH:" in message:
@@ -447,18 +495,17 @@ class AutomationRunner:
                                                 if not screenshot_path.is_absolute():
                                                     screenshot_path = (APP_MCP_DIR / screenshot_path).resolve()
                                                 if screenshot_path.exists():
-                                                    screenshot_name = f"screenshot_{int(time.time() * 1000)}.png"
-                                                    dest_path = (self.reports_dir / screenshot_name).resolve()
-                                                    dest_path.parent.mkdir(parents=True, exist_ok=True)
-                                                    shutil.copyfile(screenshot_path, dest_path)
+                                                    # Stored once by content; repeats of a screen reuse the blob
+                                                    blob = store_screenshot(screenshot_path)
                                                     
                                                     step_desc = message.split("Captured after:")[-1].split("| PATH:")[0].strip()
                                                     
                                                     emit({
                                                         "type": "screenshot",
                                                         "screenshot": {
-                                                            "id": dest_path.stem,
-                                                            "url": f"{REPORTS_PUBLIC_URL}/{dest_path.name}",
+                                                            "id": f"screenshot_{int(time.time() * 1000)}",
+                                                            "url": blob_url(blob),
+                                                            "digest": blob["digest"],
                                                             "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
                                                             "step": step_desc or "Automation step",
                                                         },
@@ -571,8 +618,7 @@ class AutomationRunner:
                                     if "Action: click" in simplified_message:
                                         if "value':" in simplified_message or "'value':" in simplified_message:
                                             try:
-                                                import re
-                                                match = re.search(r"['\"]value['\"]:\s*['\"]([^'\"]+)['\"]", simplified_message)
+                                                match = LOG_VALUE_ARG_PATTERN.search(simplified_message)
                                                 if match:
                                                     item = match.group(1)
                                                     simplified_message = f"Clicking on {item}"
@@ -585,8 +631,7 @@ class AutomationRunner:
                                     elif "Action: send_keys" in simplified_message or "Action: ensure_focus_and_type" in simplified_message:
                                         if "text':" in simplified_message or "'text':" in simplified_message:
                                             try:
-                                                import re
-                                                match = re.search(r"['\"]text['\"]:\s*['\"]([^'\"]+)['\"]", simplified_message)
+                                                match = LOG_TEXT_ARG_PATTERN.search(simplified_message)
                                                 if match:
                                                     text = match.group(1)
                                                     simplified_message = f"Typing: {text}"
@@ -692,8 +737,13 @@ class AutomationRunner:
                         message = line.decode("latin-1", errors="replace").rstrip()
                     if not message:
                         continue
+                    if merge_metrics_marker(message):
+                        continue
                     if level == "stderr":
                         stderr_lines.append(message)
+                    report_marker = parse_report_marker(message)
+                    if report_marker:
+                        reported_paths.append(report_marker)
                     
                     # Check for screenshot message and emit immediately (same as above)
                     if "[SCREENSHOT] Captured after:" in message and "| PATH:" in message:
@@ -705,18 +755,17 @@ class AutomationRunner:
                                 if not screenshot_path.is_absolute():
                                     screenshot_path = (APP_MCP_DIR / screenshot_path).resolve()
                                 if screenshot_path.exists():
-                                    screenshot_name = f"screenshot_{int(time.time() * 1000)}.png"
-                                    dest_path = (self.reports_dir / screenshot_name).resolve()
-                                    dest_path.parent.mkdir(parents=True, exist_ok=True)
-                                    shutil.copyfile(screenshot_path, dest_path)
+                                    # Stored once by content; repeats of a screen reuse the blob
+                                    blob = store_screenshot(screenshot_path)
                                     
                                     step_desc = message.split("Captured after:")[-1].split("| PATH:")[0].strip()
                                     
                                     emit({
                                         "type": "screenshot",
                                         "screenshot": {
-                                            "id": dest_path.stem,
-                                            "url": f"{REPORTS_PUBLIC_URL}/{dest_path.name}",
+                                            "id": f"screenshot_{int(time.time() * 1000)}",
+                                            "url": blob_url(blob),
+                                            "digest": blob["digest"],
                                             "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
                                             "step": step_desc or "Automation step",
                                         },
@@ -873,7 +922,7 @@ class AutomationRunner:
                             if "Click" in step_desc or "click" in step_desc:
                                 # Try to extract element name
                                 # Look for common patterns like "Click on Login" or "Click Login button"
-                                match = re.search(r'(?:Click|click)\s+(?:on\s+)?([A-Z][a-zA-Z\s]+?)(?:\s+button|\s+element|$)', step_desc)
+                                match = STEP_CLICK_TARGET_PATTERN.search(step_desc)
                                 if match:
                                     element_name = match.group(1).strip()
                                     simplified_message = f"Click on {element_name}"
@@ -881,7 +930,7 @@ class AutomationRunner:
                                     simplified_message = "Clicking element"
                             elif "Type" in step_desc or "Enter" in step_desc or "type" in step_desc or "enter" in step_desc:
                                 # Try to extract text being typed
-                                match = re.search(r'(?:Type|Enter|type|enter).*?["\']([^"\']+)["\']', step_desc)
+                                match = STEP_TYPED_TEXT_PATTERN.search(step_desc)
                                 if match:
                                     text_value = match.group(1)
                                     simplified_message = f"Typing: {text_value}"
@@ -927,7 +976,7 @@ class AutomationRunner:
                     # Transform action messages
                     elif "Action: click" in simplified_message or "Call click" in simplified_message:
                         # Try to extract element name/value
-                        match = re.search(r"['\"]value['\"]:\s*['\"]([^'\"]+)['\"]", simplified_message)
+                        match = LOG_VALUE_ARG_PATTERN.search(simplified_message)
                         if match:
                             item = match.group(1)
                             simplified_message = f"Click on {item}"
@@ -936,7 +985,7 @@ class AutomationRunner:
                         log_level = "action"
                     elif "Action: send_keys" in simplified_message or "Action: ensure_focus_and_type" in simplified_message or "Call send_keys" in simplified_message or "Call ensure_focus_and_type" in simplified_message:
                         # Try to extract text being typed
-                        match = re.search(r"['\"]text['\"]:\s*['\"]([^'\"]+)['\"]", simplified_message)
+                        match = LOG_TEXT_ARG_PATTERN.search(simplified_message)
                         if match:
                             text = match.group(1)
                             simplified_message = f"Typing: {text}"
@@ -945,7 +994,7 @@ class AutomationRunner:
                         log_level = "action"
                     elif "Action:" in simplified_message or "Call " in simplified_message:
                         # Extract action name
-                        action_match = re.search(r"(?:Action:\s*|Call\s+)(\w+)", simplified_message)
+                        action_match = LOG_ACTION_NAME_PATTERN.search(simplified_message)
                         if action_match:
                             action_name = action_match.group(1)
                             if action_name == "wait_for_text_ocr":
@@ -970,7 +1019,7 @@ class AutomationRunner:
                             simplified_message = "✓ Automation completed - Report generated"
                         elif "STATS" in simplified_message:
                             # Extract stats
-                            stats_match = re.search(r'(\d+)\s+steps.*?✅\s+(\d+).*?❌\s+(\d+)', simplified_message)
+                            stats_match = LOG_STATS_PATTERN.search(simplified_message)
                             if stats_match:
                                 total, success, failed = stats_match.groups()
                                 simplified_message = f"✓ Completed: {success} successful, {failed} failed out of {total} steps"
@@ -1000,7 +1049,7 @@ class AutomationRunner:
                     # Default: clean up any remaining technical prefixes
                     else:
                         # Remove any remaining technical markers
-                        simplified_message = re.sub(r'\[.*?\]', '', simplified_message).strip()
+                        simplified_message = LOG_BRACKET_TAG_PATTERN.sub('', simplified_message).strip()
                         if not simplified_message:
                             continue
                     
@@ -1059,6 +1108,9 @@ class AutomationRunner:
             self._should_stop = False
 
         if return_code != 0:
+            # A killed or crashed main.py leaves its step journal behind
+            for recovered_path in recover_orphaned_journals(self.reports_dir, modified_since=run_started):
+                self._emit_report(recovered_path, prompt, emit, status="interrupted")
             # Don't emit technical error messages to frontend - they're already filtered
             # Only show user-friendly message if automation was interrupted (Ctrl+C)
             if return_code in (3221225786, -1073741510, 130, 2):  # Windows Ctrl+C, Unix Ctrl+C, KeyboardInterrupt
@@ -1077,85 +1129,40 @@ class AutomationRunner:
                 f"Error details: {error_summary[:500]}"
             )
 
-        # Wait a bit for the report file to be written to disk
-        # Sometimes there's a small delay between when main.py prints [REPORT] and when the file is actually written
-        report_path = None
-        for attempt in range(5):  # Try up to 5 times with delays
-            report_path = self._find_newest_report(existing_reports, started_at)
-            if report_path:
-                break
-            if attempt < 4:  # Don't wait on last attempt
-                await asyncio.sleep(0.5)  # Wait 500ms between attempts
-        
-        # If still not found, try looking in the current working directory's reports folder
-        # (main.py might save to a relative "reports" directory)
-        if not report_path:
-            # Check if main.py is running from BASE_DIR and saving to relative "reports"
-            possible_reports_dir = BASE_DIR / "reports"
-            if possible_reports_dir.exists() and possible_reports_dir != self.reports_dir:
-                # Look in the BASE_DIR/reports directory
-                candidates = [
-                    path
-                    for path in possible_reports_dir.glob("*.json")
-                    if path not in existing_reports and path.stat().st_mtime >= started_at
-                ]
-                if candidates:
-                    report_path = max(candidates, key=lambda p: p.stat().st_mtime)
-        
+        # main.py finalizes (and writes) the report before printing the marker,
+        # so the announced path is ready to use without scanning reports/
+        report_path = reported_paths[-1] if reported_paths else None
+        if report_path is not None and not report_path.exists():
+            print(f"[DEBUG] Announced report does not exist: {report_path}", file=sys.stderr)
+            report_path = None
+
         if report_path:
-            # Generate PDF report
-            pdf_path = None
-            try:
-                from pdf_generator import PDFReportGenerator
-                pdf_generator = PDFReportGenerator(reports_dir=str(self.reports_dir))
-                pdf_path = pdf_generator.generate_pdf(report_path)
-            except ImportError:
-                # reportlab not installed, skip PDF generation
-                pass
-            except Exception as e:
-                print(f"Warning: Failed to generate PDF report: {e}", file=sys.stderr)
-            
-            # Emit report event to frontend
-            try:
-                emit(
-                    {
-                        "type": "report",
-                        "report": {
-                            "id": report_path.stem,
-                            "name": report_path.name,
-                            "path": str(report_path),
-                            "pdfPath": str(pdf_path) if pdf_path else None,
-                            "status": "success",
-                            "createdAt": time.strftime(
-                                "%Y-%m-%dT%H:%M:%SZ", time.gmtime(report_path.stat().st_mtime)
-                            ),
-                            "prompt": prompt,
-                        },
-                    }
-                )
-                self._emit_screenshots_from_report(report_path, emit)
-            except Exception as e:
-                print(f"Warning: Failed to emit report event: {e}", file=sys.stderr)
+            # The PDF is rendered on first download (/api/runs/{id}/report.pdf), not here
+            self._emit_report(report_path, prompt, emit)
         else:
-            # Report not found - log for debugging but don't show to user
-            print(f"[DEBUG] Report not found. Searched in: {self.reports_dir}", file=sys.stderr)
-            if BASE_DIR / "reports" != self.reports_dir:
-                print(f"[DEBUG] Also checked: {BASE_DIR / 'reports'}", file=sys.stderr)
-
-    def _iter_report_files(self) -> Iterable[Path]:
-        return self.reports_dir.glob("*.json")
+            # No report announced - log for debugging but don't show to user
+            print("[DEBUG] main.py did not announce a report path", file=sys.stderr)
 
-    def _find_newest_report(
-        self, existing_reports: set[Path], started_at: float
-    ) -> Optional[Path]:
-        candidates = [
-            path
-            for path in self._iter_report_files()
-            if path not in existing_reports and path.stat().st_mtime >= started_at
-        ]
-        if not candidates:
-            return None
-        return max(candidates, key=lambda p: p.stat().st_mtime)
+    def _emit_report(
+        self, report_path: Path, prompt: str, emit: AutomationEventCallback, status: str = "success"
+    ) -> None:
+        """Emit the report event (and the report's screenshots) to the frontend."""
+        try:
+            report_event = {
+                "id": report_path.stem,
+                "name": report_path.name,
+                "path": str(report_path),
+                "pdfPath": None,
+                "status": status,
+                "createdAt": time.strftime(
+                    "%Y-%m-%dT%H:%M:%SZ", time.gmtime(report_path.stat().st_mtime)
+                ),
+                "prompt": prompt,
+            }
+            emit({"type": "report", "report": report_event})
+            self._emit_screenshots_from_report(report_path, emit)
+        except Exception as e:
+            print(f"Warning: Failed to emit report event: {e}", file=sys.stderr)
 
     def _emit_screenshots_from_report(
         self, report_path: Path, emit: AutomationEventCallback
@@ -1201,12 +1208,19 @@ class AutomationRunner:
                     screenshot_file = (self.reports_dir / screenshot_file).resolve()
             if not screenshot_file.exists():
                 continue
+            try:
+                # The report holds a reference so its screenshots outlive gc()
+                blob = store_screenshot(screenshot_file)
+                blob_store.add_ref(f"report:{report_path.stem}", blob["digest"])
+            except OSError:
+                continue
             emit(
                 {
                     "type": "screenshot",
                     "screenshot": {
                         "id": screenshot_file.stem,
-                        "url": f"{REPORTS_PUBLIC_URL}/{screenshot_file.name}",
+                        "url": blob_url(blob),
+                        "digest": blob["digest"],
                         "timestamp": time.strftime(
                             "%Y-%m-%dT%H:%M:%SZ",
                             time.gmtime(screenshot_file.stat().st_mtime),
@@ -1218,9 +1232,13 @@ class AutomationRunner:
 
 
 __all__ = [
+    "AUTOMATION_PUBLIC_BASE_URL",
     "AutomationRunner",
     "AutomationRunnerError",
+    "blob_url",
+    "store_screenshot",
     "REPORTS_DIR",
+    "parse_report_marker",
     "REPORTS_PUBLIC_URL",
 ]
 
@@ -0,0 +1,239 @@
+"""
+Blob Store Module
+
+Content-addressed storage for screenshots. Each distinct image is written
+once under reports/blobs/<aa>/<sha256>.<ext> (served by the /reports static
+mount); runs and reports hold references to digests instead of private
+copies. Reference counts live in SQLite next to the run store, and gc()
+deletes blobs nothing refers to any more. References are released when a
+run is deleted (by hand or by AUTOMATION_RUN_RETENTION_DAYS) and when a
+report file is removed and the report index syncs.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from run_store import RUNS_DB_PATH, connect
+
+BASE_DIR = Path(__file__).resolve().parent
+# Under reports/ so the existing static mount serves blobs
+BLOB_DIR = BASE_DIR / "reports" / "blobs"
+# Unreferenced blobs younger than this are kept: a put is referenced by the
+# run manager only after the event is forwarded
+BLOB_GC_GRACE_SECONDS = float(os.getenv("AUTOMATION_BLOB_GC_GRACE", "3600"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    puts INTEGER NOT NULL DEFAULT 1,
+    last_put_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blob_refs (
+    owner TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (owner, digest)
+);
+CREATE INDEX IF NOT EXISTS idx_blob_refs_digest ON blob_refs (digest);
+"""
+
+_CHUNK = 1024 * 1024
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    """Deduplicating, reference-counted file store keyed by SHA-256."""
+
+    def __init__(self, root: Path = BLOB_DIR, db_path: Path | str = RUNS_DB_PATH) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._conn = connect(db_path)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def path_for(self, digest: str, ext: str) -> Path:
+        return self.root / digest[:2] / f"{digest}{ext}"
+
+    def _describe(self, digest: str, ext: str, size: int, stored: bool) -> Dict[str, Any]:
+        return {
+            "digest": digest,
+            "path": str(self.path_for(digest, ext)),
+            "size": size,
+            "deduplicated": not stored,
+        }
+
+    def _record(self, digest: str, ext: str, size: int, owner: Optional[str]) -> bool:
+        """Register a put; returns True if the blob is new."""
+        with self._lock:
+            now = time.time()
+            # Bumping last_put_at keeps a re-used blob out of the next gc()
+            cur = self._conn.execute(
+                "UPDATE blobs SET puts = puts + 1, last_put_at = ? WHERE digest = ?", (now, digest)
+            )
+            is_new = cur.rowcount == 0
+            if is_new:
+                self._conn.execute(
+                    "INSERT INTO blobs (digest, ext, size, puts, last_put_at) VALUES (?, ?, ?, 1, ?)",
+                    (digest, ext, size, now),
+                )
+            if owner:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO blob_refs (owner, digest) VALUES (?, ?)", (owner, digest)
+                )
+            self._conn.commit()
+        return is_new
+
+    def put_file(self, source: Path, owner: Optional[str] = None) -> Dict[str, Any]:
+        """Store a file by content; identical content is stored only once.
+
+        Args:
+            source: File to store (left in place)
+            owner: Optional reference holder (e.g. "run:<id>")
+
+        Returns:
+            Dict with digest, path, size and whether it was deduplicated
+        """
+        source = Path(source)
+        ext = source.suffix.lower() or ".bin"
+        digest = file_digest(source)
+        target = self.path_for(digest, ext)
+        stored = False
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            # A copy, not a hardlink: tools may rewrite their output files
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, target)
+            stored = True
+        size = target.stat().st_size
+        self._record(digest, ext, size, owner)
+        return self._describe(digest, ext, size, stored)
+
+    def put_bytes(self, data: bytes, ext: str = ".png", owner: Optional[str] = None) -> Dict[str, Any]:
+        """Store in-memory content; see put_file."""
+        digest = hashlib.sha256(data).hexdigest()
+        target = self.path_for(digest, ext)
+        stored = False
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, target)
+            stored = True
+        self._record(digest, ext, len(data), owner)
+        return self._describe(digest, ext, len(data), stored)
+
+    def describe(self, path: Path) -> Optional[Dict[str, Any]]:
+        """Blob info for a path already inside the store, without re-hashing.
+
+        Returns:
+            Same shape as put_file, or None if path is not a stored blob
+        """
+        path = Path(path)
+        try:
+            relative = path.resolve().relative_to(self.root.resolve())
+        except (OSError, ValueError):
+            return None
+        digest = path.stem
+        if len(relative.parts) != 2 or len(digest) != 64 or not path.is_file():
+            return None
+        return self._describe(digest, path.suffix, path.stat().st_size, stored=False)
+
+    def add_ref(self, owner: str, digest: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO blob_refs (owner, digest) "
+                "SELECT ?, digest FROM blobs WHERE digest = ?",
+                (owner, digest),
+            )
+            self._conn.commit()
+
+    def release(self, owner: str) -> int:
+        """Drop every reference held by owner; returns the number dropped."""
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM blob_refs WHERE owner = ?", (owner,))
+            self._conn.commit()
+        return cur.rowcount
+
+    def refcount(self, digest: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM blob_refs WHERE digest = ?", (digest,)
+            ).fetchone()
+        return int(row[0])
+
+    def gc(self, grace_seconds: float = BLOB_GC_GRACE_SECONDS) -> Dict[str, int]:
+        """Delete blobs with no references, unless put within the grace period."""
+        cutoff = time.time() - grace_seconds
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT digest, ext, size FROM blobs "
+                "WHERE last_put_at < ? AND digest NOT IN (SELECT digest FROM blob_refs)",
+                (cutoff,),
+            ).fetchall()
+        deleted = 0
+        freed = 0
+        for digest, ext, size in rows:
+            try:
+                self.path_for(digest, ext).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as exc:
+                print(f"[WARN] Could not delete blob {digest}: {exc}")
+                continue
+            with self._lock:
+                self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                self._conn.commit()
+            deleted += 1
+            freed += size
+        return {"deleted": deleted, "bytesFreed": freed}
+
+    def stats(self) -> Dict[str, Any]:
+        """Stored vs. logical bytes (what per-put copies would have used)."""
+        with self._lock:
+            blobs, stored, logical, puts = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(size * puts), 0), "
+                "COALESCE(SUM(puts), 0) FROM blobs"
+            ).fetchone()
+            refs = self._conn.execute("SELECT COUNT(*) FROM blob_refs").fetchone()[0]
+        return {
+            "blobs": blobs,
+            "puts": puts,
+            "references": refs,
+            "storedBytes": stored,
+            "logicalBytes": logical,
+            "savedBytes": logical - stored,
+            "dedupRatio": round(logical / stored, 3) if stored else None,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+blob_store = BlobStore()
+
+
+__all__ = [
+    "BLOB_DIR",
+    "BlobStore",
+    "blob_store",
+    "file_digest",
+]
@@ -0,0 +1,219 @@
+"""
+Device Inventory Module
+
+In-memory model of attached devices shared by the API server, the run
+manager and the live stream. Android changes arrive through
+`adb track-devices`; iOS (and Android when tracking is unavailable) is
+refreshed by TTL polling. Device properties are probed once per device.
+
+The automation subprocess (main.py / appium_tools) receives a JSON snapshot
+through AUTOMATION_DEVICE_SNAPSHOT instead of shelling out again.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+import subprocess
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import device_probe
+from device_probe import (
+    ADB_PATH,
+    IDEVICE_ID_PATH,
+    list_adb_devices,
+    list_ios_devices,
+    probe_android_device,
+    probe_ios_device,
+)
+
+DEVICE_SNAPSHOT_ENV = "AUTOMATION_DEVICE_SNAPSHOT"
+DEVICE_INVENTORY_TTL = float(os.getenv("AUTOMATION_DEVICE_INVENTORY_TTL", "10"))
+
+
+class DeviceInventory:
+    """Keeps the list of attached devices and their properties fresh."""
+
+    def __init__(self, ttl: float = DEVICE_INVENTORY_TTL) -> None:
+        self.ttl = max(ttl, 0.5)
+        self._android: List[str] = []
+        self._ios: List[str] = []
+        self._properties: Dict[str, Dict[str, Any]] = {}
+        self._refreshed_at: Optional[float] = None
+        self._refresh_lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+        self._tracking = False
+        self._hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._track_events = 0
+
+    def _ensure_started(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._track_adb_devices()),
+            asyncio.create_task(self._poll()),
+        ]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await task
+
+    def _fresh(self) -> bool:
+        return self._refreshed_at is not None and (time.monotonic() - self._refreshed_at) < self.ttl
+
+    async def devices(self) -> List[Dict[str, Any]]:
+        """Attached devices, iOS first, probing only when the cache is stale."""
+        self._ensure_started()
+        if self._fresh():
+            self._hits += 1
+        else:
+            self._misses += 1
+            await self.refresh()
+        return self.snapshot()
+
+    async def adb_serials(self) -> List[str]:
+        await self.devices()
+        return list(self._android)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        ordered = self._ios + self._android
+        return [dict(self._properties[device_id]) for device_id in ordered if device_id in self._properties]
+
+    def snapshot_json(self) -> str:
+        return json.dumps(self.snapshot())
+
+    async def refresh(self) -> None:
+        async with self._refresh_lock:
+            if self._fresh():
+                return
+            if self._tracking:
+                self._ios = await list_ios_devices()
+            else:
+                self._ios, self._android = await asyncio.gather(list_ios_devices(), list_adb_devices())
+            await self._probe_new_devices()
+            self._refreshes += 1
+            self._refreshed_at = time.monotonic()
+
+    async def _probe_new_devices(self) -> None:
+        attached = set(self._ios) | set(self._android)
+        for device_id in list(self._properties):
+            if device_id not in attached:
+                del self._properties[device_id]
+        probes = [probe_ios_device(udid) for udid in self._ios if udid not in self._properties]
+        probes += [probe_android_device(serial) for serial in self._android if serial not in self._properties]
+        if probes:
+            for info in await asyncio.gather(*probes):
+                self._properties[info["id"]] = info
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl)
+            try:
+                self._refreshed_at = None
+                await self.refresh()
+            except Exception as exc:
+                print(f"[WARN] Device inventory refresh failed: {exc}")
+
+    async def _track_adb_devices(self) -> None:
+        """Follow `adb track-devices`; each message is a 4-hex-digit length plus payload."""
+        while True:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    ADB_PATH, "track-devices",
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL,
+                )
+            except (FileNotFoundError, PermissionError, OSError):
+                # No adb: TTL polling covers whatever can be listed
+                return
+            try:
+                assert process.stdout is not None
+                while True:
+                    header = await process.stdout.readexactly(4)
+                    payload = await process.stdout.readexactly(int(header, 16))
+                    listing = "List of devices attached\n" + payload.decode("utf-8", errors="ignore")
+                    self._tracking = True
+                    self._track_events += 1
+                    async with self._refresh_lock:
+                        self._android = device_probe.parse_adb_devices(listing)
+                        await self._probe_new_devices()
+            except (asyncio.IncompleteReadError, ValueError):
+                pass
+            finally:
+                self._tracking = False
+                # Fall back to listing adb devices on the next lookup
+                self._refreshed_at = None
+                with contextlib.suppress(ProcessLookupError):
+                    process.kill()
+                with contextlib.suppress(Exception):
+                    await process.wait()
+            # adb server restarted or exited; retry after a pause
+            await asyncio.sleep(self.ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "devices": len(self._ios) + len(self._android),
+            "tracking": self._tracking,
+            "cacheHits": self._hits,
+            "cacheMisses": self._misses,
+            "hitRate": round(self._hits / lookups, 4) if lookups else None,
+            "refreshes": self._refreshes,
+            "trackEvents": self._track_events,
+            "probeCount": device_probe.command_count(),
+        }
+
+
+_process_platform: Optional[Tuple[str, str]] = None
+
+
+def platform_capabilities() -> Tuple[str, str]:
+    """(platformName, automationName) for Appium in the automation subprocess.
+
+    Uses the snapshot handed over by the API server; when main.py runs on its
+    own, probes once and remembers the answer for the process lifetime.
+    """
+    global _process_platform
+    snapshot = os.getenv(DEVICE_SNAPSHOT_ENV)
+    if snapshot:
+        try:
+            devices = json.loads(snapshot)
+            if any(device.get("deviceType") == "ios" for device in devices):
+                return "iOS", "XCUITest"
+            return "Android", "UiAutomator2"
+        except (TypeError, ValueError, AttributeError):
+            pass
+
+    if _process_platform is None:
+        _process_platform = ("Android", "UiAutomator2")
+        try:
+            result = subprocess.run(
+                [IDEVICE_ID_PATH, "-l"],
+                capture_output=True,
+                text=True,
+                timeout=2
+            )
+            if result.returncode == 0 and result.stdout.strip():
+                _process_platform = ("iOS", "XCUITest")
+        except (FileNotFoundError, subprocess.TimeoutExpired, OSError):
+            pass
+    return _process_platform
+
+
+device_inventory = DeviceInventory()
+
+
+__all__ = [
+    "DEVICE_SNAPSHOT_ENV",
+    "DeviceInventory",
+    "device_inventory",
+    "platform_capabilities",
+]
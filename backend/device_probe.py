@@ -0,0 +1,183 @@
+"""
+Device Probe Module
+
+Non-blocking discovery of attached Android (adb) and iOS (libimobiledevice)
+devices. Every external call goes through asyncio.create_subprocess_exec with
+a timeout, and the properties of one device are fetched concurrently.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Overridable so probing can be driven by fake binaries
+ADB_PATH = os.getenv("ADB_PATH", "adb")
+IDEVICE_ID_PATH = os.getenv("IDEVICE_ID_PATH", "idevice_id")
+IDEVICEINFO_PATH = os.getenv("IDEVICEINFO_PATH", "ideviceinfo")
+
+LIST_TIMEOUT = 3.0
+PROPERTY_TIMEOUT = 2.0
+
+_command_count = 0
+
+
+def command_count() -> int:
+    """Number of probe subprocesses started by this process."""
+    return _command_count
+
+
+async def run_command(args: Sequence[str], timeout: float = PROPERTY_TIMEOUT) -> Optional[str]:
+    """Run a command without blocking the event loop.
+
+    Returns:
+        Stripped stdout on exit code 0, otherwise None (missing binary,
+        timeout, or failure)
+    """
+    global _command_count
+    _command_count += 1
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except (FileNotFoundError, PermissionError, OSError):
+        return None
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        with contextlib.suppress(ProcessLookupError):
+            process.kill()
+        with contextlib.suppress(Exception):
+            await process.wait()
+        return None
+    if process.returncode != 0:
+        return None
+    return stdout.decode("utf-8", errors="ignore").strip()
+
+
+def parse_adb_devices(output: str) -> List[str]:
+    """Serials in the 'device' state from `adb devices` output."""
+    serials = []
+    for line in output.strip().split('\n')[1:]:  # Skip header
+        if line.strip() and '\tdevice' in line:
+            serial = line.split('\t')[0].strip()
+            if serial:
+                serials.append(serial)
+    return serials
+
+
+def parse_wm_size(output: str) -> Optional[Tuple[int, int]]:
+    """Parse `wm size` output (e.g. "Physical size: 1080x2340")."""
+    if "Physical size:" not in output or "x" not in output:
+        return None
+    try:
+        size_part = output.split("Physical size:")[-1].strip()
+        dims = size_part.split("x")
+        if len(dims) != 2:
+            return None
+        width = int(dims[0].strip())
+        height = int(dims[1].strip().split()[0])
+        return width, height
+    except (ValueError, IndexError):
+        return None
+
+
+def is_tablet_size(width: int, height: int) -> bool:
+    # Consider device a tablet if the short side is large (>= 1200)
+    # or the aspect ratio is closer to tablet ratios (<= 1.6)
+    short_side = min(width, height)
+    long_side = max(width, height)
+    aspect_ratio = (long_side / short_side) if short_side else 0
+    return short_side >= 1200 or aspect_ratio <= 1.6
+
+
+async def list_adb_devices() -> List[str]:
+    output = await run_command([ADB_PATH, "devices"], timeout=LIST_TIMEOUT)
+    return parse_adb_devices(output) if output else []
+
+
+async def list_ios_devices() -> List[str]:
+    output = await run_command([IDEVICE_ID_PATH, "-l"], timeout=LIST_TIMEOUT)
+    if not output:
+        return []
+    return [line.strip() for line in output.split('\n') if line.strip()]
+
+
+async def probe_android_device(serial: str) -> Dict[str, Any]:
+    """Model, brand and form factor of one adb device, fetched concurrently."""
+    model, brand, size_output = await asyncio.gather(
+        run_command([ADB_PATH, "-s", serial, "shell", "getprop", "ro.product.model"]),
+        run_command([ADB_PATH, "-s", serial, "shell", "getprop", "ro.product.brand"]),
+        run_command([ADB_PATH, "-s", serial, "shell", "wm", "size"]),
+    )
+    model = model or None
+    brand = brand or None
+    size = parse_wm_size(size_output) if size_output else None
+    full_name = f"{brand} {model}".strip() if brand and model else (model or serial)
+    return {
+        "id": serial,
+        "deviceType": "android",
+        "name": full_name,
+        "model": model,
+        "brand": brand,
+        "screenSize": f"{size[0]}x{size[1]}" if size else None,
+        "isTablet": is_tablet_size(*size) if size else False,
+    }
+
+
+async def probe_ios_device(udid: str) -> Dict[str, Any]:
+    """Name and form factor of one iOS device, fetched concurrently."""
+    name, product_type = await asyncio.gather(
+        run_command([IDEVICEINFO_PATH, "-u", udid, "-k", "DeviceName"]),
+        run_command([IDEVICEINFO_PATH, "-u", udid, "-k", "ProductType"]),
+    )
+    product_type = product_type or ""
+    return {
+        "id": udid,
+        "deviceType": "ios",
+        "name": name or udid,
+        "model": product_type or None,
+        "brand": "Apple",
+        "screenSize": None,
+        "isTablet": "ipad" in product_type.lower(),
+    }
+
+
+async def probe_all_devices() -> List[Dict[str, Any]]:
+    """Probe every attached device (iOS first, then Android) concurrently."""
+    ios_ids, android_ids = await asyncio.gather(list_ios_devices(), list_adb_devices())
+    probes = [probe_ios_device(udid) for udid in ios_ids]
+    probes += [probe_android_device(serial) for serial in android_ids]
+    if not probes:
+        return []
+    return list(await asyncio.gather(*probes))
+
+
+def primary_device_info(devices: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Payload for the run "device" event from a probe result."""
+    if not devices:
+        return {"deviceType": "android", "deviceName": None, "isTablet": False}
+    device = devices[0]
+    return {
+        "deviceType": device["deviceType"],
+        "deviceName": device["name"],
+        "isTablet": device["isTablet"],
+    }
+
+
+__all__ = [
+    "ADB_PATH",
+    "command_count",
+    "list_adb_devices",
+    "list_ios_devices",
+    "parse_adb_devices",
+    "parse_wm_size",
+    "primary_device_info",
+    "probe_all_devices",
+    "probe_android_device",
+    "probe_ios_device",
+    "run_command",
+]
@@ -0,0 +1,255 @@
+"""
+Live Screen Streaming Module
+
+Keeps one long-running `adb exec-out` pipe open per run and splits the PNG
+frames it emits as they arrive. A frame whose pixels have the same exact
+digest as the previous one (its bytes, without Pillow) is dropped. The
+latest frame is held in memory for the multipart (MJPEG-style) endpoint,
+so nothing is written to reports/.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import io
+import struct
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+# ADB_PATH can point at a fake adb that emits canned frames
+from device_probe import ADB_PATH
+from metrics import LIVE_FRAMES
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+LIVE_STREAM_BOUNDARY = "frame"
+
+_FRAMES_PUBLISHED = LIVE_FRAMES.labels("published")
+_FRAMES_UNCHANGED = LIVE_FRAMES.labels("unchanged")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_IEND = b"IEND"
+
+
+class PngStreamParser:
+    """Incrementally splits a byte stream of concatenated PNG files."""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Append data and return every complete PNG frame found so far."""
+        self._buffer.extend(data)
+        frames: List[bytes] = []
+        while True:
+            start = self._buffer.find(PNG_SIGNATURE)
+            if start < 0:
+                # Keep a possible partial signature at the tail
+                del self._buffer[: max(0, len(self._buffer) - len(PNG_SIGNATURE) + 1)]
+                return frames
+            if start:
+                del self._buffer[:start]
+
+            offset = len(PNG_SIGNATURE)
+            end = None
+            while offset + 8 <= len(self._buffer):
+                (length,) = struct.unpack(">I", self._buffer[offset:offset + 4])
+                chunk_type = bytes(self._buffer[offset + 4:offset + 8])
+                chunk_end = offset + 12 + length
+                if chunk_end > len(self._buffer):
+                    break
+                offset = chunk_end
+                if chunk_type == _IEND:
+                    end = chunk_end
+                    break
+            if end is None:
+                return frames
+            frames.append(bytes(self._buffer[:end]))
+            del self._buffer[:end]
+
+
+def frame_hash(frame: bytes) -> str:
+    """Exact digest of a frame's decoded pixels.
+
+    Any pixel change (a typed character, a blinking cursor) gives a new
+    digest; decoding first means two encodings of the same image still
+    compare equal. Without Pillow, or for undecodable data, the PNG bytes
+    are hashed instead.
+    """
+    if PIL_AVAILABLE:
+        try:
+            with Image.open(io.BytesIO(frame)) as img:
+                digest = hashlib.sha1(f"{img.mode}:{img.size}".encode("ascii"))
+                digest.update(img.tobytes())
+                return digest.hexdigest()
+        except Exception:
+            pass
+    return hashlib.sha1(frame).hexdigest()
+
+
+class LiveScreenStream:
+    """Publishes changed device frames from a persistent adb pipe."""
+
+    def __init__(
+        self,
+        serial: Optional[str],
+        interval: float = 0.5,
+        fallback: Optional[Callable[[], Awaitable[Optional[bytes]]]] = None,
+    ) -> None:
+        """Initialize a live stream.
+
+        Args:
+            serial: adb serial to stream from; None uses the fallback capture
+            interval: Seconds between device-side captures
+            fallback: Coroutine returning PNG bytes, used when adb is unavailable
+        """
+        self.serial = serial
+        self.interval = max(interval, 0.05)
+        self._fallback = fallback
+        self._latest: Optional[bytes] = None
+        self._latest_hash: Optional[str] = None
+        self._frame_id = 0
+        self._changed = asyncio.Condition()
+        self._closed = False
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self.frames_seen = 0
+        self.frames_published = 0
+
+    @property
+    def latest(self) -> Optional[bytes]:
+        return self._latest
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> dict:
+        return {
+            "serial": self.serial,
+            "framesSeen": self.frames_seen,
+            "framesPublished": self.frames_published,
+            "framesSkipped": self.frames_seen - self.frames_published,
+        }
+
+    async def publish(self, frame: bytes) -> bool:
+        """Publish a frame unless its pixels match the previous one."""
+        self.frames_seen += 1
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(None, frame_hash, frame)
+        if self._latest_hash is not None and digest == self._latest_hash:
+            _FRAMES_UNCHANGED.inc()
+            return False
+        async with self._changed:
+            self._latest = frame
+            self._latest_hash = digest
+            self._frame_id += 1
+            self.frames_published += 1
+            _FRAMES_PUBLISHED.inc()
+            self._changed.notify_all()
+        return True
+
+    async def frames(self) -> AsyncIterator[bytes]:
+        """Yield the current frame, then every newly published frame."""
+        seen = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._frame_id != seen or self._closed)
+                if self._frame_id == seen:
+                    return
+                seen = self._frame_id
+                frame = self._latest
+            if frame is not None:
+                yield frame
+
+    async def run(self) -> None:
+        """Stream until cancelled or close() is called."""
+        try:
+            while not self._closed:
+                if self.serial:
+                    await self._pump_adb()
+                elif self._fallback is not None:
+                    frame = await self._fallback()
+                    if frame:
+                        await self.publish(frame)
+                    await asyncio.sleep(self.interval)
+                else:
+                    return
+                if not self._closed and self.serial:
+                    # adb pipe dropped (device unplugged, adb restart); back off
+                    await asyncio.sleep(1.0)
+        finally:
+            await self.close()
+
+    async def _pump_adb(self) -> None:
+        script = f"while true; do screencap -p; sleep {self.interval}; done"
+        try:
+            self._process = await asyncio.create_subprocess_exec(
+                ADB_PATH, "-s", self.serial, "exec-out", script,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        except (FileNotFoundError, OSError) as exc:
+            print(f"[WARN] Live stream could not start adb: {exc}")
+            self.serial = None
+            return
+
+        parser = PngStreamParser()
+        assert self._process.stdout is not None
+        try:
+            while True:
+                chunk = await self._process.stdout.read(64 * 1024)
+                if not chunk:
+                    break
+                for frame in parser.feed(chunk):
+                    await self.publish(frame)
+        finally:
+            await self._terminate()
+
+    async def _terminate(self) -> None:
+        process, self._process = self._process, None
+        if process is None or process.returncode is not None:
+            return
+        with contextlib.suppress(ProcessLookupError):
+            process.kill()
+        with contextlib.suppress(Exception):
+            await asyncio.wait_for(process.wait(), timeout=2)
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        await self._terminate()
+        async with self._changed:
+            self._changed.notify_all()
+
+
+async def read_screenshot_file(path: Path) -> Optional[bytes]:
+    """Read a screenshot produced by another tool without blocking the loop."""
+    try:
+        return await asyncio.to_thread(path.read_bytes)
+    except OSError:
+        return None
+
+
+def multipart_chunk(frame: bytes, content_type: str = "image/png") -> bytes:
+    header = (
+        f"--{LIVE_STREAM_BOUNDARY}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(frame)}\r\n\r\n"
+    ).encode("ascii")
+    return header + frame + b"\r\n"
+
+
+__all__ = [
+    "LIVE_STREAM_BOUNDARY",
+    "LiveScreenStream",
+    "PngStreamParser",
+    "frame_hash",
+    "multipart_chunk",
+    "read_screenshot_file",
+]
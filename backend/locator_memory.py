@@ -0,0 +1,236 @@
+"""
+Locator Memory Module
+
+Remembers which fallback locator actually worked for a click, keyed by
+(app package, activity, requested strategy, requested value). The next time
+the same locator is requested on that screen, appium_tools.click() tries the
+learned locator first instead of failing on the original and walking the
+fallback chain again.
+
+Entries expire after AUTOMATION_LOCATOR_MEMORY_TTL seconds, are dropped when
+the app's version changes, and are forgotten as soon as a learned locator
+stops working. Each entry stores how many MCP round-trips its discovery took;
+a hit is credited with that cost minus what the hit itself spent. If the
+database fails (e.g. runs.db stays locked), the memory switches itself off
+for the rest of the process and clicks proceed without it.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+from metrics import LOCATOR_MEMORY, LOCATOR_ROUND_TRIPS_SAVED
+from run_store import RUNS_DB_PATH, connect
+
+LOCATOR_MEMORY_ENABLED = os.getenv("AUTOMATION_LOCATOR_MEMORY", "true").lower() in ("1", "true", "yes")
+LOCATOR_MEMORY_TTL_SECONDS = float(os.getenv("AUTOMATION_LOCATOR_MEMORY_TTL", str(7 * 24 * 3600)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS locator_memory (
+    package TEXT NOT NULL,
+    activity TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    value TEXT NOT NULL,
+    learned_strategy TEXT NOT NULL,
+    learned_value TEXT NOT NULL,
+    app_version TEXT NOT NULL DEFAULT '',
+    cost INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    saved INTEGER NOT NULL DEFAULT 0,
+    learned_at REAL NOT NULL,
+    last_hit_at REAL,
+    PRIMARY KEY (package, activity, strategy, value)
+);
+"""
+
+Key = Tuple[str, str, str, str]
+
+
+class LocatorMemory:
+    """SQLite-backed map from a requested locator to the one that worked."""
+
+    def __init__(
+        self,
+        db_path: Path | str = RUNS_DB_PATH,
+        ttl_seconds: float = LOCATOR_MEMORY_TTL_SECONDS,
+        enabled: bool = LOCATOR_MEMORY_ENABLED,
+    ) -> None:
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # (strategy, value) pairs with any entry, so a click only pays for a
+        # package/activity lookup when there is something to look up
+        self._requested: Optional[Set[Tuple[str, str]]] = None
+        self.hits = 0
+        self.saved = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = connect(self.db_path)
+            conn.executescript(_SCHEMA)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _unavailable(self, exc: sqlite3.Error) -> None:
+        """Stop using the memory after a database error; clicks go on without it."""
+        print(f"[WARN] Locator memory unavailable: {exc}")
+        self.enabled = False
+
+    def _load_requested(self) -> Set[Tuple[str, str]]:
+        if self._requested is None:
+            rows = self._connection().execute("SELECT DISTINCT strategy, value FROM locator_memory").fetchall()
+            self._requested = {(row[0], row[1]) for row in rows}
+        return self._requested
+
+    def knows(self, strategy: str, value: str) -> bool:
+        """True if some screen has a learned locator for this request."""
+        if not self.enabled:
+            return False
+        try:
+            with self._lock:
+                return (strategy, value) in self._load_requested()
+        except sqlite3.Error as exc:
+            self._unavailable(exc)
+            return False
+
+    def lookup(self, key: Key, app_version: str = "") -> Optional[Dict[str, str]]:
+        """Learned locator for key, or None (expired and outdated entries are dropped).
+
+        Args:
+            key: (package, activity, strategy, value) of the requested locator
+            app_version: Current version of the package ("" if unknown)
+
+        Returns:
+            {"strategy", "value"} to try first, or None
+        """
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT learned_strategy, learned_value, app_version, learned_at FROM locator_memory "
+                    "WHERE package = ? AND activity = ? AND strategy = ? AND value = ?",
+                    key,
+                ).fetchone()
+        except sqlite3.Error as exc:
+            self._unavailable(exc)
+            return None
+        if row is None:
+            LOCATOR_MEMORY.labels("miss").inc()
+            return None
+        learned_strategy, learned_value, learned_version, learned_at = row
+        if time.time() - learned_at > self.ttl_seconds:
+            self.forget(key, "expired")
+            return None
+        if app_version and learned_version and app_version != learned_version:
+            self.forget(key, "version_changed")
+            return None
+        return {"strategy": learned_strategy, "value": learned_value}
+
+    def remember(self, key: Key, learned: Dict[str, str], cost: int, app_version: str = "") -> None:
+        """Record the locator that worked for key.
+
+        Args:
+            key: (package, activity, strategy, value) of the requested locator
+            learned: {"strategy", "value"} that succeeded
+            cost: MCP round-trips spent from the failed original to the success
+            app_version: Version of the package ("" if unknown)
+        """
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT INTO locator_memory (package, activity, strategy, value, learned_strategy, "
+                    "learned_value, app_version, cost, learned_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (package, activity, strategy, value) DO UPDATE SET "
+                    "learned_strategy = excluded.learned_strategy, learned_value = excluded.learned_value, "
+                    "app_version = excluded.app_version, cost = excluded.cost, learned_at = excluded.learned_at",
+                    (*key, learned["strategy"], learned["value"], app_version, int(cost), time.time()),
+                )
+                conn.commit()
+                self._load_requested().add((key[2], key[3]))
+        except sqlite3.Error as exc:
+            self._unavailable(exc)
+            return
+        LOCATOR_MEMORY.labels("learned").inc()
+        print(f"[INFO] Learned locator {key[2]}={key[3]} -> {learned['strategy']}={learned['value']} on {key[0]}/{key[1]}")
+
+    def record_hit(self, key: Key, spent: int) -> int:
+        """Credit a successful learned locator; returns the round-trips it saved."""
+        if not self.enabled:
+            return 0
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT cost FROM locator_memory WHERE package = ? AND activity = ? AND strategy = ? AND value = ?",
+                    key,
+                ).fetchone()
+                saved = max(0, int(row[0]) - spent) if row else 0
+                conn.execute(
+                    "UPDATE locator_memory SET hits = hits + 1, saved = saved + ?, last_hit_at = ? "
+                    "WHERE package = ? AND activity = ? AND strategy = ? AND value = ?",
+                    (saved, time.time(), *key),
+                )
+                conn.commit()
+        except sqlite3.Error as exc:
+            self._unavailable(exc)
+            return 0
+        self.hits += 1
+        self.saved += saved
+        LOCATOR_MEMORY.labels("hit").inc()
+        LOCATOR_ROUND_TRIPS_SAVED.inc(saved)
+        return saved
+
+    def forget(self, key: Key, reason: str = "failed") -> None:
+        """Drop the entry for key (it expired, the app changed or it stopped working)."""
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "DELETE FROM locator_memory WHERE package = ? AND activity = ? AND strategy = ? AND value = ?",
+                    key,
+                )
+                conn.commit()
+                # Other screens may still hold the same request
+                self._requested = None
+        except sqlite3.Error as exc:
+            self._unavailable(exc)
+            return
+        LOCATOR_MEMORY.labels(reason).inc()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hits and round-trips saved in this process and across all runs."""
+        totals = {"entries": 0, "hits": 0, "saved": 0}
+        if self.enabled:
+            try:
+                with self._lock:
+                    row = self._connection().execute(
+                        "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(saved), 0) FROM locator_memory"
+                    ).fetchone()
+                totals = {"entries": row[0], "hits": row[1], "saved": row[2]}
+            except sqlite3.Error as exc:
+                self._unavailable(exc)
+        return {"hits": self.hits, "round_trips_saved": self.saved, "all_runs": totals}
+
+
+locator_memory = LocatorMemory()
+
+
+__all__ = [
+    "LOCATOR_MEMORY_ENABLED",
+    "LOCATOR_MEMORY_TTL_SECONDS",
+    "LocatorMemory",
+    "locator_memory",
+]
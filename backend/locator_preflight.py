@@ -0,0 +1,309 @@
+"""
+Locator Preflight Module
+
+Resolves element locators against the last page source instead of the
+device. appium_tools.get_page_source() hands every page source it fetches to
+locator_snapshot, and any MCP call that can change the screen (everything
+outside READ_ONLY_TOOLS, including waits) drops it again, so a snapshot is
+only consulted while it still shows the screen the model chose its locator
+from. The check is off unless AUTOMATION_LOCATOR_PREFLIGHT is set.
+
+click, send_keys, long_press, get_element_text and clear_element call
+resolve() before their request:
+- found: the element is on screen; a text/xpath/class locator is rewritten
+  to the element's resource-id (or content-desc) when that finds the same
+  element, so the device does an id lookup instead of an XPath scan
+- missing: nothing on screen matches; the tool fails at once (with similar
+  elements as hints) instead of after the server's implicit wait. Screens
+  also change on their own (loading, animations), so this is only trusted
+  for a snapshot younger than PREFLIGHT_FAST_FAIL_SECONDS; an older one
+  reports unknown
+- unknown: no snapshot, an iOS tree, or an XPath too complex to evaluate
+  here; the locator is sent unchanged
+
+Only simple XPath is evaluated: //tag, //tag[@attr='v'],
+//tag[contains(@attr, 'v')], optionally wrapped as (...)[n]. These become
+lookups in an index of the snapshot built on first use.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from metrics import LOCATOR_PREFLIGHT
+from timing import step_timer
+
+LOCATOR_PREFLIGHT_ENABLED = os.getenv("AUTOMATION_LOCATOR_PREFLIGHT", "false").lower() in ("1", "true", "yes")
+# Snapshots older than this are not trusted even if no action ran since
+PREFLIGHT_MAX_AGE_SECONDS = float(os.getenv("AUTOMATION_PREFLIGHT_MAX_AGE", "60"))
+# A locator missing from the snapshot only fails fast within this window
+PREFLIGHT_FAST_FAIL_SECONDS = float(os.getenv("AUTOMATION_PREFLIGHT_FAST_FAIL_AGE", "3"))
+
+# MCP tools that return at once and leave the screen as it was (anything else,
+# waits included, drops the snapshot)
+READ_ONLY_TOOLS = frozenset({
+    "get_page_source", "get_element_text", "get_current_package_activity", "get_orientation", "get_battery_info", "get_contexts",
+    "is_app_installed", "take_screenshot", "screenshot", "extract-text", "get_perception_summary",
+})
+
+# (//tag[predicate])[n] with one @attr='v' or contains(@attr, 'v') predicate
+_SIMPLE_XPATH_PATTERN = re.compile(
+    r"""^(?P<open>\()?//(?P<tag>[\w.$*]+)"""
+    r"""(?:\[\s*(?:@(?P<eq_attr>[\w-]+)\s*=\s*(?P<eq_q>['"])(?P<eq_value>.*?)(?P=eq_q)"""
+    r"""|contains\(\s*@(?P<c_attr>[\w-]+)\s*,\s*(?P<c_q>['"])(?P<c_value>.*?)(?P=c_q)\s*\))\s*\])?"""
+    r"""(?(open)\)\[(?P<index>\d+)\])$"""
+)
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_MAX_SUGGESTIONS = 3
+
+
+def _normalize(value: str) -> str:
+    return _WHITESPACE_PATTERN.sub("", value or "").lower()
+
+
+@dataclass
+class Resolution:
+    """Outcome of resolving one locator against the snapshot."""
+
+    status: str  # "found", "missing" or "unknown"
+    strategy: str
+    value: str
+    requested: Tuple[str, str]
+    suggestions: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def rewritten(self) -> bool:
+        return self.status == "found" and (self.strategy, self.value) != self.requested
+
+
+class _SnapshotIndex:
+    """Elements of one page source in document order, indexed by attribute."""
+
+    def __init__(self, root: ET.Element) -> None:
+        self.elements: List[Dict[str, str]] = []
+        self.by_attr: Dict[Tuple[str, str], List[int]] = {}
+        for elem in root.iter():
+            if elem is root:
+                continue
+            attrs = dict(elem.attrib)
+            attrs["#tag"] = elem.tag
+            position = len(self.elements)
+            self.elements.append(attrs)
+            for name in ("#tag", "resource-id", "content-desc", "text", "class"):
+                value = attrs.get(name)
+                if value:
+                    self.by_attr.setdefault((name, value), []).append(position)
+
+    def equals(self, attr: str, value: str) -> List[int]:
+        return self.by_attr.get((attr, value), [])
+
+    def contains(self, attr: str, value: str) -> List[int]:
+        return [
+            position for position, attrs in enumerate(self.elements)
+            if value in (attrs.get(attr) or "")
+        ]
+
+
+class LocatorSnapshot:
+    """Last page source of the session, for resolving locators without the device."""
+
+    def __init__(
+        self,
+        enabled: bool = LOCATOR_PREFLIGHT_ENABLED,
+        max_age_seconds: float = PREFLIGHT_MAX_AGE_SECONDS,
+        fast_fail_seconds: float = PREFLIGHT_FAST_FAIL_SECONDS,
+    ) -> None:
+        self.enabled = enabled
+        self.max_age_seconds = max_age_seconds
+        self.fast_fail_seconds = fast_fail_seconds
+        self._lock = threading.Lock()
+        self._xml: Optional[str] = None
+        self._captured_at = 0.0
+        self._index: Optional[_SnapshotIndex] = None
+        self._index_failed = False
+
+    def update(self, xml_text: str) -> None:
+        """Store a freshly fetched page source (indexed on first resolve())."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._xml = xml_text if isinstance(xml_text, str) and xml_text.lstrip().startswith("<") else None
+            self._captured_at = time.monotonic()
+            self._index = None
+            self._index_failed = False
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._xml = None
+            self._index = None
+
+    def note_tool(self, tool: str) -> None:
+        """Drop the snapshot after a call that may have changed the screen."""
+        if self._xml is not None and tool not in READ_ONLY_TOOLS:
+            self.invalidate()
+
+    def _current_index(self) -> Tuple[Optional[_SnapshotIndex], float]:
+        """Index of the snapshot (None if there is none usable) and its age."""
+        with self._lock:
+            age = time.monotonic() - self._captured_at
+            if self._xml is None or age > self.max_age_seconds:
+                return None, age
+            if self._index is None and not self._index_failed:
+                try:
+                    root = ET.fromstring(self._xml)
+                except ET.ParseError:
+                    root = None
+                # Only UiAutomator2 trees use the attribute names matched here
+                if root is None or root.tag != "hierarchy":
+                    self._index_failed = True
+                else:
+                    self._index = _SnapshotIndex(root)
+            return self._index, age
+
+    def resolve(self, strategy: str, value: str) -> Resolution:
+        """Check a locator against the snapshot (see the module docstring).
+
+        Args:
+            strategy: Locator strategy as passed to the MCP tool
+            value: Locator value
+
+        Returns:
+            Resolution with the locator to send (rewritten when found)
+        """
+        resolution = Resolution("unknown", strategy, value, (strategy, value))
+        if not self.enabled or not strategy or not value:
+            return resolution
+        with step_timer.span("preflight"):
+            index, age = self._current_index()
+            if index is None:
+                return resolution
+            matches = self._matches(index, strategy.lower(), value)
+            if matches is None or (not matches and age > self.fast_fail_seconds):
+                return resolution
+            if not matches:
+                resolution.status = "missing"
+                resolution.suggestions = self._suggestions(index, value if strategy.lower() != "xpath" else self._xpath_value(value))
+            else:
+                resolution.status = "found"
+                resolution.strategy, resolution.value = self._best_locator(index, matches[0], strategy, value)
+
+        LOCATOR_PREFLIGHT.labels("rewritten" if resolution.rewritten else resolution.status).inc()
+        if resolution.status == "missing":
+            step_timer.count("preflight_fast_fails")
+        elif resolution.rewritten:
+            step_timer.count("preflight_rewrites")
+        return resolution
+
+    @staticmethod
+    def _matches(index: _SnapshotIndex, strategy: str, value: str) -> Optional[List[int]]:
+        """Positions the device would find, in order; None if not decidable here."""
+        if strategy == "id":
+            found = index.equals("resource-id", value)
+            if not found and ":id/" not in value:
+                found = [
+                    position for position, attrs in enumerate(index.elements)
+                    if (attrs.get("resource-id") or "").endswith(":id/" + value)
+                ]
+            return found
+        if strategy in ("accessibility_id", "accessibility id", "content-desc", "content_desc"):
+            if len(value) > 80:
+                # The server clicks long descriptions by a 60-character prefix
+                return index.contains("content-desc", value[:60])
+            return index.equals("content-desc", value)
+        if strategy == "text":
+            # Same as the server: contains(@text, v) or contains(@content-desc, v)
+            found = set(index.contains("text", value)) | set(index.contains("content-desc", value))
+            return sorted(found)
+        if strategy in ("class_name", "class name"):
+            return index.equals("#tag", value)
+        if strategy == "xpath":
+            match = _SIMPLE_XPATH_PATTERN.match(value.strip())
+            if not match:
+                return None
+            tag = match.group("tag")
+            if match.group("eq_attr"):
+                found = index.equals(match.group("eq_attr"), match.group("eq_value"))
+            elif match.group("c_attr"):
+                found = index.contains(match.group("c_attr"), match.group("c_value"))
+            else:
+                found = list(range(len(index.elements)))
+            if tag != "*":
+                found = [position for position in found if index.elements[position]["#tag"] == tag]
+            if match.group("index"):
+                nth = int(match.group("index"))
+                found = found[nth - 1:nth] if nth >= 1 else []
+            return found
+        return None
+
+    @staticmethod
+    def _best_locator(index: _SnapshotIndex, position: int, strategy: str, value: str) -> Tuple[str, str]:
+        """resource-id or content-desc that finds the element at position first."""
+        if strategy.lower() in ("id", "accessibility_id", "accessibility id"):
+            return strategy, value
+        attrs = index.elements[position]
+        resource_id = attrs.get("resource-id")
+        if resource_id and index.equals("resource-id", resource_id)[0] == position:
+            return "id", resource_id
+        content_desc = attrs.get("content-desc")
+        if content_desc and len(content_desc) <= 80 and index.equals("content-desc", content_desc)[0] == position:
+            return "accessibility_id", content_desc
+        return strategy, value
+
+    @staticmethod
+    def _xpath_value(xpath: str) -> str:
+        match = _SIMPLE_XPATH_PATTERN.match(xpath.strip())
+        if match:
+            return match.group("eq_value") or match.group("c_value") or ""
+        return ""
+
+    @staticmethod
+    def _suggestions(index: _SnapshotIndex, target: str) -> List[Tuple[str, str]]:
+        """Locators of elements whose id, text or description resembles target."""
+        needle = _normalize(target.rsplit(":id/", 1)[-1])
+        suggestions: List[Tuple[str, str]] = []
+        if not needle:
+            return suggestions
+        for attrs in index.elements:
+            for attr, strategy in (("resource-id", "id"), ("content-desc", "accessibility_id"), ("text", "text")):
+                attr_value = attrs.get(attr) or ""
+                candidate = _normalize(attr_value.rsplit(":id/", 1)[-1])
+                if len(candidate) < 3 or (needle not in candidate and candidate not in needle):
+                    continue
+                if (strategy, attr_value) not in suggestions:
+                    suggestions.append((strategy, attr_value))
+                    break
+            if len(suggestions) >= _MAX_SUGGESTIONS:
+                break
+        return suggestions
+
+
+def missing_element_error(strategy: str, value: str, resolution: Resolution) -> str:
+    """Error text for a locator the snapshot ruled out."""
+    message = (
+        f"Element with selector '{value}' (strategy: {strategy}) not found in the current screen "
+        f"(checked against the page source captured moments ago, with no action since, without a device call)."
+    )
+    if resolution.suggestions:
+        hints = ", ".join(f"{strategy_name}='{hint}'" for strategy_name, hint in resolution.suggestions)
+        message += f" Similar elements on screen: {hints}."
+    return message
+
+
+locator_snapshot = LocatorSnapshot()
+
+
+__all__ = [
+    "LOCATOR_PREFLIGHT_ENABLED",
+    "LocatorSnapshot",
+    "PREFLIGHT_FAST_FAIL_SECONDS",
+    "PREFLIGHT_MAX_AGE_SECONDS",
+    "READ_ONLY_TOOLS",
+    "Resolution",
+    "locator_snapshot",
+    "missing_element_error",
+]
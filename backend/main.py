@@ -12,13 +12,13 @@ import json
 import boto3
 import os
 import requests
-import os
 import time
-import re
 import sys
 import signal
 import atexit
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from xml.etree import ElementTree as ET
 from botocore.exceptions import ClientError
 
 # Fix Windows console encoding issues
@@ -50,11 +50,38 @@ def safe_print(*args, **kwargs):
 from appium_tools import (
     initialize_appium_session,
     get_page_source,
-    get_perception_summary,
+    start_session_monitor,
     available_functions
 )
 from prompts import get_system_prompt, get_app_package_suggestions
-from reports import TestReport
+from reports import REPORT_SNAPSHOT_EVERY, TestReport
+from device_inventory import platform_capabilities
+from blob_store import blob_store
+from ocr_reader import ocr_reader, present_terms
+from patterns import (
+    GOAL_ADD_TO_CART_PATTERN,
+    GOAL_PASSWORD_PATTERN,
+    GOAL_USERNAME_PATTERN,
+    LEADING_ARTICLE_PATTERN,
+    PLAN_ENUMERATED_STEP_PATTERN,
+    PLAN_JSON_ARRAY_PATTERN,
+    STEP_CLICK_TARGET_PATTERN,
+    STEP_TYPED_TEXT_PATTERN,
+    VALIDATION_PATTERNS,
+    XML_CONTENT_DESC_PATTERN,
+    XML_IMPORTANT_ELEMENT_PATTERNS,
+    XML_NOISE_ATTRS_PATTERN,
+    XML_TAG_NAME_PATTERN,
+    XML_TEXTVIEW_TEXT_PATTERN,
+    XML_TEXT_ATTR_PATTERN,
+)
+from page_identity import OCR_PAGE_LABELS, page_identity_cache, screen_fingerprint
+from plan_tracker import PlanTracker, is_completion_page
+from retry_policy import execute_with_policy
+from screen_history import ScreenHistory
+from session_health import is_session_crashed_error, session_monitor
+from metrics import FAILURE_RECOVERY, LLM_LATENCY, LLM_RETRIES, PAGE_SOURCE_BYTES, metrics_marker
+from timing import step_timer, timed, timed_sleep
 from llm_tools import tools_list_claude
 
 
@@ -91,6 +118,19 @@ except Exception as e:
 
 print(f"--- [BOT] Connecting to MCP Server at: {MCP_SERVER_URL} ---")
 
+# Bound once so recording a sample is a plain update
+_LLM_OK = LLM_LATENCY.labels("ok")
+_LLM_ERROR = LLM_LATENCY.labels("error")
+_PAGE_SOURCE_RAW = PAGE_SOURCE_BYTES.labels("raw")
+_PAGE_SOURCE_COMPRESSED = PAGE_SOURCE_BYTES.labels("compressed")
+
+
+def emit_metrics():
+    """Hand samples recorded since the last call to the runner."""
+    marker = metrics_marker()
+    if marker:
+        print(marker, flush=True)
+
 # Check if MCP server is running
 def check_mcp_server_health():
     """Check if the MCP server is running and accessible."""
@@ -165,10 +205,17 @@ def invoke_bedrock_with_retry(bedrock_client, request_body, model_id, max_retrie
     
     for attempt in range(max_retries + 1):
         try:
-            response = bedrock_client.invoke_model(
-                body=json.dumps(request_body),
-                modelId=model_id
-            )
+            started = time.perf_counter()
+            try:
+                with step_timer.span("llm"):
+                    response = bedrock_client.invoke_model(
+                        body=json.dumps(request_body),
+                        modelId=model_id
+                    )
+            except Exception:
+                _LLM_ERROR.observe(time.perf_counter() - started)
+                raise
+            _LLM_OK.observe(time.perf_counter() - started)
             return response
         except ClientError as e:
             error_code = e.response.get('Error', {}).get('Code', '')
@@ -184,7 +231,9 @@ def invoke_bedrock_with_retry(bedrock_client, request_body, model_id, max_retrie
                 delay = base_delay * (2 ** attempt)  # 2s, 4s, 8s, ...
                 print(f"[WARN]  Bedrock API error (attempt {attempt + 1}/{max_retries + 1}): {error_code}")
                 print(f"[WAIT] Retrying in {delay} seconds...")
-                time.sleep(delay)
+                step_timer.count("llm_retries")
+                LLM_RETRIES.inc()
+                timed_sleep(delay)
             else:
                 # Non-retryable error or max retries reached
                 if not is_retryable:
@@ -203,6 +252,7 @@ def invoke_bedrock_with_retry(bedrock_client, request_body, model_id, max_retrie
     raise last_exception if last_exception else Exception("Failed to invoke Bedrock API")
 
 
+@timed("xml_compress")
 def compress_xml(xml_text: str) -> str:
     """Compress XML by removing unnecessary attributes to reduce token usage.
     
@@ -220,48 +270,12 @@ def compress_xml(xml_text: str) -> str:
     
     Expected reduction: 50-70% of XML size.
     """
-    import re
-    
-    # Remove unnecessary attributes
-    # Pattern: attribute="value" or attribute='value'
-    unnecessary_attrs = [
-        r'\s+index="[^"]*"',
-        r'\s+instance="[^"]*"',
-        r'\s+package="[^"]*"',
-        r'\s+checkable="[^"]*"',
-        r'\s+checked="[^"]*"',
-        r'\s+enabled="[^"]*"',
-        r'\s+focusable="[^"]*"',
-        r'\s+focused="[^"]*"',
-        r'\s+long-clickable="[^"]*"',
-        r'\s+password="[^"]*"',
-        r'\s+scrollable="[^"]*"',
-        r'\s+selected="[^"]*"',
-        r'\s+displayed="[^"]*"',
-        r'\s+a11y-important="[^"]*"',
-        r'\s+screen-reader-focusable="[^"]*"',
-        r'\s+drawing-order="[^"]*"',
-        r'\s+showing-hint="[^"]*"',
-        r'\s+text-entry-key="[^"]*"',
-        r'\s+dismissable="[^"]*"',
-        r'\s+a11y-focused="[^"]*"',
-        r'\s+heading="[^"]*"',
-        r'\s+live-region="[^"]*"',
-        r'\s+context-clickable="[^"]*"',
-        r'\s+content-invalid="[^"]*"',
-    ]
-    
-    compressed = xml_text
-    for pattern in unnecessary_attrs:
-        compressed = re.sub(pattern, '', compressed, flags=re.IGNORECASE)
-    
-    # Remove clickable="false" and editable="false" (only keep if true)
-    compressed = re.sub(r'\s+clickable="false"', '', compressed, flags=re.IGNORECASE)
-    compressed = re.sub(r'\s+editable="false"', '', compressed, flags=re.IGNORECASE)
-    
-    # Remove empty resource-id
-    compressed = re.sub(r'\s+resource-id=""', '', compressed)
+    # One pass over the page source for all dropped attributes
+    compressed = XML_NOISE_ATTRS_PATTERN.sub('', xml_text)
     
+    # Character counts; page source is almost entirely ASCII
+    _PAGE_SOURCE_RAW.observe(len(xml_text))
+    _PAGE_SOURCE_COMPRESSED.observe(len(compressed))
     return compressed
 
 
@@ -273,9 +287,6 @@ def get_xml_diff(previous_xml: str, current_xml: str) -> str:
     Returns:
         Diff XML string with only changed elements, or full XML if too different
     """
-    import re
-    from xml.etree import ElementTree as ET
-    
     try:
         # Parse both XMLs
         try:
@@ -342,35 +353,32 @@ def truncate_xml(xml_text: str, max_length: int = 40000) -> str:
         return xml_text
     
     # Try to extract and preserve important elements before truncating
-    import re
-    
     # Find all elements with text or interactive attributes
     # Priority: elements with product names, buttons, and interactive elements
-    important_patterns = [
-        r'<[^>]*text="[^"]*(?:bike|light|backpack|cart|add|product|sauce)[^"]*"[^>]*>',  # Elements with product-related text (case-insensitive)
-        r'<[^>]*text="[^"]*"[^>]*>',  # All elements with text
-        r'<[^>]*clickable="true"[^>]*>',  # Clickable elements
-        r'<[^>]*content-desc="[^"]*"[^>]*>',  # Elements with content-desc
-        r'<[^>]*resource-id="[^"]*(?:button|cart|add|product)[^"]*"[^>]*>',  # Button/cart-related resource IDs
-        r'<[^>]*resource-id="[^"]*"[^>]*>',  # All elements with resource-id
-    ]
-    
     important_elements = []
-    for pattern in important_patterns:
-        matches = re.finditer(pattern, xml_text, re.IGNORECASE)
-        for match in matches:
+    seen_elements = set()
+    # Closing tag -> position from which it is known to be absent (Android
+    # elements are self-closing, so "</android>" is searched for once, not per match)
+    end_tag_absent_from = {}
+    for pattern in XML_IMPORTANT_ELEMENT_PATTERNS:
+        for match in pattern.finditer(xml_text):
             # Get the full element including its closing tag
             start = match.start()
             # Find the closing tag
-            tag_name = re.search(r'<(\w+)', match.group()).group(1) if re.search(r'<(\w+)', match.group()) else None
-            if tag_name:
+            tag_match = XML_TAG_NAME_PATTERN.search(match.group())
+            if tag_match:
                 # Try to find the closing tag (simplified - assumes well-formed XML)
-                end_tag = f"</{tag_name}>"
+                end_tag = f"</{tag_match.group(1)}>"
+                if start >= end_tag_absent_from.get(end_tag, len(xml_text) + 1):
+                    continue
                 end_pos = xml_text.find(end_tag, start)
-                if end_pos != -1:
-                    element = xml_text[start:end_pos + len(end_tag)]
-                    if element not in important_elements:
-                        important_elements.append(element)
+                if end_pos == -1:
+                    end_tag_absent_from[end_tag] = start
+                    continue
+                element = xml_text[start:end_pos + len(end_tag)]
+                if element not in seen_elements:
+                    seen_elements.add(element)
+                    important_elements.append(element)
     
     # If we found important elements, include them
     if important_elements:
@@ -578,14 +586,9 @@ def parse_enumerated_plan_from_text(text: str) -> list:
     if not text:
         return []
 
-    plan_pattern = re.compile(
-        r"^\s*(?:step\s*)?(\d+)[\.:)\-]\s*(.+)$",
-        re.IGNORECASE
-    )
-
     items = []
     for line in text.splitlines():
-        match = plan_pattern.match(line.strip())
+        match = PLAN_ENUMERATED_STEP_PATTERN.match(line.strip())
         if not match:
             continue
         step_num = int(match.group(1))
@@ -748,27 +751,15 @@ def parse_validation_requirements(user_goal: str) -> dict:
         'video is playing': {'text': 'the video is playing', 'context': '...'}
     }
     """
-    import re
     validation_map = {}
     seen_texts = set()
     
-    # Patterns to detect validation requests (ordered from most specific to least)
-    validation_patterns = [
-        (r'validate\s+(?:whether|if|that)\s+(.+?)(?=,|\.|then|and|$)', 'validate'),
-        (r'verify\s+(?:whether|if|that)\s+(.+?)(?=,|\.|then|and|$)', 'verify'),
-        (r'check\s+(?:whether|if|that)\s+(.+?)(?=,|\.|then|and|$)', 'check'),
-        (r'validate\s+(.+?)(?=,|\.|then|and|$)', 'validate'),
-        (r'verify\s+(.+?)(?=,|\.|then|and|$)', 'verify'),
-        (r'check\s+(.+?)(?=,|\.|then|and|$)', 'check'),
-    ]
-    
-    # Find all validation mentions
-    for pattern, verb in validation_patterns:
-        matches = re.finditer(pattern, user_goal, re.IGNORECASE)
-        for match in matches:
+    # Find all validation mentions (patterns ordered from most specific to least)
+    for pattern, verb in VALIDATION_PATTERNS:
+        for match in pattern.finditer(user_goal):
             validation_text = match.group(1).strip()
             # Normalize text for deduplication (remove leading articles)
-            normalized = re.sub(r'^(the|a|an)\s+', '', validation_text.lower()).strip()
+            normalized = LEADING_ARTICLE_PATTERN.sub('', validation_text.lower()).strip()
             
             # Skip if we've already seen this validation (avoid duplicates)
             if normalized in seen_texts:
@@ -808,14 +799,11 @@ def requires_verification(function_name: str, function_args: dict, user_validati
 def extract_prominent_text_from_xml(xml_text: str) -> list:
     """Extract prominent text elements from XML page source (titles, headers, etc.).
     Prioritizes page titles over menu buttons and navigation elements."""
-    import re
-    
     prominent_texts = []
     menu_nav_texts = []  # Menu/navigation elements (lower priority)
     
     # Extract text from TextView elements (most common for titles/headers)
-    textview_pattern = r'<TextView[^>]*text="([^"]+)"'
-    matches = re.findall(textview_pattern, xml_text, re.IGNORECASE)
+    matches = XML_TEXTVIEW_TEXT_PATTERN.findall(xml_text)
     for match in matches:
         if match and len(match.strip()) > 0:
             text = match.strip()
@@ -827,8 +815,7 @@ def extract_prominent_text_from_xml(xml_text: str) -> list:
                 prominent_texts.append(text)
     
     # Extract content-desc attributes (often used for accessibility labels)
-    content_desc_pattern = r'content-desc="([^"]+)"'
-    matches = re.findall(content_desc_pattern, xml_text, re.IGNORECASE)
+    matches = XML_CONTENT_DESC_PATTERN.findall(xml_text)
     for match in matches:
         if match and len(match.strip()) > 0:
             text = match.strip()
@@ -865,6 +852,29 @@ def extract_prominent_text_from_xml(xml_text: str) -> list:
     return unique_texts[:10]
 
 
+# Page name for the first rule with a keyword in the text (order matters)
+PAGE_NAME_RULES = (
+    # E-commerce patterns
+    ("Order Complete Page", ('thank you', 'order complete', 'checkout: complete')),
+    ("Checkout Overview Page", ('checkout: overview', 'order summary', 'payment')),
+    ("Checkout Information Page", ('checkout', 'first name', 'last name', 'zip code', 'postal code')),
+    ("Cart Page", ('cart', 'shopping cart', 'your cart')),
+    ("Products Page", ('products', 'catalog', 'shop', 'store')),
+    # Authentication patterns
+    ("Login Page", ('login', 'sign in', 'username', 'password')),
+    ("Registration Page", ('sign up', 'register', 'create account')),
+    # Media/Video patterns
+    ("Video Player Page", ('video', 'player', 'play', 'pause', 'youtube')),
+    ("Search Results Page", ('search results', 'results for')),
+    # Settings/Profile patterns
+    ("Settings Page", ('settings', 'preferences', 'configuration')),
+    ("Profile Page", ('profile', 'account', 'user info')),
+    # Generic navigation patterns
+    ("Home Page", ('home', 'main', 'dashboard')),
+    ("Menu Page", ('menu', 'navigation', 'drawer')),
+)
+
+
 def detect_page_name_from_text(text: str, xml_text: str = None) -> str:
     """Detect page name from text identifier or XML content.
     Works generically for any app, not just e-commerce."""
@@ -872,45 +882,9 @@ def detect_page_name_from_text(text: str, xml_text: str = None) -> str:
         return "Unknown Page"
     
     text_lower = text.lower()
-    
-    # Generic page detection patterns (works for any app)
-    # Check for common page patterns first
-    
-    # E-commerce patterns
-    if any(keyword in text_lower for keyword in ['thank you', 'order complete', 'checkout: complete']):
-        return "Order Complete Page"
-    elif any(keyword in text_lower for keyword in ['checkout: overview', 'order summary', 'payment']):
-        return "Checkout Overview Page"
-    elif any(keyword in text_lower for keyword in ['checkout', 'first name', 'last name', 'zip code', 'postal code']):
-        return "Checkout Information Page"
-    elif any(keyword in text_lower for keyword in ['cart', 'shopping cart', 'your cart']):
-        return "Cart Page"
-    elif any(keyword in text_lower for keyword in ['products', 'catalog', 'shop', 'store']):
-        return "Products Page"
-    
-    # Authentication patterns
-    elif any(keyword in text_lower for keyword in ['login', 'sign in', 'username', 'password']):
-        return "Login Page"
-    elif any(keyword in text_lower for keyword in ['sign up', 'register', 'create account']):
-        return "Registration Page"
-    
-    # Media/Video patterns
-    elif any(keyword in text_lower for keyword in ['video', 'player', 'play', 'pause', 'youtube']):
-        return "Video Player Page"
-    elif any(keyword in text_lower for keyword in ['search results', 'results for']):
-        return "Search Results Page"
-    
-    # Settings/Profile patterns
-    elif any(keyword in text_lower for keyword in ['settings', 'preferences', 'configuration']):
-        return "Settings Page"
-    elif any(keyword in text_lower for keyword in ['profile', 'account', 'user info']):
-        return "Profile Page"
-    
-    # Generic navigation patterns
-    elif any(keyword in text_lower for keyword in ['home', 'main', 'dashboard']):
-        return "Home Page"
-    elif any(keyword in text_lower for keyword in ['menu', 'navigation', 'drawer']):
-        return "Menu Page"
+    for page_name, keywords in PAGE_NAME_RULES:
+        if any(keyword in text_lower for keyword in keywords):
+            return page_name
     
     # If no pattern matches, try to extract page name from the text itself
     # Use the text as page name if it looks like a title/header
@@ -922,86 +896,94 @@ def detect_page_name_from_text(text: str, xml_text: str = None) -> str:
     return "Unknown Page"
 
 
-def auto_detect_page_after_navigation(session_id: str = None) -> dict:
-    """Automatically detect page name after navigation action using OCR and XML.
-    Works generically for any app."""
-    import appium_tools
+def _detect_page_from_xml(xml_text: str) -> Optional[dict]:
+    """Page detection from the prominent texts of a page source (None if it has none)."""
+    prominent_texts = extract_prominent_text_from_xml(xml_text) if xml_text else []
     
-    # Wait for page to load (reduced to 0.2s - XML parsing is fast and page usually loads quickly)
-    time.sleep(0.2)
+    # Try to detect page name from prominent texts
+    for text in prominent_texts[:5]:  # Check top 5 prominent texts
+        detected_page = detect_page_name_from_text(text, xml_text)
+        if detected_page != "Unknown Page":
+            return {
+                "detected": True,
+                "page_name": detected_page,
+                "identifier": text,
+                "method": "XML"
+            }
     
-    # Strategy 1: Extract prominent text from XML page source
-    try:
+    # If no pattern matched, use the most prominent text as page name
+    if prominent_texts:
+        top_text = prominent_texts[0]
+        page_name = detect_page_name_from_text(top_text)
+        if page_name == "Unknown Page":
+            # Create page name from the text itself
+            page_name = f"{top_text} Page"
+        return {
+            "detected": True,
+            "page_name": page_name,
+            "identifier": top_text,
+            "method": "XML (prominent text)"
+        }
+    return None
+
+
+def auto_detect_page_after_navigation(session_id: str = None, xml_text: str = None) -> dict:
+    """Automatically detect page name after navigation action.
+    
+    Known screens are recognised by fingerprint (activity + stable resource-ids,
+    cached per app); otherwise the XML text is classified, and only if that finds
+    nothing is the screen OCR'd, once, for all candidate labels.
+    
+    Args:
+        session_id: Appium session for the OCR fallback
+        xml_text: Page source captured after the action (fetched if not given)
+    """
+    import appium_tools
+    
+    if not xml_text:
+        # Wait for page to load (reduced to 0.2s - XML parsing is fast and page usually loads quickly)
+        timed_sleep(0.2)
         xml_result = get_page_source()
         # Handle both string (success) and dict (error) returns
         if isinstance(xml_result, dict):
-            if xml_result.get('success'):
-                xml_text = xml_result.get('value', '')
-            else:
-                xml_text = ''  # Error case, skip XML extraction
+            xml_text = xml_result.get('value', '') if xml_result.get('success') else ''
         else:
-            xml_text = xml_result
-        if xml_text:
-            prominent_texts = extract_prominent_text_from_xml(xml_text)
-        
-        # Try to detect page name from prominent texts
-        for text in prominent_texts[:5]:  # Check top 5 prominent texts
-            detected_page = detect_page_name_from_text(text, xml_text)
-            if detected_page != "Unknown Page":
-                return {
-                    "detected": True,
-                    "page_name": detected_page,
-                    "identifier": text,
-                    "method": "XML"
-                }
-        
-        # If no pattern matched, use the most prominent text as page name
-        if prominent_texts:
-            top_text = prominent_texts[0]
-            page_name = detect_page_name_from_text(top_text)
-            if page_name == "Unknown Page":
-                # Create page name from the text itself
-                page_name = f"{top_text} Page"
-            return {
-                "detected": True,
-                "page_name": page_name,
-                "identifier": top_text,
-                "method": "XML (prominent text)"
-            }
+            xml_text = xml_result or ''
+    
+    context = appium_tools.screen_context() if xml_text else None
+    fingerprint = screen_fingerprint(xml_text, context[1]) if context else None
+    if fingerprint:
+        cached = page_identity_cache.get(context[0], fingerprint, context[2])
+        if cached:
+            return {"detected": True, **cached, "method": f"fingerprint ({cached['method']})"}
+    
+    detection = None
+    try:
+        detection = _detect_page_from_xml(xml_text)
     except Exception as e:
         print(f"[WARN]  XML-based page detection failed: {e}")
     
-    # Strategy 2: Try common page identifiers via OCR (fallback)
-    if session_id:
-        common_identifiers = [
-            "PRODUCTS", "CART", "CHECKOUT", "LOGIN", "SETTINGS", 
-            "HOME", "PROFILE", "SEARCH", "VIDEO", "PLAYER"
-        ]
-        
-        for identifier in common_identifiers:
-            try:
-                result = appium_tools.wait_for_text_ocr(
-                    identifier, 
-                    timeoutSeconds=1, 
-                    sessionId=session_id
-                )
-                if isinstance(result, dict) and result.get('success'):
-                    detected_page = detect_page_name_from_text(identifier)
-                    return {
-                        "detected": True,
-                        "page_name": detected_page,
-                        "identifier": identifier,
-                        "method": "OCR"
-                    }
-            except Exception:
-                continue
+    # OCR fallback: a single read of the screen checked for every candidate label
+    if detection is None and session_id:
+        present = present_terms(ocr_reader.find_texts(OCR_PAGE_LABELS, session_id))
+        if present:
+            detection = {
+                "detected": True,
+                "page_name": detect_page_name_from_text(present[0]),
+                "identifier": present[0],
+                "method": "OCR"
+            }
     
-    return {
-        "detected": False,
-        "page_name": "Unknown Page",
-        "identifier": "None",
-        "method": "None"
-    }
+    if detection is None:
+        return {
+            "detected": False,
+            "page_name": "Unknown Page",
+            "identifier": "None",
+            "method": "None"
+        }
+    if fingerprint:
+        page_identity_cache.put(context[0], fingerprint, detection, context[2])
+    return detection
 
 
 def get_verification_requirement(function_name: str, function_args: dict) -> str:
@@ -1054,245 +1036,27 @@ def get_verification_requirement(function_name: str, function_args: dict) -> str
     )
 
 
-def _is_session_crashed_error(error_msg: str) -> bool:
-    """Check if error indicates session crash."""
-    if not error_msg:
-        return False
-    error_lower = str(error_msg).lower()
-    crash_indicators = [
-        'instrumentation process is not running',
-        'cannot be proxied to uiautomator2',
-        'probably crashed',
-        'session.*crashed',
-        'instrumentation.*crashed'
-    ]
-    return any(indicator in error_lower for indicator in crash_indicators)
-
-
-def _execute_with_retry(function_name: str, function_args: dict, available_functions: dict, expected_inputs: dict, max_retries: int = 3):
+@timed("tool")
+def _execute_with_retry(function_name: str, function_args: dict, available_functions: dict, expected_inputs: dict):
     """
-    Execute an action with retry logic and fallback strategies.
+    Execute an action, retrying it according to its retry policy.
     
     Args:
         function_name: Name of the function to execute
         function_args: Arguments for the function
         available_functions: Dictionary of available functions
         expected_inputs: Dictionary of expected inputs (for validation)
-        max_retries: Maximum number of retry attempts (default: 3)
     
     Returns:
-        Result dictionary from the function call
+        Result dictionary from the function call (see retry_policy for the
+        "retry" details attached to retried calls)
     """
-    import appium_tools
-    
-    # Skip retry for assertions - they should fail immediately
-    if function_name in ('wait_for_element', 'wait_for_text_ocr', 'assert_activity', 'get_page_source'):
-        function_to_call = available_functions[function_name]
-        return function_to_call(**function_args)
-    
-    # Skip retry for launch_app if disabled
+    # Skip launch_app if disabled
     disable_launch = os.getenv('DISABLE_LAUNCH_APP', '1').lower() in ('1', 'true', 'yes')
     if disable_launch and function_name == 'launch_app':
         return {"success": False, "error": "launch_app disabled by configuration (DISABLE_LAUNCH_APP)"}
-    
-    function_to_call = available_functions[function_name]
-    last_error = None
-    
-    def _is_success_result(res: dict | str | None) -> bool:
-        if isinstance(res, dict):
-            success_value = res.get('success')
-            if success_value is True or success_value == True or str(success_value).lower() == 'true':
-                return True
-            if success_value is False or success_value == False or str(success_value).lower() == 'false':
-                return False
-        if isinstance(res, str) and res.startswith("Error:"):
-            return False
-        return True
 
-    for attempt in range(1, max_retries + 1):
-        # First attempt: try original action
-        if attempt == 1:
-            result = function_to_call(**function_args)
-        else:
-            # Subsequent attempts: try fallback strategies
-            print(f"  [RETRY] Attempt {attempt}/{max_retries}: Trying fallback strategy...")
-            
-            # Wait a bit before retry (reduced from 1s to 0.3s for faster retries)
-            time.sleep(0.3)
-            
-            # Fallback strategies based on action type
-            if function_name in ('send_keys', 'ensure_focus_and_type'):
-                # Strategy 1: Try scrolling to element first, then typing
-                strategy = function_args.get('strategy', 'id')
-                value = function_args.get('value', '')
-                text = function_args.get('text', '')
-                
-                if attempt == 2:
-                    # Try scrolling to element first
-                    print(f"  [FALLBACK] Scrolling to element before typing...")
-                    scroll_result = appium_tools.scroll_to_element(strategy=strategy, value=value)
-                    if isinstance(scroll_result, dict) and scroll_result.get('success'):
-                        # Wait a bit after scrolling (reduced from 0.5s to 0.2s)
-                        time.sleep(0.2)
-                        result = function_to_call(**function_args)
-                    else:
-                        # If scroll fails, try ensure_focus_and_type instead of send_keys
-                        if function_name == 'send_keys':
-                            print(f"  [FALLBACK] Trying ensure_focus_and_type instead of send_keys...")
-                            if 'ensure_focus_and_type' in available_functions:
-                                result = available_functions['ensure_focus_and_type'](
-                                    strategy=strategy,
-                                    value=value,
-                                    text=text,
-                                    timeoutMs=10000,  # Longer timeout
-                                    hideKeyboard=False
-                                )
-                            else:
-                                result = function_to_call(**function_args)
-                        else:
-                            result = function_to_call(**function_args)
-                elif attempt == 3:
-                    # Strategy 2: Try clicking first, then typing
-                    print(f"  [FALLBACK] Clicking element first, then typing...")
-                    click_result = appium_tools.click(strategy=strategy, value=value)
-                    if isinstance(click_result, dict) and click_result.get('success'):
-                        time.sleep(0.2)
-                        result = function_to_call(**function_args)
-                    else:
-                        result = function_to_call(**function_args)
-                else:
-                    result = function_to_call(**function_args)
-                    
-            elif function_name == 'click':
-                # Strategy: Try scrolling to element first, then clicking
-                strategy = function_args.get('strategy', 'id')
-                value = function_args.get('value', '')
-                normalized_value = (value or "").strip().lower()
-                
-                if attempt == 2:
-                    print(f"  [FALLBACK] Scrolling to element before clicking...")
-                    scroll_result = appium_tools.scroll_to_element(strategy=strategy, value=value)
-                    if isinstance(scroll_result, dict) and scroll_result.get('success'):
-                        time.sleep(0.2)
-                        result = function_to_call(**function_args)
-                    else:
-                        result = function_to_call(**function_args)
-                elif attempt == 3:
-                    # Strategy: Try waiting for element with longer timeout, then clicking
-                    print(f"  [FALLBACK] Waiting for element with longer timeout, then clicking...")
-                    wait_result = appium_tools.wait_for_element(strategy=strategy, value=value, timeoutMs=10000)
-                    if isinstance(wait_result, dict) and wait_result.get('success'):
-                        time.sleep(0.2)
-                        result = function_to_call(**function_args)
-                    else:
-                        result = function_to_call(**function_args)
-
-                    # If still failing, try alternate selectors (known problematic targets)
-                    if not _is_success_result(result):
-                        alternate_selectors = _get_alternate_click_strategies(strategy, value)
-                        if alternate_selectors:
-                            print("  [FALLBACK] Trying alternate selectors for click target...")
-                            for alt in alternate_selectors:
-                                alt_strategy = alt.get("strategy", strategy)
-                                alt_value = alt.get("value", value)
-                                print(f"    ↳ Trying {alt_strategy}={alt_value}")
-                                alt_function = available_functions.get('click', function_to_call)
-                                alt_result = alt_function(strategy=alt_strategy, value=alt_value)
-                                result = alt_result
-                                if _is_success_result(alt_result):
-                                    break
-
-                    # If still failing, press back to reach parent view (useful for apps already deep in navigation)
-                    if not _is_success_result(result) and normalized_value in {"compose", "compose button", "compose new email"}:
-                        back_function = available_functions.get('press_back_button')
-                        if back_function:
-                            print("  [FALLBACK] Pressing back to exit current view before reattempting click...")
-                            for _ in range(2):
-                                back_function()
-                                time.sleep(0.4)
-                                retry_result = function_to_call(**function_args)
-                                result = retry_result
-                                if _is_success_result(retry_result):
-                                    break
-                else:
-                    result = function_to_call(**function_args)
-            else:
-                # For other actions, just retry with original args
-                result = function_to_call(**function_args)
-        
-        # Check if result indicates success
-        is_success = False
-        if isinstance(result, dict):
-            success_value = result.get('success')
-            if success_value is True or success_value == True or str(success_value).lower() == 'true':
-                is_success = True
-            elif success_value is False or success_value == False or str(success_value).lower() == 'false':
-                last_error = result.get('error', result.get('message', 'Action returned success: false'))
-        elif isinstance(result, str) and result.startswith("Error:"):
-            last_error = result
-        else:
-            # If result is not a dict or string, assume success
-            is_success = True
-        
-        if is_success:
-            if attempt > 1:
-                print(f"  [SUCCESS] Action succeeded on attempt {attempt}")
-            return result
-        
-        # If this was the last attempt, return the failure
-        if attempt == max_retries:
-            print(f"  [FAILED] Action failed after {max_retries} attempts")
-            failure_message = last_error or (result if isinstance(result, str) else 'Action failed after all retry attempts')
-            if isinstance(result, dict):
-                result['success'] = False
-                result['error'] = result.get('error', failure_message)
-                result['retryAttempts'] = max_retries
-                result['failureReason'] = result.get('failureReason', f"Action failed after {max_retries} attempts")
-                return result
-            else:
-                return {
-                    "success": False,
-                    "error": str(failure_message),
-                    "retryAttempts": max_retries,
-                    "failureReason": f"Action failed after {max_retries} attempts"
-                }
-    
-    # Should never reach here, but return last result
-    return result
-
-
-def _get_alternate_click_strategies(original_strategy: str, value: str) -> List[Dict[str, str]]:
-    """Return alternate selectors to try for problematic click targets."""
-    normalized_value = (value or "").strip().lower()
-    alternates: List[Dict[str, str]] = []
-
-    if normalized_value in {"compose", "compose button"}:
-        # Gmail compose floating action button
-        alternates.extend(
-            [
-                {"strategy": "id", "value": "com.google.android.gm:id/compose_button"},
-                {"strategy": "id", "value": "com.google.android.gm:id/compose_button_icon"},
-                {"strategy": "text", "value": "Compose"},
-                {"strategy": "content-desc", "value": "Compose new email"},
-            ]
-        )
-    elif normalized_value in {"new message", "new mail", "new email"}:
-        alternates.append({"strategy": "id", "value": "com.google.android.gm:id/compose_button"})
-
-    # Ensure we include the original selector as a fallback if alternates list ended up empty
-    if not alternates:
-        return []
-
-    # De-duplicate while preserving order
-    seen = set()
-    unique_alternates = []
-    for alt in alternates:
-        key = (alt["strategy"], alt["value"])
-        if key not in seen:
-            seen.add(key)
-            unique_alternates.append(alt)
-
-    return unique_alternates
+    return execute_with_policy(function_name, function_args, available_functions)
 
 
 def format_step_description(function_name: str, function_args: dict) -> str:
@@ -1371,6 +1135,149 @@ def format_step_description(function_name: str, function_args: dict) -> str:
         return action
 
 
+# How a failed action is reflected on:
+#   overlap - separate reflection call on a worker thread, joined just before
+#             the next main LLM call (runs alongside the next observe step)
+#   inline  - no separate call; the main model is asked to reflect in the
+#             text of its next reply
+#   serial  - separate reflection call, waited for immediately
+REFLECTION_MODE = os.getenv('AUTOMATION_REFLECTION_MODE', 'overlap').lower()
+VALIDATION_ACTIONS = ('wait_for_element', 'wait_for_text_ocr', 'assert_activity')
+_reflection_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='reflection')
+_RECOVERY_GUIDANCE = (
+    "Please try a DIFFERENT approach:\n"
+    "1. Check the current page source to see what elements are available\n"
+    "2. Try alternate selectors (if using 'id', try 'content-desc', 'xpath', or 'text')\n"
+    "3. Try finding similar elements (e.g., if 'Add to Cart' not found, look for 'ADD', 'Cart', or product name)\n"
+    "4. Verify you're on the correct page/screen - navigate if needed\n"
+    "5. Try scrolling manually in different directions\n"
+    "6. If element truly doesn't exist, try navigating to a different screen or using alternate paths\n"
+    "7. For text input: ensure you're selecting the EditText element, not a container"
+)
+
+
+def build_reflection_prompt(function_name: str, function_args: dict, error_message: str, visible_text: list) -> str:
+    """Prompt asking what went wrong with a failed action."""
+    expected_outcome = (
+        get_verification_requirement(function_name, function_args)
+        if requires_verification(function_name, function_args)
+        else 'Action should have succeeded'
+    )
+    return f"""Action failed: {function_name} with args {function_args}
+Observed text on screen: {', '.join(visible_text[:15]) if visible_text else 'No text detected'}
+Expected outcome: {expected_outcome}
+Error message: {error_message}
+
+What went wrong? Suggest recovery steps. Provide specific actions to try (e.g., scroll, retry with different selector, check if element is visible)."""
+
+
+def request_reflection(reflection_prompt: str) -> str:
+    """Separate reflection LLM call; runs on the reflection thread."""
+    reflection_request = {
+        "system": "You are a QA testing expert. Analyze test failures and suggest recovery steps.",
+        "messages": [
+            {"role": "user", "content": reflection_prompt}
+        ],
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": 512
+    }
+    reflection_response = invoke_bedrock_with_retry(
+        bedrock_client,
+        reflection_request,
+        BEDROCK_MODEL_ID,
+        max_retries=2,
+        base_delay=0.3  # Optimized: Faster reflection (reduced to 0.3s)
+    )
+    reflection_body = json.loads(reflection_response['body'].read().decode('utf-8'))
+    return next(
+        (block['text'] for block in reflection_body.get('content', []) if block.get('type') == 'text'),
+        "Could not generate reflection."
+    )
+
+
+def fill_failure_message(message: dict, pending: dict, reflection_text: Optional[str] = None,
+                         inline_prompt: Optional[str] = None) -> None:
+    """Set the tool_result message for a failed action.
+
+    Args:
+        message: User message already appended after the assistant's tool_use
+        pending: Failure details (tool_call_id, function_name, function_args, error_message)
+        reflection_text: Result of a separate reflection call, if any
+        inline_prompt: Reflection questions for the main model (inline mode)
+    """
+    function_name = pending['function_name']
+    function_args = pending['function_args']
+    error_message = pending['error_message']
+    result = {"success": False, "error": error_message}
+    if reflection_text is not None:
+        result["reflection"] = reflection_text
+        result["guidance"] = "Try different selectors or approaches based on reflection analysis"
+        text = (
+            f"[REFLECT] REFLECTION MODE:\n{reflection_text}\n\n"
+            f"[ERROR] Action failed: {function_name} with args {function_args}\n"
+            f"Error: {error_message}\n\n"
+            + _RECOVERY_GUIDANCE
+        )
+    elif inline_prompt is not None:
+        result["guidance"] = "Reflect on the failure in your reply, then try a different approach"
+        text = (
+            f"[REFLECT] REFLECTION MODE:\n{inline_prompt}\n\n"
+            f"Start your reply with a short analysis answering the questions above (plain text), "
+            f"then call the next tool.\n\n"
+            + _RECOVERY_GUIDANCE
+        )
+    else:
+        result["guidance"] = "Try different selectors or approaches"
+        text = (
+            f"[ERROR] Action failed: {function_name} with args {function_args}\n"
+            f"Error: {error_message}\n\n"
+            f"Please try a DIFFERENT approach:\n"
+            f"1. Check the current page source to see what elements are available\n"
+            f"2. Try alternate selectors (if using 'id', try 'content-desc', 'xpath', or 'text')\n"
+            f"3. Try finding similar elements\n"
+            f"4. Verify you're on the correct page/screen\n"
+            f"5. Try scrolling manually in different directions"
+        )
+    message["content"] = [
+        {"type": "tool_result", "tool_use_id": pending['tool_call_id'], "content": json.dumps(result)},
+        {"type": "text", "text": text}
+    ]
+
+
+def resolve_reflection(pending: dict, test_report) -> bool:
+    """Wait for a separate reflection call and fill in its message.
+
+    Returns:
+        False if the reflection call failed (the message then carries plain
+        failure guidance)
+    """
+    try:
+        reflection_text = pending['future'].result()
+    except Exception as reflection_error:
+        print(f"[WARN]  Reflection mode failed: {reflection_error}")
+        fill_failure_message(pending['message'], pending)
+        return False
+    print(f"[INFO] Reflection Analysis:\n{reflection_text}\n")
+    if hasattr(test_report, 'add_reflection'):
+        test_report.add_reflection(pending['step'], reflection_text)
+    fill_failure_message(pending['message'], pending, reflection_text=reflection_text)
+    print("="*60 + "\n")
+    return True
+
+
+def record_inline_reflection(pending: dict, response_body: dict, test_report) -> None:
+    """Store the main model's own analysis (inline mode) as the step's reflection."""
+    reflection_text = "\n\n".join(
+        block.get('text', '') for block in response_body.get('content', [])
+        if isinstance(block, dict) and block.get('type') == 'text' and block.get('text')
+    ).strip()
+    if not reflection_text:
+        return
+    print(f"[INFO] Reflection Analysis:\n{reflection_text}\n")
+    if hasattr(test_report, 'add_reflection'):
+        test_report.add_reflection(pending['step'], reflection_text)
+
+
 # Global variable to store test_report for signal handlers
 _test_report_for_signal = None
 
@@ -1425,38 +1332,9 @@ def main(provided_goal: str | None = None):
                     print("--- [TOOL] Attempting to detect device type and initialize Appium session...")
                     print("--- [INFO] Note: You may need to customize capabilities based on your device/app.")
                     
-                    # Detect device type
-                    device_type = "Android"  # Default
-                    automation_name = "UiAutomator2"
-                    
-                    # Try to detect iOS device
-                    try:
-                        import subprocess
-                        idevice_result = subprocess.run(
-                            ["idevice_id", "-l"],
-                            capture_output=True,
-                            text=True,
-                            timeout=2
-                        )
-                        if idevice_result.returncode == 0 and idevice_result.stdout.strip():
-                            device_type = "iOS"
-                            automation_name = "XCUITest"
-                            print("--- [INFO] iOS device detected")
-                    except (FileNotFoundError, subprocess.TimeoutExpired):
-                        # Not iOS, check Android
-                        try:
-                            adb_result = subprocess.run(
-                                ["adb", "devices"],
-                                capture_output=True,
-                                text=True,
-                                timeout=2
-                            )
-                            if adb_result.returncode == 0 and "device" in adb_result.stdout:
-                                device_type = "Android"
-                                automation_name = "UiAutomator2"
-                                print("--- [INFO] Android device detected")
-                        except:
-                            pass
+                    # Detect device type (inventory snapshot from the API server)
+                    device_type, automation_name = platform_capabilities()
+                    print(f"--- [INFO] {device_type} device detected")
                     
                     default_capabilities = {
                         "platformName": device_type,
@@ -1469,7 +1347,7 @@ def main(provided_goal: str | None = None):
                         session_retry_count += 1
                         if session_retry_count < max_session_retries:
                             print(f"--- [WARN]  Failed to initialize session (attempt {session_retry_count}/{max_session_retries}). Retrying...")
-                            time.sleep(2)  # Wait before retry
+                            timed_sleep(2)  # Wait before retry
                             continue
                         else:
                             print("--- [ERROR] Failed to initialize Appium session after multiple attempts.")
@@ -1493,21 +1371,7 @@ def main(provided_goal: str | None = None):
                     print(f"--- [WARN]  Unexpected error checking session: {error_msg}")
                     print("--- [TOOL] Attempting to initialize Appium session anyway...")
                     # Use same device detection logic
-                    device_type = "Android"
-                    automation_name = "UiAutomator2"
-                    try:
-                        import subprocess
-                        idevice_result = subprocess.run(
-                            ["idevice_id", "-l"],
-                            capture_output=True,
-                            text=True,
-                            timeout=2
-                        )
-                        if idevice_result.returncode == 0 and idevice_result.stdout.strip():
-                            device_type = "iOS"
-                            automation_name = "XCUITest"
-                    except:
-                        pass
+                    device_type, automation_name = platform_capabilities()
                     default_capabilities = {
                         "platformName": device_type,
                         "appium:automationName": automation_name,
@@ -1518,7 +1382,7 @@ def main(provided_goal: str | None = None):
                         session_retry_count += 1
                         if session_retry_count < max_session_retries:
                             print(f"--- [WARN]  Failed to initialize session (attempt {session_retry_count}/{max_session_retries}). Retrying...")
-                            time.sleep(2)
+                            timed_sleep(2)
                             continue
                         else:
                             print("--- [ERROR] Failed to initialize Appium session after multiple attempts.")
@@ -1555,21 +1419,7 @@ def main(provided_goal: str | None = None):
                 print(f"--- [WARN]  Unexpected status code {test_response.status_code} when checking session")
                 print("--- [TOOL] Attempting to initialize Appium session...")
                 # Detect device type
-                device_type = "Android"
-                automation_name = "UiAutomator2"
-                try:
-                    import subprocess
-                    idevice_result = subprocess.run(
-                        ["idevice_id", "-l"],
-                        capture_output=True,
-                        text=True,
-                        timeout=2
-                    )
-                    if idevice_result.returncode == 0 and idevice_result.stdout.strip():
-                        device_type = "iOS"
-                        automation_name = "XCUITest"
-                except:
-                    pass
+                device_type, automation_name = platform_capabilities()
                 default_capabilities = {
                     "platformName": device_type,
                     "appium:automationName": automation_name,
@@ -1584,7 +1434,7 @@ def main(provided_goal: str | None = None):
                     session_retry_count += 1
                     if session_retry_count < max_session_retries:
                         print(f"--- [WARN]  Failed to initialize session (attempt {session_retry_count}/{max_session_retries}). Retrying...")
-                        time.sleep(2)
+                        timed_sleep(2)
                         continue
                     else:
                         print("--- [ERROR] Failed to initialize Appium session after multiple attempts.")
@@ -1594,7 +1444,7 @@ def main(provided_goal: str | None = None):
             session_retry_count += 1
             if session_retry_count < max_session_retries:
                 print(f"--- [WARN]  Retrying session initialization (attempt {session_retry_count}/{max_session_retries})...")
-                time.sleep(2)
+                timed_sleep(2)
                 continue
             else:
                 print("--- [ERROR] Failed to check/initialize session after multiple attempts.")
@@ -1610,6 +1460,7 @@ def main(provided_goal: str | None = None):
         return
     
     # Session is now initialized, continue with automation
+    start_session_monitor(getattr(main, '_session_id', None))
     
     if provided_goal:
         user_goal = provided_goal
@@ -1631,6 +1482,9 @@ def main(provided_goal: str | None = None):
     from pathlib import Path
     reports_dir = Path(__file__).resolve().parent / "reports"
     test_report = TestReport(user_goal, reports_dir=str(reports_dir))
+    plan_tracker = PlanTracker()
+    # Page sources shown to the model, referenced from messages and rendered per request
+    screen_history = ScreenHistory(truncate_xml)
     _test_report_for_signal = test_report  # Store for signal handlers (global variable)
     
     # Define signal handler for graceful shutdown
@@ -1644,6 +1498,9 @@ def main(provided_goal: str | None = None):
                 print(f"[STATS] {_test_report_for_signal.get_summary()}")
             except Exception as save_error:
                 print(f"[WARN]  Warning: Failed to save report: {save_error}")
+                # At least get the journaled steps onto disk
+                _test_report_for_signal.flush()
+        emit_metrics()
         sys.exit(0)
     
     # Register signal handlers for graceful shutdown
@@ -1665,8 +1522,12 @@ def main(provided_goal: str | None = None):
                     report_filename = _test_report_for_signal.finalize("cancelled", "Automation stopped")
                     print(f"\n[REPORT] Report: {report_filename}")
                     print(f"[STATS] {_test_report_for_signal.get_summary()}")
+                else:
+                    # Already finalized; make sure nothing is left in the writer queue
+                    _test_report_for_signal.flush()
             except Exception:
                 pass  # Ignore errors in exit handler
+        emit_metrics()
     
     atexit.register(exit_handler)
     
@@ -1711,27 +1572,23 @@ def main(provided_goal: str | None = None):
         if USE_XML_COMPRESSION:
             current_screen_xml = compress_xml(current_screen_xml)
         
-        # Use dynamic XML length based on current message count (initial load)
-        dynamic_xml_limit = get_dynamic_xml_length(1)  # First message
-        truncated_current_xml = truncate_xml(current_screen_xml, dynamic_xml_limit)
-        
         # Store for diff calculation
         _previous_xml = current_screen_xml
         
-        initial_perception_block = f"[XML Page Source (compressed)]:\n{truncated_current_xml}"
+        # Rendered (and cut to the budget) when the request is assembled
+        initial_perception_block = screen_history.add(current_screen_xml, "XML Page Source (compressed)")
     except Exception as e:
         print(f"[WARN]  Failed to get page source: {e}")
-        initial_perception_block = "[Unable to get page source]"
+        initial_perception_block = {"type": "text", "text": "[Unable to get page source]"}
 
     # Control whether to include raw XML in messages (and thereby risk console echoes)
     suppress_xml = os.getenv('SUPPRESS_XML', '').lower() in ('1', 'true', 'yes')
-    initial_xml_block = "[Perception summary omitted]" if suppress_xml else initial_perception_block
+    initial_xml_block = {"type": "text", "text": "[Perception summary omitted]"} if suppress_xml else initial_perception_block
     
     # Extract strict inputs from the goal (e.g., username/password) to prevent auto-correction
-    import re
     expected_inputs = {}
-    m_user = re.search(r"username\s+is\s+([\S]+)", user_goal, re.IGNORECASE)
-    m_pass = re.search(r"password\s+is\s+([\S]+)", user_goal, re.IGNORECASE)
+    m_user = GOAL_USERNAME_PATTERN.search(user_goal)
+    m_pass = GOAL_PASSWORD_PATTERN.search(user_goal)
     if m_user:
         # Strip trailing punctuation (comma, period, etc.) from captured value
         username_value = m_user.group(1).rstrip(',.;')
@@ -1760,7 +1617,11 @@ def main(provided_goal: str | None = None):
     context_note = "\n\n[INFO] CONTEXT: Work with the CURRENT screen state shown above. If the goal mentions something already visible on this screen, proceed directly with that action. You don't need to navigate back or restart from the beginning."
     perception_note = "\n\n[THINK] SCREEN STATE: The screen state above shows XML page source (fast and reliable). XML contains all structured UI elements with their text, types, and coordinates. Always use XML elements when making decisions - they are the primary source of truth for native Android apps."
     messages = [
-        {"role": "user", "content": f"My goal is: '{user_goal}'.{app_suggestions}{strict_note}{validation_note}\n\nHere is the current screen perception summary: {initial_xml_block}\n\n{perception_note}\n\n{context_note}\n\n{initial_guidance}"}
+        {"role": "user", "content": [
+            {"type": "text", "text": f"My goal is: '{user_goal}'.{app_suggestions}{strict_note}{validation_note}\n\nHere is the current screen perception summary:"},
+            initial_xml_block,
+            {"type": "text", "text": f"{perception_note}\n\n{context_note}\n\n{initial_guidance}"},
+        ]}
     ]
 
     # Build tool list for the LLM, optionally removing launch_app entirely
@@ -1769,6 +1630,10 @@ def main(provided_goal: str | None = None):
     else:
         tools_for_model = tools_list_claude
 
+    # Reflection on the last failed action still to be joined / recorded
+    pending_reflection = None
+    failure_started_at = None
+    
     # Cache for page source to avoid redundant calls
     _cached_xml = None
     _cached_xml_timestamp = 0
@@ -1800,46 +1665,15 @@ def main(provided_goal: str | None = None):
                     
                     if inferred_steps:
                         main._planned_steps = inferred_steps
+                        plan_tracker.set_plan(main._planned_steps, test_report.report.get('steps', []))
                 
-                # Check 1: Verify if all planned steps have been executed
-                all_steps_completed = False
-                if hasattr(main, '_planned_steps') and isinstance(main._planned_steps, list) and len(main._planned_steps) > 0:
-                    executed_descriptions = set()
-                    for step_info in test_report.report.get('steps', []):
-                        desc = step_info.get('description', '')
-                        if desc and step_info.get('status') != 'SKIPPED':
-                            executed_descriptions.add(desc.lower().strip())
-                    
-                    # Check if all planned steps have been executed
-                    all_executed = True
-                    for planned_step in main._planned_steps:
-                        plan_desc = planned_step.get('name', planned_step.get('description', planned_step.get('action', '')))
-                        if plan_desc:
-                            plan_desc_normalized = plan_desc.lower().strip()
-                            found_match = False
-                            for exec_desc in executed_descriptions:
-                                plan_keywords = set(plan_desc_normalized.split())
-                                exec_keywords = set(exec_desc.split())
-                                if len(plan_keywords & exec_keywords) >= min(2, len(plan_keywords) // 2):
-                                    found_match = True
-                                    break
-                            if not found_match:
-                                all_executed = False
-                                break
-                    
-                    if all_executed and test_report.report.get("failed_steps", 0) == 0:
-                        all_steps_completed = True
-                
-                # Check 2: Check for completion page indicators (after finish/complete actions)
-                recent_steps = test_report.report.get('steps', [])[-5:]  # Check last 5 steps
-                recent_descriptions = [s.get('description', '').lower() for s in recent_steps]
-                clicked_completion_action = any(
-                    keyword in desc for desc in recent_descriptions 
-                    for keyword in ['finish', 'complete', 'submit', 'done', 'confirm', 'order complete']
-                )
+                # Check 1: All planned steps executed (tracked as steps are added)
+                all_steps_completed = plan_tracker.all_executed and test_report.report.get("failed_steps", 0) == 0
                 
-                if clicked_completion_action or all_steps_completed:
-                    # Check if we're on a completion page
+                # Check 2: Look for a completion page, but only when the tracker says the
+                # plan may be done (all steps matched or a finish/submit-like action just ran)
+                if plan_tracker.should_probe_screen():
+                    plan_tracker.mark_probed()
                     check_xml_result = get_page_source()
                     check_xml = None
                     if isinstance(check_xml_result, str):
@@ -1848,25 +1682,13 @@ def main(provided_goal: str | None = None):
                         check_xml = check_xml_result.get('value', '')
                     
                     if check_xml:
-                        xml_lower = check_xml.lower()
-                        completion_indicators = [
-                            'thank you for your order',
-                            'order complete',
-                            'checkout complete',
-                            'back home',
-                            'thank you',
-                            'complete',
-                            'success',
-                            'done',
-                            'finished'
-                        ]
-                        is_completion_page = any(indicator in xml_lower for indicator in completion_indicators)
+                        on_completion_page = is_completion_page(check_xml)
                         
                         # If all steps completed OR we're on completion page, stop
-                        if all_steps_completed or is_completion_page:
+                        if all_steps_completed or on_completion_page:
                             if all_steps_completed:
                                 print("\n[INFO]  Completion detected: All planned steps have been executed.")
-                            if is_completion_page:
+                            if on_completion_page:
                                 print("\n[INFO]  Completion detected: Reached completion page.")
                             print("[INFO]  All steps from user prompt have been completed successfully.")
                             print("[INFO]  Stopping automation and generating report...")
@@ -1904,15 +1726,16 @@ def main(provided_goal: str | None = None):
                     else:
                         # Check if session crashed
                         error_msg = xml_result.get('error', '')
-                        if 'instrumentation process is not running' in error_msg.lower() or 'cannot be proxied to uiautomator2' in error_msg.lower():
+                        if is_session_crashed_error(error_msg):
                             print("\n[WARN]  Appium session crashed. Attempting recovery...")
                             # Try to recover session
                             import appium_tools
                             if hasattr(appium_tools, '_try_recover_session'):
                                 recovered = appium_tools._try_recover_session()
                                 if recovered:
+                                    if session_monitor.session_id:
+                                        main._session_id = session_monitor.session_id
                                     # Retry getting page source
-                                    time.sleep(2)
                                     xml_result = get_page_source()
                                     if isinstance(xml_result, dict) and xml_result.get('success'):
                                         current_screen_xml = xml_result.get('value', '')
@@ -1953,20 +1776,15 @@ def main(provided_goal: str | None = None):
                 # Use incremental diff if enabled and we have previous XML
                 if USE_XML_DIFF and _previous_xml and _previous_xml != current_screen_xml:
                     diff_xml = get_xml_diff(_previous_xml, current_screen_xml)
-                    dynamic_xml_limit = get_dynamic_xml_length(len(messages) + 1)
-                    truncated_current_xml = truncate_xml(diff_xml, dynamic_xml_limit)
-                    current_perception_block = f"[XML Page Source (diff, compressed)]:\n{truncated_current_xml}"
+                    current_perception_block = screen_history.add(diff_xml, "XML Page Source (diff, compressed)")
                 else:
-                    # Use dynamic XML length based on current message count
-                    dynamic_xml_limit = get_dynamic_xml_length(len(messages) + 1)
-                    truncated_current_xml = truncate_xml(current_screen_xml, dynamic_xml_limit)
-                    current_perception_block = f"[XML Page Source (compressed)]:\n{truncated_current_xml}"
+                    current_perception_block = screen_history.add(current_screen_xml, "XML Page Source (compressed)")
                 
                 # Update previous XML for next diff
                 _previous_xml = current_screen_xml
             except Exception as e:
                 print(f"[WARN]  Failed to get page source: {e}")
-                current_perception_block = "[Unable to get page source]"
+                current_perception_block = {"type": "text", "text": "[Unable to get page source]"}
         else:
             # Use cached XML - screen hasn't changed
             print("\n--- [THINK] OBSERVE: Using cached page source (screen unchanged)...")
@@ -1974,20 +1792,16 @@ def main(provided_goal: str | None = None):
             cached_xml = _cached_xml
             if USE_XML_COMPRESSION:
                 cached_xml = compress_xml(cached_xml)
-            # Use dynamic XML length based on current message count
-            dynamic_xml_limit = get_dynamic_xml_length(len(messages) + 1)
-            truncated_current_xml = truncate_xml(cached_xml, dynamic_xml_limit)
-            current_perception_block = f"[XML Page Source (cached, compressed)]:\n{truncated_current_xml}"
+            current_perception_block = screen_history.add(cached_xml, "XML Page Source (cached, compressed)")
         
         # Add explicit reminder to check XML before scrolling
         # Extract key terms from user goal to help LLM search XML
-        import re
         user_goal_lower = user_goal.lower()
         key_terms = []
         # Look for product names, actions, etc.
         if 'add' in user_goal_lower and 'cart' in user_goal_lower:
             # Extract product name if mentioned
-            product_match = re.search(r'add\s+([^to]+?)\s+to\s+cart', user_goal_lower)
+            product_match = GOAL_ADD_TO_CART_PATTERN.search(user_goal_lower)
             if product_match:
                 key_terms.append(product_match.group(1).strip())
         if 'bike light' in user_goal_lower:
@@ -1995,17 +1809,23 @@ def main(provided_goal: str | None = None):
         if 'backpack' in user_goal_lower:
             key_terms.append('backpack')
         
+        perception_content = [current_perception_block]
         if key_terms:
-            xml_reminder = f"\n\n[CRITICAL REMINDER] Before scrolling, SEARCH the XML above for: {', '.join(key_terms)}. If found, use it directly - DO NOT scroll!"
-            current_perception_block += xml_reminder
+            xml_reminder = f"[CRITICAL REMINDER] Before scrolling, SEARCH the XML above for: {', '.join(key_terms)}. If found, use it directly - DO NOT scroll!"
+            perception_content.append({"type": "text", "text": xml_reminder})
         
         # Add current page source to messages so LLM can see what's on screen
         # This ensures LLM always has the latest screen state before making decisions
         messages.append({
             "role": "user",
-            "content": current_perception_block
+            "content": perception_content
         })
         
+        if pending_reflection is not None and pending_reflection['future'] is not None:
+            # Overlap mode: the reflection ran alongside the observe step above
+            resolve_reflection(pending_reflection, test_report)
+            pending_reflection = None
+        
         print("--- [THINK] THINK: Asking LLM what to do next...")
         
         # Validate messages before sending to API to prevent ValidationException
@@ -2022,33 +1842,10 @@ def main(provided_goal: str | None = None):
             target_messages = MAX_MESSAGES - 2 if current_message_count > 12 else MAX_MESSAGES
             messages = prune_messages(messages, target_messages)
         
-        # Also reduce XML size in existing messages based on current message count
-        # This prevents accumulation of large XML content across multiple messages
+        # Screens are rendered only now: the newest at the budget for this many
+        # messages, older ones at progressively smaller budgets
         dynamic_xml_limit = get_dynamic_xml_length(len(messages))
-        if dynamic_xml_limit < MAX_XML_LENGTH:
-            # Reduce XML size in all messages that contain XML
-            for msg in messages:
-                if isinstance(msg.get('content'), str) and '[XML' in msg['content']:
-                    # Extract and re-truncate XML if present
-                    import re
-                    xml_match = re.search(r'\[XML[^\]]*\]:\s*(.*?)(?=\n\n|\Z)', msg['content'], re.DOTALL)
-                    if xml_match:
-                        xml_content = xml_match.group(1)
-                        if len(xml_content) > dynamic_xml_limit:
-                            truncated_xml = truncate_xml(xml_content, dynamic_xml_limit)
-                            msg['content'] = msg['content'].replace(xml_content, truncated_xml)
-                elif isinstance(msg.get('content'), list):
-                    # Handle list content (tool_result format)
-                    for block in msg['content']:
-                        if isinstance(block, dict) and block.get('type') == 'text':
-                            text_content = block.get('text', '')
-                            if '[XML' in text_content:
-                                xml_match = re.search(r'\[XML[^\]]*\]:\s*(.*?)(?=\n\n|\Z)', text_content, re.DOTALL)
-                                if xml_match:
-                                    xml_content = xml_match.group(1)
-                                    if len(xml_content) > dynamic_xml_limit:
-                                        truncated_xml = truncate_xml(xml_content, dynamic_xml_limit)
-                                        block['text'] = text_content.replace(xml_content, truncated_xml)
+        request_messages = screen_history.render_messages(messages, dynamic_xml_limit)
         
         # Calculate and log input size for debugging
         import json
@@ -2056,7 +1853,7 @@ def main(provided_goal: str | None = None):
         system_prompt_lines = system_prompt.count('\n') + 1
         
         # Calculate messages size
-        messages_json = json.dumps(messages)
+        messages_json = json.dumps(request_messages)
         messages_size = len(messages_json)
         messages_lines = messages_json.count('\n') + 1
         
@@ -2082,7 +1879,7 @@ def main(provided_goal: str | None = None):
         
         request_body = {
             "system": system_prompt,
-            "messages": messages,
+            "messages": request_messages,
             "tools": tools_for_model,
             "tool_choice": {"type": "auto"},
             "anthropic_version": "bedrock-2023-05-31",
@@ -2101,6 +1898,12 @@ def main(provided_goal: str | None = None):
             
             response_body = json.loads(response['body'].read().decode('utf-8'))
             stop_reason = response_body.get('stop_reason')
+            if failure_started_at is not None:
+                FAILURE_RECOVERY.observe(time.perf_counter() - failure_started_at)
+                failure_started_at = None
+            if pending_reflection is not None:
+                record_inline_reflection(pending_reflection, response_body, test_report)
+                pending_reflection = None
             
             # Check for API errors in response
             if 'error' in response_body:
@@ -2131,12 +1934,13 @@ def main(provided_goal: str | None = None):
                         main._raw_plan_text = combined
 
                     if not main._planned_steps:
-                        json_match = re.search(r"\[\s*\{.*?\}\s*\]", combined, re.DOTALL)
+                        json_match = PLAN_JSON_ARRAY_PATTERN.search(combined)
                         if json_match:
                             try:
                                 arr = _json.loads(json_match.group(0))
                                 if isinstance(arr, list):
                                     main._planned_steps = arr
+                                    plan_tracker.set_plan(main._planned_steps, test_report.report.get('steps', []))
                             except Exception:
                                 pass
 
@@ -2144,6 +1948,7 @@ def main(provided_goal: str | None = None):
                         parsed_plan = parse_enumerated_plan_from_text(combined)
                         if parsed_plan:
                             main._planned_steps = parsed_plan
+                            plan_tracker.set_plan(main._planned_steps, test_report.report.get('steps', []))
 
             except Exception:
                 pass
@@ -2364,42 +2169,13 @@ def main(provided_goal: str | None = None):
                                     break
                         
                         # Quick check: If we have planned steps and all are executed, stop
-                        if hasattr(main, '_planned_steps') and isinstance(main._planned_steps, list) and len(main._planned_steps) > 0:
-                            executed_count = len([s for s in test_report.report.get('steps', []) if s.get('status') != 'SKIPPED'])
-                            failed_count = test_report.report.get("failed_steps", 0)
-                            
-                            # If we have executed steps and no failures, check if all planned steps are done
-                            if executed_count >= len(main._planned_steps) and failed_count == 0:
-                                # Verify all planned steps were actually executed (not just count match)
-                                executed_descriptions = set()
-                                for step_info in test_report.report.get('steps', []):
-                                    desc = step_info.get('description', '')
-                                    if desc and step_info.get('status') != 'SKIPPED':
-                                        executed_descriptions.add(desc.lower().strip())
-                                
-                                all_executed = True
-                                for planned_step in main._planned_steps:
-                                    plan_desc = planned_step.get('name', planned_step.get('description', planned_step.get('action', '')))
-                                    if plan_desc:
-                                        plan_desc_normalized = plan_desc.lower().strip()
-                                        found_match = False
-                                        for exec_desc in executed_descriptions:
-                                            plan_keywords = set(plan_desc_normalized.split())
-                                            exec_keywords = set(exec_desc.split())
-                                            if len(plan_keywords & exec_keywords) >= min(2, len(plan_keywords) // 2):
-                                                found_match = True
-                                                break
-                                        if not found_match:
-                                            all_executed = False
-                                            break
-                                
-                                if all_executed:
-                                    print("\n[INFO]  Completion detected: All planned steps have been executed.")
-                                    print("[INFO]  Stopping automation and generating report...")
-                                    report_filename = test_report.finalize("completed")
-                                    print(f"\n[REPORT] Report: {report_filename}")
-                                    print(f"[STATS] {test_report.get_summary()}")
-                                    break
+                        if plan_tracker.all_executed_and_counted and test_report.report.get("failed_steps", 0) == 0:
+                            print("\n[INFO]  Completion detected: All planned steps have been executed.")
+                            print("[INFO]  Stopping automation and generating report...")
+                            report_filename = test_report.finalize("completed")
+                            print(f"\n[REPORT] Report: {report_filename}")
+                            print(f"[STATS] {test_report.get_summary()}")
+                            break
                     except Exception:
                         # If check fails, continue normally
                         pass
@@ -2463,7 +2239,7 @@ def main(provided_goal: str | None = None):
                                     print(f"[TOOL] Auto-injected sessionId: {main._session_id}")
                                 else:
                                     print("[WARN]  Warning: No session ID available for OCR call")
-                            # Retry logic with fallback strategies (max 3 attempts)
+                            # Retry per the tool's retry policy (error-class aware, time-bounded)
                             result = _execute_with_retry(function_name, function_args, available_functions, expected_inputs)
                     else:
                         # Auto-inject sessionId for OCR assert if missing
@@ -2473,7 +2249,7 @@ def main(provided_goal: str | None = None):
                                 print(f"[TOOL] Auto-injected sessionId: {main._session_id}")
                             else:
                                 print("[WARN]  Warning: No session ID available for OCR call")
-                        # Retry logic with fallback strategies (max 3 attempts)
+                        # Retry per the tool's retry policy (error-class aware, time-bounded)
                         result = _execute_with_retry(function_name, function_args, available_functions, expected_inputs)
                     
                     # Check if result indicates an error
@@ -2515,9 +2291,48 @@ def main(provided_goal: str | None = None):
                             # print(f"\n[NAV] Page Identified: {detected_page} (via verification text: '{ocr_value}')")
                             pass
                     
+                    # Take screenshot after meaningful successful actions (not internal operations)
+                    # Screenshots are taken after: click, send_keys, wait_for_text_ocr (when successful)
+                    # Skip: get_page_source, wait_for_element (internal), take_screenshot itself
+                    # Taken before add_step() so the stabilize delay and capture count
+                    # towards this step's timings and the path is saved in the report
+                    meaningful_actions = ('click', 'send_keys', 'wait_for_text_ocr', 'swipe', 'scroll', 'long_press')
+                    screenshot_path = None
+                    screenshot_error = None
+                    if (not is_error and 
+                        function_name in meaningful_actions and 
+                        function_name != 'get_page_source' and
+                        function_name != 'take_screenshot'):
+                        try:
+                            # Add delay before taking screenshot to allow screen to stabilize
+                            # This ensures screenshots capture the final state, not transition states
+                            timed_sleep(0.5)  # 500ms delay for screen to stabilize
+                            
+                            import appium_tools
+                            with step_timer.span("screenshot"):
+                                # Bytes straight from the MCP server, written once into
+                                # the blob store (the runner and report reuse that file)
+                                screenshot_bytes = appium_tools.capture_screenshot()
+                                if screenshot_bytes:
+                                    screenshot_path = blob_store.put_bytes(screenshot_bytes, ".png")["path"]
+                                else:
+                                    screenshot_result = appium_tools.take_screenshot()
+                                    if isinstance(screenshot_result, dict) and screenshot_result.get('success'):
+                                        screenshot_path = screenshot_result.get('screenshotPath') or screenshot_result.get('path')
+                            if screenshot_path and isinstance(result, dict):
+                                # Store screenshot path in result so it gets saved in the report
+                                result['after_screenshot_path'] = screenshot_path
+                        except Exception as e:
+                            screenshot_error = e
+
                     # Record step in report (mark assertions)
                     is_assertion = function_name in ('wait_for_element', 'wait_for_text_ocr', 'assert_activity')
                     test_report.add_step(function_name, function_args, result, not is_error, is_assertion, description=step_description if function_name != 'get_page_source' else None)
+                    plan_tracker.observe(step_description if function_name != 'get_page_source' else None)
+                    if REPORT_SNAPSHOT_EVERY and test_report.report["total_steps"] % REPORT_SNAPSHOT_EVERY == 0:
+                        # Readable mid-run report; written (and coalesced) by the background writer
+                        test_report.save()
+                    emit_metrics()
 
                     # Show Pass/Fail status (skip get_page_source as it's internal)
                     if function_name != 'get_page_source':
@@ -2619,16 +2434,14 @@ def main(provided_goal: str | None = None):
                             success_msg = "Click successful"
                             if step_description:
                                 # Extract element name if available
-                                import re
-                                match = re.search(r'(?:Click|click)\s+(?:on\s+)?([A-Z][a-zA-Z\s]+?)(?:\s+button|\s+element|$)', step_description)
+                                match = STEP_CLICK_TARGET_PATTERN.search(step_description)
                                 if match:
                                     element_name = match.group(1).strip()
                                     success_msg = f"Click on {element_name} successful"
                         elif function_name in ('send_keys', 'ensure_focus_and_type'):
                             success_msg = "Typing successful"
                             if step_description:
-                                import re
-                                match = re.search(r'(?:Type|Enter|type|enter).*?["\']([^"\']+)["\']', step_description)
+                                match = STEP_TYPED_TEXT_PATTERN.search(step_description)
                                 if match:
                                     text_value = match.group(1)
                                     success_msg = f"Typed: {text_value}"
@@ -2646,32 +2459,12 @@ def main(provided_goal: str | None = None):
                             success_msg = "Action completed successfully"
                         print(f"  [SUCCESS] {success_msg}")
                     
-                    # Take screenshot after meaningful successful actions (not internal operations)
-                    # Screenshots are taken after: click, send_keys, wait_for_text_ocr (when successful)
-                    # Skip: get_page_source, wait_for_element (internal), take_screenshot itself
-                    meaningful_actions = ('click', 'send_keys', 'wait_for_text_ocr', 'swipe', 'scroll', 'long_press')
-                    if (not is_error and 
-                        function_name in meaningful_actions and 
-                        function_name != 'get_page_source' and
-                        function_name != 'take_screenshot'):
-                        try:
-                            # Add delay before taking screenshot to allow screen to stabilize
-                            # This ensures screenshots capture the final state, not transition states
-                            time.sleep(0.5)  # 500ms delay for screen to stabilize
-                            
-                            import appium_tools
-                            screenshot_result = appium_tools.take_screenshot()
-                            if isinstance(screenshot_result, dict) and screenshot_result.get('success'):
-                                screenshot_path = screenshot_result.get('screenshotPath') or screenshot_result.get('path')
-                                if screenshot_path:
-                                    # Store screenshot path in result so it gets saved in the report
-                                    if isinstance(result, dict):
-                                        result['after_screenshot_path'] = screenshot_path
-                                    # Print screenshot info in parseable format for real-time emission
-                                    print(f"  [SCREENSHOT] Captured after: {step_description} | PATH: {screenshot_path}")
-                        except Exception as screenshot_error:
-                            # Don't fail the step if screenshot fails
-                            print(f"  [WARN] Could not take screenshot: {screenshot_error}")
+                    if screenshot_path:
+                        # Print screenshot info in parseable format for real-time emission
+                        print(f"  [SCREENSHOT] Captured after: {step_description} | PATH: {screenshot_path}")
+                    elif screenshot_error:
+                        # Don't fail the step if screenshot fails
+                        print(f"  [WARN] Could not take screenshot: {screenshot_error}")
                     
                     # If assertion failed, stop the run immediately
                     if function_name in ('wait_for_element', 'wait_for_text_ocr', 'assert_activity'):
@@ -2722,6 +2515,7 @@ def main(provided_goal: str | None = None):
                     _last_action_was_screen_change = True
                     
                     # Get new screen XML after action and add to messages for next LLM call
+                    post_action_xml = ''
                     try:
                         xml_result = get_page_source()
                         # Handle both string (success) and dict (error) returns
@@ -2736,32 +2530,29 @@ def main(provided_goal: str | None = None):
                         if USE_XML_COMPRESSION:
                             new_screen_xml = compress_xml(new_screen_xml)
                         
+                        post_action_xml = new_screen_xml
                         _cached_xml = new_screen_xml  # Update cache
                         _cached_xml_timestamp = time.time()
                         
                         # Use incremental diff if enabled and we have previous XML
                         if USE_XML_DIFF and _previous_xml and _previous_xml != new_screen_xml:
                             diff_xml = get_xml_diff(_previous_xml, new_screen_xml)
-                            dynamic_xml_limit = get_dynamic_xml_length(len(messages) + 1)
-                            truncated_xml = truncate_xml(diff_xml, dynamic_xml_limit)
+                            updated_screen = screen_history.add(diff_xml, "XML Page Source (updated after action)")
                         else:
-                            # Use dynamic XML length based on current message count
-                            dynamic_xml_limit = get_dynamic_xml_length(len(messages) + 1)
-                            truncated_xml = truncate_xml(new_screen_xml, dynamic_xml_limit)
+                            updated_screen = screen_history.add(new_screen_xml, "XML Page Source (updated after action)")
                         
                         # Update previous XML for next diff
                         _previous_xml = new_screen_xml
                         
                         # Add updated page source to messages so LLM sees the new state after action
                         # This ensures LLM always has the latest screen state
-                        updated_perception = f"[XML Page Source (updated after action)]:\n{truncated_xml}"
                         messages.append({
                             "role": "user",
-                            "content": updated_perception
+                            "content": [updated_screen]
                         })
                     except Exception as xml_error:
                         # If get_page_source fails, use error message as screen state
-                        truncated_xml = f"Error getting page source: {xml_error}"
+                        updated_screen = {"type": "text", "text": f"Error getting page source: {xml_error}"}
                         print(f"[ERROR] Failed to get page source: {xml_error}")
                     
                     if is_error:
@@ -2769,160 +2560,57 @@ def main(provided_goal: str | None = None):
                         print("\n" + "="*60)
                         print("[REFLECT] REFLECTION MODE: Analyzing failure...")
                         print("="*60)
+                        failure_started_at = time.perf_counter()
+                        is_validation = function_name in VALIDATION_ACTIONS
                         
-                        try:
-                            # Get current page source for reflection (fast - XML only)
-                            try:
-                                xml_result = get_page_source()
-                                # Handle both string (success) and dict (error) returns
-                                if isinstance(xml_result, dict):
-                                    if xml_result.get('success'):
-                                        reflection_xml = xml_result.get('value', '')
-                                    else:
-                                        reflection_xml = ''  # Error case, skip text extraction
-                                else:
-                                    reflection_xml = xml_result
-                                # Extract text from XML directly (fast)
-                                import re
-                                text_matches = re.findall(r'text="([^"]+)"', reflection_xml) if reflection_xml else []
-                                visible_text = text_matches[:15]  # Limit for speed
-                            except:
-                                visible_text = []
-                            
-                            # Build reflection prompt
-                            reflection_prompt = f"""Action failed: {function_name} with args {function_args}
-Observed text on screen: {', '.join(visible_text[:15]) if visible_text else 'No text detected'}
-Expected outcome: {get_verification_requirement(function_name, function_args) if requires_verification(function_name, function_args) else 'Action should have succeeded'}
-Error message: {error_message}
-
-What went wrong? Suggest recovery steps. Provide specific actions to try (e.g., scroll, retry with different selector, check if element is visible)."""
-                            
-                            # Call LLM for reflection
-                            reflection_request = {
-                                "system": "You are a QA testing expert. Analyze test failures and suggest recovery steps.",
-                                "messages": [
-                                    {"role": "user", "content": reflection_prompt}
-                                ],
-                                "anthropic_version": "bedrock-2023-05-31",
-                                "max_tokens": 512
-                            }
-                            
-                            reflection_response = invoke_bedrock_with_retry(
-                                bedrock_client,
-                                reflection_request,
-                                BEDROCK_MODEL_ID,
-                                max_retries=2,
-                                base_delay=0.3  # Optimized: Faster reflection (reduced to 0.3s)
-                            )
-                            
-                            reflection_body = json.loads(reflection_response['body'].read().decode('utf-8'))
-                            reflection_text = next(
-                                (block['text'] for block in reflection_body.get('content', []) if block.get('type') == 'text'),
-                                "Could not generate reflection."
-                            )
-                            
-                            print(f"[INFO] Reflection Analysis:\n{reflection_text}\n")
-                            
-                            # Store reflection in report
-                            if hasattr(test_report, 'add_reflection'):
-                                test_report.add_reflection(step_number, reflection_text)
-                            
-                            # Add reflection to messages with guidance to try different approach
-                            reflection_message = (
-                                f"[REFLECT] REFLECTION MODE:\n{reflection_text}\n\n"
-                                f"[ERROR] Action failed: {function_name} with args {function_args}\n"
-                                f"Error: {error_message}\n\n"
-                                f"Please try a DIFFERENT approach:\n"
-                                f"1. Check the current page source to see what elements are available\n"
-                                f"2. Try alternate selectors (if using 'id', try 'content-desc', 'xpath', or 'text')\n"
-                                f"3. Try finding similar elements (e.g., if 'Add to Cart' not found, look for 'ADD', 'Cart', or product name)\n"
-                                f"4. Verify you're on the correct page/screen - navigate if needed\n"
-                                f"5. Try scrolling manually in different directions\n"
-                                f"6. If element truly doesn't exist, try navigating to a different screen or using alternate paths\n"
-                                f"7. For text input: ensure you're selecting the EditText element, not a container"
-                            )
-                            
-                            messages.append({
-                                "role": "user",
-                                "content": [
-                                    {
-                                        "type": "tool_result",
-                                        "tool_use_id": tool_call_id,
-                                        "content": json.dumps({
-                                            "success": False,
-                                            "error": error_message,
-                                            "reflection": reflection_text,
-                                            "guidance": "Try different selectors or approaches based on reflection analysis"
-                                        })
-                                    },
-                                    {
-                                        "type": "text",
-                                        "text": reflection_message
-                                    }
-                                ]
-                            })
-                            
-                            print("="*60 + "\n")
-                            
+                        # Screen text from the capture just taken (no second page-source fetch)
+                        visible_text = XML_TEXT_ATTR_PATTERN.findall(post_action_xml)[:15] if post_action_xml else []
+                        reflection_prompt = build_reflection_prompt(function_name, function_args, error_message, visible_text)
+                        
+                        # Appended now so it follows the tool_use; carries plain failure
+                        # guidance until the reflection (if any) replaces it, so the
+                        # message is complete on every path out of the loop
+                        pending_reflection = {
+                            "step": step_number,
+                            "tool_call_id": tool_call_id,
+                            "function_name": function_name,
+                            "function_args": function_args,
+                            "error_message": error_message,
+                            "message": {"role": "user", "content": []},
+                            "future": None,
+                        }
+                        messages.append(pending_reflection["message"])
+                        
+                        if REFLECTION_MODE == 'inline' and not is_validation:
+                            fill_failure_message(pending_reflection["message"], pending_reflection, inline_prompt=reflection_prompt)
+                        else:
+                            fill_failure_message(pending_reflection["message"], pending_reflection)
+                            pending_reflection["future"] = _reflection_pool.submit(request_reflection, reflection_prompt)
+                            if REFLECTION_MODE == 'serial' or is_validation:
+                                reflected = resolve_reflection(pending_reflection, test_report)
+                                pending_reflection = None
+                                # Only stop if this is an explicit assertion/verification failure (user requested validation)
+                                if is_validation and reflected:
+                                    # These are explicit validations - if they fail, user's requirement wasn't met
+                                    # Add skipped steps before finalizing
+                                    add_skipped_steps_if_needed(test_report, test_report.step_counter)
+                                    report_filename = test_report.finalize("error", f"Validation failed: {error_message}")
+                                    print(f"\n[WARN]  Test stopped at Step {step_number}. Validation requirement not met.")
+                                    print(f"[REPORT] Report: {report_filename}")
+                                    print(f"[STATS] {test_report.get_summary()}")
+                                    break
+                        
+                        if not is_validation:
                             # Don't stop immediately - give LLM a chance to try different approach
-                            # Only stop if this is an explicit assertion/verification failure (user requested validation)
-                            if function_name in ('wait_for_element', 'wait_for_text_ocr', 'assert_activity'):
-                                # These are explicit validations - if they fail, user's requirement wasn't met
-                                # Add skipped steps before finalizing
-                                add_skipped_steps_if_needed(test_report, test_report.step_counter)
-                                report_filename = test_report.finalize("error", f"Validation failed: {error_message}")
-                                print(f"\n[WARN]  Test stopped at Step {step_number}. Validation requirement not met.")
-                                print(f"[REPORT] Report: {report_filename}")
-                                print(f"[STATS] {test_report.get_summary()}")
-                                break
-                            else:
-                                # For other actions, continue and let LLM try different approach
-                                print(f"[INFO] Action failed, but continuing to allow LLM to try different approach...")
-                                continue
-                            
-                        except Exception as reflection_error:
-                            print(f"[WARN]  Reflection mode failed: {reflection_error}")
-                            # Continue with standard failure handling - provide guidance
-                            failure_text = (
-                                f"[ERROR] Action failed: {function_name} with args {function_args}\n"
-                                f"Error: {error_message}\n\n"
-                                f"Please try a DIFFERENT approach:\n"
-                                f"1. Check the current page source to see what elements are available\n"
-                                f"2. Try alternate selectors (if using 'id', try 'content-desc', 'xpath', or 'text')\n"
-                                f"3. Try finding similar elements\n"
-                                f"4. Verify you're on the correct page/screen\n"
-                                f"5. Try scrolling manually in different directions"
-                            )
-                            messages.append({
-                                "role": "user",
-                                "content": [
-                                    {
-                                        "type": "tool_result",
-                                        "tool_use_id": tool_call_id,
-                                        "content": json.dumps({
-                                            "success": False,
-                                            "error": error_message,
-                                            "guidance": "Try different selectors or approaches"
-                                        })
-                                    },
-                                    {
-                                        "type": "text",
-                                        "text": failure_text
-                                    }
-                                ]
-                            })
-                            
-                            # Don't stop - give LLM a chance to try different approach
-                            if function_name not in ('wait_for_element', 'wait_for_text_ocr', 'assert_activity'):
-                                print(f"[INFO] Action failed, but continuing to allow LLM to try different approach...")
-                                continue
+                            print(f"[INFO] Action failed, but continuing to allow LLM to try different approach...")
+                            continue
                     else:
                         # Action was successful
                         is_nav = is_navigation_action(function_name, function_args)
                         
-                        success_text = (
-                            "[OK] Action was successful. Screen updated." if suppress_xml
-                            else f"[OK] Action was successful. Here is the new screen: {truncated_xml}"
+                        success_content = (
+                            [{"type": "text", "text": "[OK] Action was successful. Screen updated."}] if suppress_xml
+                            else [{"type": "text", "text": "[OK] Action was successful. Here is the new screen:"}, updated_screen]
                         )
                         
                         # Automatically detect page name after navigation actions
@@ -2935,7 +2623,8 @@ What went wrong? Suggest recovery steps. Provide specific actions to try (e.g.,
                             # print("="*60)
                             
                             page_detection = auto_detect_page_after_navigation(
-                                session_id=main._session_id if hasattr(main, '_session_id') else None
+                                session_id=main._session_id if hasattr(main, '_session_id') else None,
+                                xml_text=post_action_xml
                             )
                             
                             # Suppress all page detection messages - not shown to users
@@ -2944,11 +2633,11 @@ What went wrong? Suggest recovery steps. Provide specific actions to try (e.g.,
                             #     print(f"[LIST] Detected via: {page_detection.get('method', 'Unknown')}")
                             #     print(f"[CHECK] Identifier: '{page_detection['identifier']}'")
                             #     print(f"[INFO] Note: LLM will verify with specific page identifier (e.g., 'PRODUCTS', 'CART')")
-                            #     success_text += f"\n[NAV] Page Detected: {page_detection['page_name']} (detected via {page_detection.get('method', 'Unknown')}: '{page_detection['identifier']}')"
+                            #     success_content.append({"type": "text", "text": f"[NAV] Page Detected: {page_detection['page_name']} (detected via {page_detection.get('method', 'Unknown')}: '{page_detection['identifier']}')"})
                             # else:
                             #     print(f"[WARN]  Could not automatically detect page name")
                             #     print(f"[INFO] Page may still be loading or no prominent text found")
-                            #     success_text += f"\n[WARN]  Page detection: Could not automatically identify page name"
+                            #     success_content.append({"type": "text", "text": "[WARN]  Page detection: Could not automatically identify page name"})
                             
                             # print("="*60 + "\n")
                             pass
@@ -2975,7 +2664,7 @@ What went wrong? Suggest recovery steps. Provide specific actions to try (e.g.,
                             
                             if is_login_action or is_finish_action:
                                 # Wait a moment for page to load after clicking Login/FINISH
-                                time.sleep(1.5)
+                                timed_sleep(1.5)
                                 
                                 # Check if we're on completion page or have successfully logged in
                                 try:
@@ -3077,9 +2766,9 @@ What went wrong? Suggest recovery steps. Provide specific actions to try (e.g.,
                                             'thank you',
                                             'complete'
                                         ]
-                                        is_completion_page = any(indicator in xml_lower for indicator in completion_indicators)
+                                        on_completion_screen = any(indicator in xml_lower for indicator in completion_indicators)
                                         
-                                        if is_completion_page:
+                                        if on_completion_screen:
                                             print("\n[INFO]  Completion detected: Reached completion page after FINISH action.")
                                             print("[INFO]  All steps from user prompt have been completed successfully.")
                                             print("[INFO]  Stopping automation and generating report...")
@@ -3108,10 +2797,7 @@ What went wrong? Suggest recovery steps. Provide specific actions to try (e.g.,
                                 "tool_use_id": tool_call_id,
                                 "content": json.dumps(result)
                             },
-                            {
-                                "type": "text",
-                                    "text": success_text
-                            }
+                            *success_content
                         ]
                     })
                 else:
@@ -3127,38 +2813,8 @@ What went wrong? Suggest recovery steps. Provide specific actions to try (e.g.,
             elif stop_reason == "end_turn":
                 # Verify all steps are completed before accepting end_turn
                 # Check if there are planned steps that haven't been executed
-                has_uncompleted_steps = False
-                uncompleted_step_descriptions = []
-                
-                if hasattr(main, '_planned_steps') and isinstance(main._planned_steps, list) and len(main._planned_steps) > 0:
-                    # Get executed step descriptions for comparison
-                    executed_descriptions = set()
-                    for step_info in test_report.report.get('steps', []):
-                        desc = step_info.get('description', '')
-                        if desc:
-                            # Normalize description for comparison
-                            executed_descriptions.add(desc.lower().strip())
-                    
-                    # Check planned steps against executed steps
-                    for planned_step in main._planned_steps:
-                        plan_desc = planned_step.get('name', planned_step.get('description', planned_step.get('action', '')))
-                        if plan_desc:
-                            plan_desc_normalized = plan_desc.lower().strip()
-                            # Check if this planned step was executed
-                            # Match by description similarity or action keywords
-                            found_match = False
-                            for exec_desc in executed_descriptions:
-                                # Check if key action words match
-                                plan_keywords = set(plan_desc_normalized.split())
-                                exec_keywords = set(exec_desc.split())
-                                # If significant overlap, consider it executed
-                                if len(plan_keywords & exec_keywords) >= min(2, len(plan_keywords) // 2):
-                                    found_match = True
-                                    break
-                            
-                            if not found_match:
-                                has_uncompleted_steps = True
-                                uncompleted_step_descriptions.append(plan_desc)
+                uncompleted_step_descriptions = plan_tracker.outstanding()
+                has_uncompleted_steps = bool(uncompleted_step_descriptions)
                 
                 # Also check if we have failed steps - if so, don't mark as completed
                 failed_steps = test_report.report.get("failed_steps", 0)
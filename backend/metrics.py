@@ -0,0 +1,375 @@
+"""
+Metrics Module
+
+In-process Prometheus-style registry (counters, gauges, histograms) rendered
+in the text exposition format by GET /metrics. Label children are created on
+first use and can be bound ahead of time, so recording a sample is a float
+update (histograms: a bisect into preallocated bucket counts).
+
+The automation subprocess imports the same metric definitions. It prints
+what it recorded since the previous flush as a "[METRICS] {...}" line, and
+the runner merges that into the API server's registry.
+"""
+from __future__ import annotations
+
+import json
+import math
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+METRICS_MARKER = "[METRICS] "
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self._bounds = bounds
+        # One slot per bucket plus +Inf; cumulated only when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self._bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """A metric family; labels(...) returns the child for one label set."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> Any:
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _label_text(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _render_samples(self, lines: List[str]) -> None:
+        for values, child in self._children.items():
+            lines.append(f"{self.name}{self._label_text(values)} {_format_value(child.value)}")
+
+    def render(self, lines: List[str]) -> None:
+        lines.append(f"# HELP {self.name} {self.documentation}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        self._render_samples(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the (unlabelled) value when scraped instead of on every change."""
+        self._function = function
+
+    def _render_samples(self, lines: List[str]) -> None:
+        if self._function is not None:
+            try:
+                self._default.set(self._function())
+            except Exception as exc:
+                print(f"[WARN] Gauge {self.name} callback failed: {exc}")
+        super()._render_samples(lines)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ) -> None:
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def _render_samples(self, lines: List[str]) -> None:
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{self._label_text(values, le)} {cumulative}")
+            labels = self._label_text(values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+
+
+class Registry:
+    """Named metric families plus delta export/merge between processes."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = ()
+    ) -> Histogram:
+        if buckets:
+            return self.register(Histogram(name, documentation, labelnames, buckets))
+        return self.register(Histogram(name, documentation, labelnames))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            metric.render(lines)
+        return "\n".join(lines) + "\n"
+
+    def drain(self) -> Dict[str, List[list]]:
+        """Counter and histogram samples recorded since the last drain (then zeroed)."""
+        delta: Dict[str, List[list]] = {}
+        for metric in self._metrics.values():
+            samples = []
+            for values, child in metric._children.items():
+                if isinstance(child, _CounterChild) and child.value:
+                    samples.append([list(values), child.value])
+                    child.value = 0.0
+                elif isinstance(child, _HistogramChild) and child.count:
+                    samples.append([list(values), list(child.counts), child.sum, child.count])
+                    child.counts[:] = [0] * len(child.counts)
+                    child.sum = 0.0
+                    child.count = 0
+            if samples:
+                delta[metric.name] = samples
+        return delta
+
+    def merge(self, delta: Dict[str, List[list]]) -> None:
+        """Add a drain() result from another process."""
+        for name, samples in delta.items():
+            metric = self._metrics.get(name)
+            if metric is None or isinstance(metric, Gauge):
+                continue
+            for sample in samples:
+                try:
+                    child = metric.labels(*sample[0])
+                    if isinstance(child, _CounterChild):
+                        child.inc(float(sample[1]))
+                    elif len(sample[1]) == len(child.counts):
+                        for index, count in enumerate(sample[1]):
+                            child.counts[index] += int(count)
+                        child.sum += float(sample[2])
+                        child.count += int(sample[3])
+                except (TypeError, ValueError, IndexError):
+                    continue
+
+
+registry = Registry()
+
+# API server
+RUNS = registry.counter("automation_runs_total", "Run status transitions", ["status"])
+RUNS_ACTIVE = registry.gauge("automation_runs_active", "Runs pending or running")
+RUN_QUEUE_WAIT = registry.histogram(
+    "automation_run_queue_wait_seconds", "Time from run creation until it starts running",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60),
+)
+RUN_DURATION = registry.histogram(
+    "automation_run_duration_seconds", "Time from run start until a terminal status", ["status"],
+    buckets=(5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600),
+)
+SSE_SUBSCRIBERS = registry.gauge("automation_sse_subscribers", "Open run event streams")
+SSE_QUEUE_LAG = registry.histogram(
+    "automation_sse_queue_lag_seconds", "Delay between emitting a run event and handing it to a stream",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+LIVE_FRAMES = registry.counter(
+    "automation_live_frames_total", "Live screen frames published or dropped as unchanged", ["result"]
+)
+
+# Automation subprocess (forwarded through the runner)
+LLM_LATENCY = registry.histogram(
+    "automation_llm_request_seconds", "Bedrock invoke_model latency per attempt", ["outcome"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 16, 32, 64),
+)
+LLM_RETRIES = registry.counter("automation_llm_retries_total", "Bedrock calls retried after throttling")
+MCP_TOOL_LATENCY = registry.histogram(
+    "automation_mcp_tool_seconds", "MCP server request latency by tool", ["tool"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+FAILURE_RECOVERY = registry.histogram(
+    "automation_failure_recovery_seconds", "Time from a failed action until the model has chosen the next one",
+    buckets=(0.5, 1, 2, 3, 5, 8, 13, 21, 34, 60),
+)
+LOCATOR_MEMORY = registry.counter(
+    "automation_locator_memory_total", "Learned locator lookups and updates by result", ["result"]
+)
+LOCATOR_ROUND_TRIPS_SAVED = registry.counter(
+    "automation_locator_round_trips_saved_total", "MCP round-trips avoided by trying a learned locator first"
+)
+RETRY_STRATEGIES = registry.counter(
+    "automation_retry_strategies_total", "Retry strategies run or skipped for a failed tool call",
+    ["strategy", "error_class", "outcome"],
+)
+SESSION_RECOVERIES = registry.counter(
+    "automation_session_recoveries_total", "Appium session recoveries by trigger (heartbeat, tool_error)",
+    ["trigger", "outcome"],
+)
+SESSION_FAILOVER_WAIT = registry.histogram(
+    "automation_session_failover_seconds", "Time a tool call waited for a healthy session after a crash",
+    buckets=(0.001, 0.01, 0.1, 0.5, 1, 2, 5, 10, 30, 60),
+)
+OCR_FRAMES = registry.counter(
+    "automation_ocr_frames_total", "Screen reads by OCR cache result (hit, miss, failed)", ["result"]
+)
+LOCATOR_PREFLIGHT = registry.counter(
+    "automation_locator_preflight_total",
+    "Locators checked against the last page source (found, rewritten, missing)", ["result"]
+)
+PAGE_SOURCE_BYTES = registry.histogram(
+    "automation_page_source_bytes", "Page source size before (raw) and after (compressed) compression",
+    ["stage"],
+    buckets=(1024, 4096, 16384, 65536, 131072, 262144, 524288, 1048576),
+)
+
+
+def metrics_marker() -> Optional[str]:
+    """Line carrying this process's unflushed samples, or None if there are none."""
+    delta = registry.drain()
+    if not delta:
+        return None
+    return METRICS_MARKER + json.dumps(delta, separators=(",", ":"))
+
+
+def merge_metrics_marker(message: str) -> bool:
+    """Merge a "[METRICS]" line from the subprocess; False for any other line."""
+    if not message.startswith(METRICS_MARKER):
+        return False
+    try:
+        registry.merge(json.loads(message[len(METRICS_MARKER):]))
+    except ValueError:
+        pass
+    return True
+
+
+__all__ = [
+    "CONTENT_TYPE",
+    "FAILURE_RECOVERY",
+    "LIVE_FRAMES",
+    "LLM_LATENCY",
+    "LLM_RETRIES",
+    "LOCATOR_MEMORY",
+    "LOCATOR_PREFLIGHT",
+    "LOCATOR_ROUND_TRIPS_SAVED",
+    "MCP_TOOL_LATENCY",
+    "OCR_FRAMES",
+    "PAGE_SOURCE_BYTES",
+    "RETRY_STRATEGIES",
+    "RUNS",
+    "RUNS_ACTIVE",
+    "RUN_DURATION",
+    "RUN_QUEUE_WAIT",
+    "SESSION_FAILOVER_WAIT",
+    "SESSION_RECOVERIES",
+    "SSE_QUEUE_LAG",
+    "SSE_SUBSCRIBERS",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "merge_metrics_marker",
+    "metrics_marker",
+    "registry",
+]
@@ -0,0 +1,217 @@
+"""
+OCR Reader Module
+
+Whole-frame OCR on the Python side. read() captures the screen, hashes the
+PNG and only asks for OCR of frames it has not seen before (an LRU keyed by
+the SHA-1 of the image), so re-checking an unchanged screen costs a
+screenshot instead of a vision-model call. find_texts() answers "which of
+these strings are on screen, and where?" for any number of strings from that
+one read; wait_for_texts() polls it until they appear or time runs out.
+
+Capture and extraction are injected callables: appium_tools wires in the MCP
+server (/tools/screenshot and /tools/extract-text), and a fake backend
+returning canned frames and OCR results drives the reader without a device
+or Bedrock access.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import OCR_FRAMES
+from timing import step_timer, timed_sleep
+
+OCR_CACHE_SIZE = int(os.getenv("AUTOMATION_OCR_CACHE_SIZE", "32"))
+# Pause between reads while waiting for text to appear
+OCR_POLL_SECONDS = float(os.getenv("AUTOMATION_OCR_POLL", "1.0"))
+
+# capture(session_id) -> PNG bytes or None
+CaptureFn = Callable[[Optional[str]], Optional[bytes]]
+# extract(image, session_id) -> {"text": [...], "boundingBoxes": [...], "confidence": float} or None
+ExtractFn = Callable[[bytes, Optional[str]], Optional[Dict[str, Any]]]
+
+
+@dataclass(frozen=True)
+class OcrFrame:
+    """OCR result for one screenshot."""
+
+    screenshot_hash: str
+    text: Tuple[str, ...]
+    boxes: Tuple[Dict[str, Any], ...]
+    confidence: float
+
+    def find(self, term: str) -> Optional[Dict[str, Any]]:
+        """Where term appears (case-insensitive substring), or None.
+
+        Returns:
+            The matching box ({"text", "x", "y", "width", "height",
+            "confidence", "center"}), or {"text"} if only the plain text
+            list matched
+        """
+        needle = term.lower().strip()
+        if not needle:
+            return None
+        for box in self.boxes:
+            text = str(box.get("text") or "")
+            if needle in text.lower():
+                x, y = box.get("x", 0), box.get("y", 0)
+                width, height = box.get("width", 0), box.get("height", 0)
+                return {
+                    "text": text,
+                    "x": x,
+                    "y": y,
+                    "width": width,
+                    "height": height,
+                    "confidence": box.get("confidence", self.confidence),
+                    "center": {"x": x + width // 2, "y": y + height // 2},
+                }
+        for text in self.text:
+            if needle in text.lower():
+                return {"text": text}
+        return None
+
+
+class OcrReader:
+    """Screenshot-hash cached OCR with multi-term queries."""
+
+    def __init__(
+        self,
+        capture: Optional[CaptureFn] = None,
+        extract: Optional[ExtractFn] = None,
+        cache_size: int = OCR_CACHE_SIZE,
+    ) -> None:
+        self._capture = capture
+        self._extract = extract
+        self.cache_size = cache_size
+        self._frames: "OrderedDict[str, OcrFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"reads": 0, "cache_hits": 0, "ocr_calls": 0, "failed": 0}
+
+    def configure(self, capture: CaptureFn, extract: ExtractFn) -> None:
+        """Set the backend (and drop frames read through the previous one)."""
+        self._capture = capture
+        self._extract = extract
+        with self._lock:
+            self._frames.clear()
+
+    @property
+    def available(self) -> bool:
+        return self._capture is not None and self._extract is not None
+
+    def read(self, session_id: Optional[str] = None) -> Optional[OcrFrame]:
+        """OCR of the current screen, reusing the result for an identical frame.
+
+        Returns:
+            The frame, or None if the capture or the OCR failed
+        """
+        if not self.available:
+            return None
+        self.stats["reads"] += 1
+        image = self._capture(session_id)
+        if not image:
+            self.stats["failed"] += 1
+            OCR_FRAMES.labels("failed").inc()
+            return None
+        screenshot_hash = hashlib.sha1(image).hexdigest()
+        with self._lock:
+            frame = self._frames.get(screenshot_hash)
+            if frame is not None:
+                self._frames.move_to_end(screenshot_hash)
+        if frame is not None:
+            self.stats["cache_hits"] += 1
+            step_timer.count("ocr_cache_hits")
+            OCR_FRAMES.labels("hit").inc()
+            return frame
+
+        self.stats["ocr_calls"] += 1
+        with step_timer.span("ocr"):
+            result = self._extract(image, session_id)
+        if not isinstance(result, dict):
+            self.stats["failed"] += 1
+            OCR_FRAMES.labels("failed").inc()
+            return None
+        frame = OcrFrame(
+            screenshot_hash=screenshot_hash,
+            text=tuple(str(text) for text in result.get("text") or () if text),
+            boxes=tuple(box for box in result.get("boundingBoxes") or () if isinstance(box, dict)),
+            confidence=float(result.get("confidence") or 0.0),
+        )
+        OCR_FRAMES.labels("miss").inc()
+        # An empty read is usually a failed OCR call, not a blank screen
+        if frame.text or frame.boxes:
+            with self._lock:
+                self._frames[screenshot_hash] = frame
+                while len(self._frames) > self.cache_size:
+                    self._frames.popitem(last=False)
+        return frame
+
+    def find_texts(self, terms: Iterable[str], session_id: Optional[str] = None) -> Optional[Dict[str, Optional[Dict[str, Any]]]]:
+        """Which of terms are on screen, from a single read.
+
+        Args:
+            terms: Strings to look for (case-insensitive substrings)
+            session_id: Appium session to capture
+
+        Returns:
+            {term: match or None} in the order given (see OcrFrame.find), or
+            None if the screen could not be read
+        """
+        frame = self.read(session_id)
+        if frame is None:
+            return None
+        return {term: frame.find(term) for term in terms}
+
+    def wait_for_texts(
+        self,
+        terms: Iterable[str],
+        timeout_seconds: float,
+        session_id: Optional[str] = None,
+        require_all: bool = False,
+    ) -> Optional[Dict[str, Optional[Dict[str, Any]]]]:
+        """Poll find_texts() until any (or all) of terms are on screen.
+
+        Returns:
+            The last {term: match or None}, or None if no read succeeded
+        """
+        terms = list(terms)
+        deadline = time.monotonic() + max(0.0, timeout_seconds)
+        found = None
+        while True:
+            latest = self.find_texts(terms, session_id)
+            if latest is None:
+                # Reading is broken (not just the text missing); polling will not fix it
+                return found
+            found = latest
+            matched = [match is not None for match in found.values()]
+            if all(matched) if require_all else any(matched):
+                return found
+            if time.monotonic() + OCR_POLL_SECONDS > deadline:
+                return found
+            timed_sleep(OCR_POLL_SECONDS)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frames.clear()
+
+
+def present_terms(found: Optional[Dict[str, Optional[Dict[str, Any]]]]) -> List[str]:
+    """Terms of a find_texts() result that were found, in query order."""
+    return [term for term, match in (found or {}).items() if match is not None]
+
+
+ocr_reader = OcrReader()
+
+
+__all__ = [
+    "OCR_CACHE_SIZE",
+    "OCR_POLL_SECONDS",
+    "OcrFrame",
+    "OcrReader",
+    "ocr_reader",
+    "present_terms",
+]
@@ -0,0 +1,156 @@
+"""
+Page Identity Module
+
+Recognises app screens by fingerprint instead of re-reading them. A
+fingerprint is the foreground activity plus a hash of the screen's stable
+resource-ids (as a set, so list lengths and text do not change it; ids with
+long digit/hex runs are treated as dynamic and left out). Fingerprint to page
+name mappings are cached per app package in SQLite next to the run store and
+dropped when the app's version changes.
+
+On a cache miss the caller classifies the screen from its XML text, and only
+if that finds nothing does it OCR the screen once, checking every label in
+OCR_PAGE_LABELS against that single read (ocr_reader.find_texts()).
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from run_store import RUNS_DB_PATH, connect
+
+PAGE_IDENTITY_ENABLED = os.getenv("AUTOMATION_PAGE_IDENTITY", "true").lower() in ("1", "true", "yes")
+
+# Labels looked for on screen when the XML gave nothing to go on
+OCR_PAGE_LABELS = (
+    "PRODUCTS", "CART", "CHECKOUT", "LOGIN", "SETTINGS",
+    "HOME", "PROFILE", "SEARCH", "VIDEO", "PLAYER",
+)
+
+_RESOURCE_ID_PATTERN = re.compile(r'resource-id="([^"]+)"')
+# Generated ids (row_10234, 3f9a0c1e...) differ between visits of one screen
+_DYNAMIC_ID_PATTERN = re.compile(r"\d{3,}|[0-9a-f]{8,}", re.IGNORECASE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_identities (
+    package TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    page_name TEXT NOT NULL,
+    identifier TEXT NOT NULL DEFAULT '',
+    method TEXT NOT NULL DEFAULT '',
+    app_version TEXT NOT NULL DEFAULT '',
+    hits INTEGER NOT NULL DEFAULT 0,
+    learned_at REAL NOT NULL,
+    PRIMARY KEY (package, fingerprint)
+);
+"""
+
+
+def screen_fingerprint(xml_text: str, activity: str = "") -> Optional[str]:
+    """Fingerprint of a screen, or None if it has no stable resource-ids.
+
+    Args:
+        xml_text: Page source
+        activity: Foreground activity ("" if unknown)
+
+    Returns:
+        Hex digest of the activity and the sorted set of stable ids
+    """
+    if not xml_text:
+        return None
+    stable_ids = {
+        resource_id for resource_id in _RESOURCE_ID_PATTERN.findall(xml_text)
+        if not _DYNAMIC_ID_PATTERN.search(resource_id.rsplit("/", 1)[-1])
+    }
+    if not stable_ids:
+        return None
+    digest = hashlib.sha1(activity.encode("utf-8"))
+    for resource_id in sorted(stable_ids):
+        digest.update(b"\0")
+        digest.update(resource_id.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PageIdentityCache:
+    """Per-app map from screen fingerprint to the page it was identified as."""
+
+    def __init__(self, db_path: Path | str = RUNS_DB_PATH, enabled: bool = PAGE_IDENTITY_ENABLED) -> None:
+        self.db_path = db_path
+        self.enabled = enabled
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = connect(self.db_path)
+            conn.executescript(_SCHEMA)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, package: str, fingerprint: str, app_version: str = "") -> Optional[Dict[str, str]]:
+        """Cached identity ({"page_name", "identifier", "method"}) or None."""
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT page_name, identifier, method, app_version FROM page_identities "
+                    "WHERE package = ? AND fingerprint = ?",
+                    (package, fingerprint),
+                ).fetchone()
+                if row is not None and not (app_version and row[3] and app_version != row[3]):
+                    conn.execute(
+                        "UPDATE page_identities SET hits = hits + 1 WHERE package = ? AND fingerprint = ?",
+                        (package, fingerprint),
+                    )
+                    conn.commit()
+                    self.hits += 1
+                    return {"page_name": row[0], "identifier": row[1], "method": row[2]}
+        except sqlite3.Error as exc:
+            print(f"[WARN] Page identity cache unavailable: {exc}")
+            self.enabled = False
+            return None
+        self.misses += 1
+        return None
+
+    def put(self, package: str, fingerprint: str, detection: Dict[str, str], app_version: str = "") -> None:
+        """Remember how a fingerprint was identified (replaces entries from older app versions)."""
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO page_identities "
+                    "(package, fingerprint, page_name, identifier, method, app_version, hits, learned_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 0, ?)",
+                    (
+                        package, fingerprint, detection["page_name"], detection.get("identifier", ""),
+                        detection.get("method", ""), app_version, time.time(),
+                    ),
+                )
+                conn.commit()
+        except sqlite3.Error as exc:
+            print(f"[WARN] Could not cache page identity: {exc}")
+
+
+page_identity_cache = PageIdentityCache()
+
+
+__all__ = [
+    "OCR_PAGE_LABELS",
+    "PAGE_IDENTITY_ENABLED",
+    "PageIdentityCache",
+    "page_identity_cache",
+    "screen_fingerprint",
+]
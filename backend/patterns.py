@@ -0,0 +1,105 @@
+"""
+Patterns Module
+
+Precompiled regular expressions for the orchestrator (main.py) and the run
+streamer (automation_runner.py). These run once per step or once per stdout
+line, so they are compiled here at import time instead of being rebuilt or
+looked up in re's cache on every call, and patterns used by both files are
+defined once.
+"""
+from __future__ import annotations
+
+import re
+
+# --- Page source -----------------------------------------------------------
+
+# Attributes compress_xml() drops: noise attributes, clickable/editable only
+# when false, and empty resource-ids (matched case-sensitively, as before)
+XML_NOISE_ATTRS_PATTERN = re.compile(
+    r'\s+(?:index|instance|package|checkable|checked|enabled|focusable|focused|long-clickable'
+    r'|password|scrollable|selected|displayed|a11y-important|screen-reader-focusable'
+    r'|drawing-order|showing-hint|text-entry-key|dismissable|a11y-focused|heading'
+    r'|live-region|context-clickable|content-invalid)="[^"]*"'
+    r'|\s+(?:clickable|editable)="false"'
+    r'|(?-i:\s+resource-id="")',
+    re.IGNORECASE,
+)
+
+# Elements truncate_xml() keeps when it has to cut, highest priority first
+XML_IMPORTANT_ELEMENT_PATTERNS = tuple(
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (
+        r'<[^>]*text="[^"]*(?:bike|light|backpack|cart|add|product|sauce)[^"]*"[^>]*>',
+        r'<[^>]*text="[^"]*"[^>]*>',
+        r'<[^>]*clickable="true"[^>]*>',
+        r'<[^>]*content-desc="[^"]*"[^>]*>',
+        r'<[^>]*resource-id="[^"]*(?:button|cart|add|product)[^"]*"[^>]*>',
+        r'<[^>]*resource-id="[^"]*"[^>]*>',
+    )
+)
+XML_TAG_NAME_PATTERN = re.compile(r'<(\w+)')
+
+XML_TEXT_ATTR_PATTERN = re.compile(r'text="([^"]+)"')
+XML_TEXTVIEW_TEXT_PATTERN = re.compile(r'<TextView[^>]*text="([^"]+)"', re.IGNORECASE)
+XML_CONTENT_DESC_PATTERN = re.compile(r'content-desc="([^"]+)"', re.IGNORECASE)
+
+# --- User goal and plan ----------------------------------------------------
+
+GOAL_USERNAME_PATTERN = re.compile(r"username\s+is\s+([\S]+)", re.IGNORECASE)
+GOAL_PASSWORD_PATTERN = re.compile(r"password\s+is\s+([\S]+)", re.IGNORECASE)
+GOAL_ADD_TO_CART_PATTERN = re.compile(r'add\s+([^to]+?)\s+to\s+cart')
+
+# (pattern, verb), most specific first
+VALIDATION_PATTERNS = tuple(
+    (re.compile(pattern, re.IGNORECASE), verb)
+    for pattern, verb in (
+        (r'validate\s+(?:whether|if|that)\s+(.+?)(?=,|\.|then|and|$)', 'validate'),
+        (r'verify\s+(?:whether|if|that)\s+(.+?)(?=,|\.|then|and|$)', 'verify'),
+        (r'check\s+(?:whether|if|that)\s+(.+?)(?=,|\.|then|and|$)', 'check'),
+        (r'validate\s+(.+?)(?=,|\.|then|and|$)', 'validate'),
+        (r'verify\s+(.+?)(?=,|\.|then|and|$)', 'verify'),
+        (r'check\s+(.+?)(?=,|\.|then|and|$)', 'check'),
+    )
+)
+LEADING_ARTICLE_PATTERN = re.compile(r'^(the|a|an)\s+')
+
+# JSON array of plan steps inside the model's planning text
+PLAN_JSON_ARRAY_PATTERN = re.compile(r"\[\s*\{.*?\}\s*\]", re.DOTALL)
+# "1. Open the app" / "Step 2: Log in" lines of a plain-text plan
+PLAN_ENUMERATED_STEP_PATTERN = re.compile(r"^\s*(?:step\s*)?(\d+)[\.:)\-]\s*(.+)$", re.IGNORECASE)
+
+# --- Step descriptions and log lines ---------------------------------------
+
+STEP_CLICK_TARGET_PATTERN = re.compile(r'(?:Click|click)\s+(?:on\s+)?([A-Z][a-zA-Z\s]+?)(?:\s+button|\s+element|$)')
+STEP_TYPED_TEXT_PATTERN = re.compile(r'(?:Type|Enter|type|enter).*?["\']([^"\']+)["\']')
+
+# 'value': '...' / 'text': '...' in a logged tool call
+LOG_VALUE_ARG_PATTERN = re.compile(r"['\"]value['\"]:\s*['\"]([^'\"]+)['\"]")
+LOG_TEXT_ARG_PATTERN = re.compile(r"['\"]text['\"]:\s*['\"]([^'\"]+)['\"]")
+LOG_ACTION_NAME_PATTERN = re.compile(r"(?:Action:\s*|Call\s+)(\w+)")
+LOG_STATS_PATTERN = re.compile(r'(\d+)\s+steps.*?✅\s+(\d+).*?❌\s+(\d+)')
+LOG_BRACKET_TAG_PATTERN = re.compile(r'\[.*?\]')
+
+
+__all__ = [
+    "GOAL_ADD_TO_CART_PATTERN",
+    "GOAL_PASSWORD_PATTERN",
+    "GOAL_USERNAME_PATTERN",
+    "LEADING_ARTICLE_PATTERN",
+    "LOG_ACTION_NAME_PATTERN",
+    "LOG_BRACKET_TAG_PATTERN",
+    "LOG_STATS_PATTERN",
+    "LOG_TEXT_ARG_PATTERN",
+    "LOG_VALUE_ARG_PATTERN",
+    "PLAN_ENUMERATED_STEP_PATTERN",
+    "PLAN_JSON_ARRAY_PATTERN",
+    "STEP_CLICK_TARGET_PATTERN",
+    "STEP_TYPED_TEXT_PATTERN",
+    "VALIDATION_PATTERNS",
+    "XML_CONTENT_DESC_PATTERN",
+    "XML_IMPORTANT_ELEMENT_PATTERNS",
+    "XML_NOISE_ATTRS_PATTERN",
+    "XML_TAG_NAME_PATTERN",
+    "XML_TEXTVIEW_TEXT_PATTERN",
+    "XML_TEXT_ATTR_PATTERN",
+]
@@ -2,11 +2,15 @@
 PDF Report Generator Module
 
 Converts JSON test reports into well-formatted PDF documents.
+Step screenshots can be embedded as downscaled JPEG thumbnails; thumbnails
+are cached on disk by source hash so regenerating a PDF reuses them.
 """
+import hashlib
 import json
+import os
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 try:
     from reportlab.lib import colors
@@ -19,29 +23,59 @@ try:
 except ImportError:
     REPORTLAB_AVAILABLE = False
 
+try:
+    from PIL import Image as PILImage
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+BASE_DIR = Path(__file__).resolve().parent
+APP_MCP_DIR = (BASE_DIR / "appium-mcp").resolve()
+PDF_EMBED_SCREENSHOTS = os.getenv('AUTOMATION_PDF_SCREENSHOTS', 'true').lower() in ('1', 'true', 'yes')
+THUMBNAIL_CACHE_DIR = Path(os.getenv('AUTOMATION_PDF_THUMBNAIL_DIR', str(BASE_DIR / "pdf_cache" / "thumbnails")))
+# Longest side in pixels and JPEG quality; keeps a 200-step PDF to a few MB
+THUMBNAIL_MAX_PX = int(os.getenv('AUTOMATION_PDF_THUMBNAIL_PX', '360'))
+THUMBNAIL_QUALITY = int(os.getenv('AUTOMATION_PDF_THUMBNAIL_QUALITY', '55'))
+# Height of an embedded screenshot on the page
+THUMBNAIL_DISPLAY_HEIGHT_INCH = 3.0
+
 
 class PDFReportGenerator:
     """Generates PDF reports from JSON test reports."""
     
-    def __init__(self, reports_dir: str = "reports"):
+    def __init__(
+        self,
+        reports_dir: str = "reports",
+        embed_screenshots: bool = PDF_EMBED_SCREENSHOTS,
+        thumbnail_dir: Path = THUMBNAIL_CACHE_DIR,
+    ):
         """Initialize the PDF generator.
         
         Args:
             reports_dir: Directory where reports are stored
+            embed_screenshots: Embed each step's after-screenshot as a thumbnail
+                (needs Pillow)
+            thumbnail_dir: On-disk thumbnail cache
         """
         self.reports_dir = Path(reports_dir)
         self.reports_dir.mkdir(parents=True, exist_ok=True)
+        self.embed_screenshots = embed_screenshots and PIL_AVAILABLE
+        self.thumbnail_dir = Path(thumbnail_dir)
+        # (path, size, mtime) -> (thumbnail, width, height); the worker
+        # process is reused, so this spares re-hashing unchanged sources
+        self._thumbnails: Dict[Tuple[str, int, int], Tuple[Path, int, int]] = {}
         
         if not REPORTLAB_AVAILABLE:
             raise ImportError(
                 "reportlab is not installed. Install it with: pip install reportlab"
             )
     
-    def generate_pdf(self, json_report_path: Path) -> Optional[Path]:
+    def generate_pdf(self, json_report_path: Path, pdf_path: Optional[Path] = None) -> Optional[Path]:
         """Generate a PDF report from a JSON report file.
         
         Args:
             json_report_path: Path to the JSON report file
+            pdf_path: Output path (default: next to the JSON report)
             
         Returns:
             Path to the generated PDF file, or None if generation failed
@@ -52,7 +86,8 @@ class PDFReportGenerator:
                 report_data = json.load(f)
             
             # Generate PDF path
-            pdf_path = json_report_path.with_suffix('.pdf')
+            if pdf_path is None:
+                pdf_path = json_report_path.with_suffix('.pdf')
             
             # Create PDF document
             doc = SimpleDocTemplate(
@@ -323,6 +358,12 @@ class PDFReportGenerator:
                             ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#dee2e6')),
                         ]))
                     story.append(step_table)
+                    
+                    if self.embed_screenshots and step.get('after_screenshot_path'):
+                        screenshot = self._screenshot_flowable(step['after_screenshot_path'])
+                        if screenshot is not None:
+                            story.append(Spacer(1, 0.08*inch))
+                            story.append(screenshot)
                     story.append(Spacer(1, 0.15*inch))
             else:
                 no_steps = Paragraph("No steps recorded.", styles['Normal'])
@@ -376,6 +417,75 @@ class PDFReportGenerator:
             print(f"Error generating PDF: {e}")
             return None
     
+    def _resolve_screenshot(self, raw_path: str) -> Optional[Path]:
+        path = Path(raw_path)
+        if path.is_absolute():
+            return path if path.is_file() else None
+        # Tools save relative to appium-mcp; copies live in reports/
+        for candidate in (APP_MCP_DIR / path, self.reports_dir / path, self.reports_dir / path.name):
+            if candidate.is_file():
+                return candidate
+        return None
+
+    def _thumbnail(self, source: Path) -> Optional[Tuple[Path, int, int]]:
+        """Downscaled JPEG for a screenshot, cached by content hash.
+        
+        Returns:
+            Tuple of (thumbnail path, width, height), or None if unreadable
+        """
+        try:
+            stat = source.stat()
+        except OSError:
+            return None
+        memo_key = (str(source), stat.st_size, stat.st_mtime_ns)
+        cached = self._thumbnails.get(memo_key)
+        if cached is not None and cached[0].is_file():
+            return cached
+
+        try:
+            data = source.read_bytes()
+        except OSError:
+            return None
+        digest = hashlib.sha256(data)
+        digest.update(f"{THUMBNAIL_MAX_PX}:{THUMBNAIL_QUALITY}".encode('ascii'))
+        thumb_path = self.thumbnail_dir / f"{digest.hexdigest()[:32]}.jpg"
+
+        try:
+            if thumb_path.is_file():
+                with PILImage.open(thumb_path) as img:
+                    width, height = img.size
+            else:
+                self.thumbnail_dir.mkdir(parents=True, exist_ok=True)
+                with PILImage.open(source) as img:
+                    img = img.convert('RGB')
+                    img.thumbnail((THUMBNAIL_MAX_PX, THUMBNAIL_MAX_PX))
+                    width, height = img.size
+                    tmp_path = thumb_path.with_name(f"{thumb_path.name}.{os.getpid()}.tmp")
+                    img.save(tmp_path, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+                os.replace(tmp_path, thumb_path)
+        except Exception as e:
+            print(f"Warning: Could not create thumbnail for {source}: {e}")
+            return None
+
+        result = (thumb_path, width, height)
+        self._thumbnails[memo_key] = result
+        return result
+
+    def _screenshot_flowable(self, raw_path: str) -> Optional["Image"]:
+        source = self._resolve_screenshot(str(raw_path))
+        thumbnail = self._thumbnail(source) if source else None
+        if thumbnail is None:
+            return None
+        thumb_path, width, height = thumbnail
+        display_height = THUMBNAIL_DISPLAY_HEIGHT_INCH * inch
+        display_width = display_height * width / height if height else display_height
+        if display_width > 7 * inch:
+            display_height *= 7 * inch / display_width
+            display_width = 7 * inch
+        image = Image(str(thumb_path), width=display_width, height=display_height)
+        image.hAlign = 'LEFT'
+        return image
+
     def _format_datetime(self, dt_string: Optional[str]) -> str:
         """Format datetime string for display."""
         if not dt_string:
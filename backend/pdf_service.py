@@ -0,0 +1,227 @@
+"""
+PDF Service Module
+
+Renders PDF reports in a pool of worker processes so building the reportlab
+story never runs on the API server's event loop. PDFs are rendered lazily on
+first download into a cache keyed by a hash of the JSON report; concurrent
+requests for the same content join the render already in flight, and the
+cache is trimmed oldest-first once it exceeds its size budget.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from pdf_generator import PDF_EMBED_SCREENSHOTS
+
+BASE_DIR = Path(__file__).resolve().parent
+PDF_WORKERS = int(os.getenv("AUTOMATION_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_CACHE_DIR = Path(os.getenv("AUTOMATION_PDF_CACHE_DIR", str(BASE_DIR / "pdf_cache")))
+PDF_CACHE_MAX_BYTES = int(float(os.getenv("AUTOMATION_PDF_CACHE_MAX_MB", "256")) * 1024 * 1024)
+# Bump when the PDF layout changes so cached renders are not reused
+PDF_CACHE_VERSION = f"2-{'shots' if PDF_EMBED_SCREENSHOTS else 'text'}"
+
+
+def render_pdf(json_report_path: str, reports_dir: str, pdf_path: Optional[str] = None) -> Optional[str]:
+    """Worker entry point: render one JSON report to PDF.
+
+    When pdf_path is given the PDF is written to a temporary file and moved
+    into place, so readers never see a partial file.
+
+    Returns:
+        Path to the PDF, or None if reportlab is missing or rendering failed
+    """
+    try:
+        from pdf_generator import PDFReportGenerator
+        generator = PDFReportGenerator(reports_dir=reports_dir)
+    except ImportError:
+        # reportlab not installed, skip PDF generation
+        return None
+    if pdf_path is None:
+        result = generator.generate_pdf(Path(json_report_path))
+        return str(result) if result else None
+
+    target = Path(pdf_path)
+    tmp_path = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    result = generator.generate_pdf(Path(json_report_path), pdf_path=tmp_path)
+    if not result:
+        tmp_path.unlink(missing_ok=True)
+        return None
+    os.replace(tmp_path, target)
+    return str(target)
+
+
+def report_content_hash(data: bytes) -> str:
+    digest = hashlib.sha256(PDF_CACHE_VERSION.encode("ascii"))
+    digest.update(data)
+    return digest.hexdigest()[:32]
+
+
+class PDFService:
+    """Process-pool backed PDF rendering with de-duplicated jobs."""
+
+    def __init__(
+        self,
+        workers: int = PDF_WORKERS,
+        cache_dir: Path = PDF_CACHE_DIR,
+        cache_max_bytes: int = PDF_CACHE_MAX_BYTES,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.cache_dir = Path(cache_dir)
+        self.cache_max_bytes = cache_max_bytes
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, asyncio.Future] = {}
+        self.rendered = 0
+        self.failed = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.joined = 0
+        self.evicted = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def render(
+        self,
+        json_report_path: Path,
+        reports_dir: Optional[Path] = None,
+        pdf_path: Optional[Path] = None,
+        key: Optional[str] = None,
+    ) -> asyncio.Future:
+        """Queue a PDF render for a JSON report.
+
+        Args:
+            json_report_path: Report to render
+            reports_dir: Directory passed to PDFReportGenerator (defaults to
+                the report's own directory)
+            pdf_path: Output path (default: next to the JSON report)
+            key: Single-flight key; defaults to the report path
+
+        Returns:
+            Future resolving to the PDF path (or None on failure)
+        """
+        source = str(Path(json_report_path).resolve())
+        key = key or source
+        job = self._jobs.get(key)
+        if job is not None:
+            return job
+
+        loop = asyncio.get_running_loop()
+        directory = str(reports_dir or Path(source).parent)
+        output = str(pdf_path) if pdf_path else None
+        job = loop.run_in_executor(self._executor(), render_pdf, source, directory, output)
+        self._jobs[key] = job
+
+        def _done(future: asyncio.Future) -> None:
+            self._jobs.pop(key, None)
+            if future.cancelled() or future.exception() is not None or future.result() is None:
+                self.failed += 1
+                if not future.cancelled() and future.exception() is not None:
+                    print(f"Warning: Failed to generate PDF report: {future.exception()}", file=sys.stderr)
+            else:
+                self.rendered += 1
+
+        job.add_done_callback(_done)
+        return job
+
+    async def cached_pdf(self, json_report_path: Path) -> Optional[Path]:
+        """Return the PDF for a report's current content, rendering on a miss.
+
+        Returns:
+            Path inside the cache directory, or None if rendering failed
+        """
+        source = Path(json_report_path)
+        try:
+            data = await asyncio.to_thread(source.read_bytes)
+        except OSError:
+            return None
+        digest = report_content_hash(data)
+        target = self.cache_dir / f"{digest}.pdf"
+        if target.is_file():
+            self.cache_hits += 1
+            # mtime doubles as last-use time for eviction
+            with contextlib.suppress(OSError):
+                os.utime(target)
+            return target
+
+        if digest in self._jobs:
+            self.joined += 1
+        else:
+            self.cache_misses += 1
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            pdf_path = await self.render(source, source.parent, pdf_path=target, key=digest)
+        except Exception:
+            return None
+        if not pdf_path:
+            return None
+        await asyncio.to_thread(self._evict, target)
+        return target
+
+    def _evict(self, keep: Path) -> None:
+        entries = []
+        total = 0
+        # PDFs plus the screenshot thumbnails the generator caches beneath
+        for path in self.cache_dir.rglob("*"):
+            if path.suffix not in (".pdf", ".jpg"):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.cache_max_bytes:
+                break
+            if path == keep:
+                continue
+            with contextlib.suppress(OSError):
+                path.unlink()
+                total -= size
+                self.evicted += 1
+
+    async def regenerate(self, json_report_paths: Iterable[Path]) -> List[Optional[Path]]:
+        """Warm the cache for many reports in parallel, preserving input order."""
+        return list(await asyncio.gather(*(self.cached_pdf(path) for path in json_report_paths)))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "workers": self.workers,
+            "pending": len(self._jobs),
+            "rendered": self.rendered,
+            "failed": self.failed,
+            "cacheHits": self.cache_hits,
+            "cacheMisses": self.cache_misses,
+            "hitRate": round(self.cache_hits / lookups, 4) if lookups else None,
+            "joined": self.joined,
+            "evicted": self.evicted,
+        }
+
+    def shutdown(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+pdf_service = PDFService()
+
+
+__all__ = [
+    "PDF_CACHE_DIR",
+    "PDF_WORKERS",
+    "PDFService",
+    "pdf_service",
+    "render_pdf",
+    "report_content_hash",
+]
@@ -0,0 +1,129 @@
+"""
+Plan Tracker Module
+
+Incremental plan-completion state for one automation run. Each executed step
+is matched against the still-outstanding plan items once, when it is added,
+so "are all planned steps done?" is a lookup rather than a rescan of the
+report every cycle. The tracker also decides when it is worth fetching the
+screen to look for a completion page: only when the plan may be done and
+something happened since the last look.
+
+A plan item counts as executed once some step description shares at least
+max(1, min(2, n // 2)) of the item's n words, and the plan as a whole only
+once at least as many steps ran as were planned.
+"""
+from __future__ import annotations
+
+import re
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+# Step descriptions that suggest the flow may have just finished
+COMPLETION_ACTION_KEYWORDS = ('finish', 'complete', 'submit', 'done', 'confirm', 'order complete')
+# Only the last few steps count as "just finished"
+RECENT_STEP_WINDOW = 5
+
+COMPLETION_PAGE_PATTERN = re.compile(
+    r"\b(?:thank you for your order|order complete|checkout complete|back home|thank you|complete|success|done|finished)\b",
+    re.IGNORECASE,
+)
+
+
+def plan_item_description(planned_step: Dict[str, Any]) -> str:
+    return planned_step.get('name', planned_step.get('description', planned_step.get('action', ''))) or ''
+
+
+class PlanTracker:
+    """Outstanding plan items, updated as steps are added to the report."""
+
+    def __init__(self) -> None:
+        # (description, keyword set, required overlap) for unmatched items
+        self._outstanding: List[Tuple[str, frozenset, int]] = []
+        self.planned = 0
+        self.steps_seen = 0
+        # Non-skipped steps in the report
+        self.executed = 0
+        self._recent_completion_actions: Deque[bool] = deque(maxlen=RECENT_STEP_WINDOW)
+        self._probed_at_step: Optional[int] = None
+
+    def set_plan(self, planned_steps: Iterable[Dict[str, Any]], executed_steps: Iterable[Dict[str, Any]] = ()) -> None:
+        """Track a (new) plan, matching steps that already ran.
+
+        Args:
+            planned_steps: Plan items with name/description/action
+            executed_steps: Report steps recorded before the plan was known
+        """
+        self._outstanding = []
+        self.planned = 0
+        for planned_step in planned_steps:
+            if not isinstance(planned_step, dict):
+                continue
+            self.planned += 1
+            description = plan_item_description(planned_step).lower().strip()
+            if not description:
+                continue
+            keywords = frozenset(description.split())
+            self._outstanding.append((plan_item_description(planned_step), keywords, max(1, min(2, len(keywords) // 2))))
+        self.executed = 0
+        for step in executed_steps:
+            if step.get('status') != 'SKIPPED':
+                self.executed += 1
+                self._match(step.get('description') or '')
+
+    def _match(self, description: str) -> None:
+        if not description or not self._outstanding:
+            return
+        keywords = set(description.lower().strip().split())
+        self._outstanding = [
+            item for item in self._outstanding if len(item[1] & keywords) < item[2]
+        ]
+
+    def observe(self, description: Optional[str]) -> None:
+        """Account for a step just added to the report."""
+        self.steps_seen += 1
+        self.executed += 1
+        description = (description or '').lower()
+        self._recent_completion_actions.append(
+            any(keyword in description for keyword in COMPLETION_ACTION_KEYWORDS)
+        )
+        self._match(description)
+
+    @property
+    def has_plan(self) -> bool:
+        return self.planned > 0
+
+    @property
+    def all_executed(self) -> bool:
+        """Every planned step has a matching executed step (False without a plan)."""
+        return self.has_plan and not self._outstanding
+
+    @property
+    def all_executed_and_counted(self) -> bool:
+        """all_executed, and at least as many steps ran as were planned."""
+        return self.all_executed and self.executed >= self.planned
+
+    def outstanding(self) -> List[str]:
+        """Descriptions of plan items not matched yet, in plan order."""
+        return [item[0] for item in self._outstanding]
+
+    def should_probe_screen(self) -> bool:
+        """Whether the plan may be done and the screen has not been checked since the last step."""
+        if self._probed_at_step == self.steps_seen:
+            return False
+        return self.all_executed or any(self._recent_completion_actions)
+
+    def mark_probed(self) -> None:
+        self._probed_at_step = self.steps_seen
+
+
+def is_completion_page(page_source: str) -> bool:
+    """Whether the page source shows a completion/thank-you screen."""
+    return bool(page_source) and COMPLETION_PAGE_PATTERN.search(page_source) is not None
+
+
+__all__ = [
+    "COMPLETION_PAGE_PATTERN",
+    "PlanTracker",
+    "is_completion_page",
+    "plan_item_description",
+]
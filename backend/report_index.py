@@ -0,0 +1,551 @@
+"""
+Report Index Module
+
+Maps report ids (and the run that produced them) to report metadata so the
+API never has to scan reports/. Entries are held in memory and mirrored to a
+SQLite table next to the run store, then reloaded at startup.
+
+Report contents (steps, actions, durations, failing locators) are ingested
+into the same database. Ingestion is incremental: files are re-read only
+when their size or mtime changed. Per-day rollups are maintained alongside
+the step rows so aggregate queries touch a few hundred rows, not every step.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from blob_store import blob_store
+from run_store import RUNS_DB_PATH, connect
+
+REPORTS_DIR = Path(__file__).resolve().parent / "reports"
+REPORT_FILE_GLOB = "test_report_*.json"
+# Files parsed per transaction during sync()
+INGEST_BATCH_SIZE = 500
+FAILED_STATUSES = ("failed", "error")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id TEXT PRIMARY KEY,
+    run_id TEXT,
+    name TEXT NOT NULL,
+    path TEXT,
+    pdf_path TEXT,
+    status TEXT,
+    prompt TEXT,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reports_run ON reports (run_id);
+
+CREATE TABLE IF NOT EXISTS report_files (
+    path TEXT PRIMARY KEY,
+    report_id TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS report_runs (
+    report_id TEXT PRIMARY KEY,
+    prompt TEXT,
+    status TEXT,
+    day TEXT,
+    start_time TEXT,
+    duration_ms INTEGER,
+    total_steps INTEGER,
+    failed_steps INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_report_runs_start ON report_runs (start_time);
+CREATE INDEX IF NOT EXISTS idx_report_runs_status ON report_runs (status, start_time);
+CREATE TABLE IF NOT EXISTS report_steps (
+    report_id TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    day TEXT,
+    action TEXT,
+    status TEXT,
+    duration_ms INTEGER,
+    locator_strategy TEXT,
+    locator_value TEXT,
+    error TEXT,
+    PRIMARY KEY (report_id, step)
+);
+CREATE INDEX IF NOT EXISTS idx_report_steps_action ON report_steps (action, day);
+
+CREATE TABLE IF NOT EXISTS rollup_prompts (
+    day TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    runs INTEGER NOT NULL,
+    failures INTEGER NOT NULL,
+    PRIMARY KEY (day, prompt)
+);
+CREATE TABLE IF NOT EXISTS rollup_actions (
+    day TEXT NOT NULL,
+    action TEXT NOT NULL,
+    steps INTEGER NOT NULL,
+    failures INTEGER NOT NULL,
+    timed_steps INTEGER NOT NULL,
+    total_ms INTEGER NOT NULL,
+    max_ms INTEGER NOT NULL,
+    PRIMARY KEY (day, action)
+);
+CREATE TABLE IF NOT EXISTS rollup_locators (
+    day TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    value TEXT NOT NULL,
+    failures INTEGER NOT NULL,
+    PRIMARY KEY (day, strategy, value)
+);
+"""
+
+# ReportEntry field -> column
+_FIELDS = {
+    "id": "id",
+    "runId": "run_id",
+    "name": "name",
+    "path": "path",
+    "pdfPath": "pdf_path",
+    "status": "status",
+    "prompt": "prompt",
+    "createdAt": "created_at",
+}
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _step_locator(step: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    arguments = step.get("arguments")
+    if not isinstance(arguments, dict):
+        return None, None
+    strategy = arguments.get("strategy") or arguments.get("by")
+    value = arguments.get("value") or arguments.get("selector")
+    if strategy and value:
+        return str(strategy), str(value)[:500]
+    return None, None
+
+
+def summarize_report(report_id: str, data: Dict[str, Any]) -> Tuple[Tuple, List[Tuple]]:
+    """Flatten a JSON report into a report_runs row and report_steps rows."""
+    start = _parse_time(data.get("start_time"))
+    end = _parse_time(data.get("end_time"))
+    day = start.date().isoformat() if start else ""
+    steps = [step for step in data.get("steps") or [] if isinstance(step, dict)]
+
+    step_rows = []
+    previous = start
+    for index, step in enumerate(steps, 1):
+        stamp = _parse_time(step.get("timestamp"))
+        # Prefer the measured interval; older reports only have the stamp
+        # taken when each step was recorded
+        timings = step.get("timings")
+        duration_ms = None
+        if isinstance(timings, dict) and timings.get("duration_ms") is not None:
+            duration_ms = int(timings["duration_ms"])
+        elif stamp and previous:
+            duration_ms = max(0, int((stamp - previous).total_seconds() * 1000))
+        if stamp:
+            previous = stamp
+        strategy, value = _step_locator(step)
+        step_rows.append((
+            report_id,
+            int(step.get("step") or index),
+            day,
+            str(step.get("action") or "unknown"),
+            str(step.get("status") or ("PASS" if step.get("success") else "FAIL")),
+            duration_ms,
+            strategy,
+            value,
+            (str(step["error"])[:500] if step.get("error") else None),
+        ))
+
+    status = str(data.get("status") or "unknown")
+    run_row = (
+        report_id,
+        str(data.get("user_prompt") or ""),
+        status,
+        day,
+        start.isoformat() if start else None,
+        int((end - start).total_seconds() * 1000) if start and end else None,
+        len(steps),
+        sum(1 for row in step_rows if row[4] == "FAIL"),
+    )
+    return run_row, step_rows
+
+
+class ReportIndex:
+    """O(1) report lookups by report id and by run id, plus aggregate queries."""
+
+    def __init__(self, db_path: Path | str = RUNS_DB_PATH) -> None:
+        self.db_path = Path(db_path)
+        self._db: Optional[sqlite3.Connection] = None
+        self._open_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_run: Dict[str, str] = {}
+
+    def _load(self) -> sqlite3.Connection:
+        """Open the database and load the entries on first use (not at import)."""
+        if self._db is None:
+            with self._open_lock:
+                if self._db is None:
+                    conn = connect(self.db_path)
+                    conn.row_factory = sqlite3.Row
+                    conn.executescript(_SCHEMA)
+                    conn.commit()
+                    rows = conn.execute(f"SELECT {', '.join(_FIELDS.values())} FROM reports").fetchall()
+                    for row in rows:
+                        self._remember({key: row[column] for key, column in _FIELDS.items()})
+                    self._db = conn
+        return self._db
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self._load()
+
+    def _remember(self, entry: Dict[str, Any]) -> None:
+        self._by_id[entry["id"]] = entry
+        if entry.get("runId"):
+            self._by_run[entry["runId"]] = entry["id"]
+
+    def _upsert(self, entry: Dict[str, Any]) -> None:
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO reports ({', '.join(_FIELDS.values())}) "
+            f"VALUES ({', '.join('?' for _ in _FIELDS)})",
+            [entry[key] for key in _FIELDS],
+        )
+        self._remember(entry)
+
+    def add(self, report: Dict[str, Any], run_id: Optional[str] = None) -> Dict[str, Any]:
+        """Index a report event payload (id, name, path, pdfPath, ...).
+
+        Args:
+            report: The "report" object emitted by the runner
+            run_id: Run that produced the report
+
+        Returns:
+            The stored entry
+        """
+        entry = {key: report.get(key) for key in _FIELDS if key != "runId"}
+        entry["runId"] = run_id or report.get("runId")
+        entry["name"] = entry.get("name") or entry["id"]
+        with self._lock:
+            self._upsert(entry)
+            self._conn.commit()
+        return dict(entry)
+
+    def update(self, report_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """Patch an indexed report (e.g. once its PDF exists)."""
+        self._load()
+        entry = self._by_id.get(report_id)
+        if entry is None:
+            return None
+        changes = {key: value for key, value in fields.items() if key in _FIELDS and key != "id"}
+        if not changes:
+            return dict(entry)
+        assignments = ", ".join(f"{_FIELDS[key]} = ?" for key in changes)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE reports SET {assignments} WHERE id = ?",
+                [*changes.values(), report_id],
+            )
+            self._conn.commit()
+            entry.update(changes)
+            self._remember(entry)
+        return dict(entry)
+
+    def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        self._load()
+        entry = self._by_id.get(report_id)
+        return dict(entry) if entry else None
+
+    def for_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        self._load()
+        report_id = self._by_run.get(run_id)
+        return self.get(report_id) if report_id else None
+
+    def all(self) -> List[Dict[str, Any]]:
+        self._load()
+        return [dict(entry) for entry in self._by_id.values()]
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def _apply_rollups(self, run_row: Tuple, step_rows: Iterable[Tuple], sign: int) -> None:
+        _, prompt, status, day, _, _, _, _ = run_row
+        failed = 1 if status in FAILED_STATUSES else 0
+        self._conn.execute(
+            "INSERT INTO rollup_prompts (day, prompt, runs, failures) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (day, prompt) DO UPDATE SET runs = runs + excluded.runs, "
+            "failures = failures + excluded.failures",
+            (day, prompt, sign, sign * failed),
+        )
+        actions: Dict[str, List[int]] = {}
+        locators: Dict[Tuple[str, str], int] = {}
+        for _, _, _, action, step_status, duration_ms, strategy, value, _ in step_rows:
+            totals = actions.setdefault(action, [0, 0, 0, 0, 0])
+            totals[0] += 1
+            if step_status == "FAIL":
+                totals[1] += 1
+                if strategy and value:
+                    locators[(strategy, value)] = locators.get((strategy, value), 0) + 1
+            if duration_ms is not None:
+                totals[2] += 1
+                totals[3] += duration_ms
+                totals[4] = max(totals[4], duration_ms)
+        for action, (steps, failures, timed, total_ms, max_ms) in actions.items():
+            # max_ms only grows; a removed report can leave a stale maximum
+            self._conn.execute(
+                "INSERT INTO rollup_actions (day, action, steps, failures, timed_steps, total_ms, max_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (day, action) DO UPDATE SET "
+                "steps = steps + excluded.steps, failures = failures + excluded.failures, "
+                "timed_steps = timed_steps + excluded.timed_steps, total_ms = total_ms + excluded.total_ms, "
+                "max_ms = MAX(max_ms, excluded.max_ms)",
+                (day, action, sign * steps, sign * failures, sign * timed, sign * total_ms, max_ms if sign > 0 else 0),
+            )
+        for (strategy, value), failures in locators.items():
+            self._conn.execute(
+                "INSERT INTO rollup_locators (day, strategy, value, failures) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (day, strategy, value) DO UPDATE SET failures = failures + excluded.failures",
+                (day, strategy, value, sign * failures),
+            )
+
+    def _forget_report(self, report_id: str) -> None:
+        run = self._conn.execute(
+            "SELECT report_id, prompt, status, day, start_time, duration_ms, total_steps, failed_steps "
+            "FROM report_runs WHERE report_id = ?", (report_id,)
+        ).fetchone()
+        if run is None:
+            return
+        steps = self._conn.execute(
+            "SELECT report_id, step, day, action, status, duration_ms, locator_strategy, locator_value, error "
+            "FROM report_steps WHERE report_id = ?", (report_id,)
+        ).fetchall()
+        self._apply_rollups(tuple(run), [tuple(step) for step in steps], -1)
+        self._conn.execute("DELETE FROM report_steps WHERE report_id = ?", (report_id,))
+        self._conn.execute("DELETE FROM report_runs WHERE report_id = ?", (report_id,))
+
+    def _ingest(self, path: Path, stat: os.stat_result, data: Dict[str, Any]) -> None:
+        """Replace everything indexed for one report file. Caller holds the lock."""
+        report_id = path.stem
+        self._forget_report(report_id)
+        run_row, step_rows = summarize_report(report_id, data)
+        self._conn.execute(
+            "INSERT INTO report_runs (report_id, prompt, status, day, start_time, duration_ms, "
+            "total_steps, failed_steps) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            run_row,
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO report_steps (report_id, step, day, action, status, duration_ms, "
+            "locator_strategy, locator_value, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            step_rows,
+        )
+        self._apply_rollups(run_row, step_rows, 1)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO report_files (path, report_id, size, mtime_ns) VALUES (?, ?, ?, ?)",
+            (str(path), report_id, stat.st_size, stat.st_mtime_ns),
+        )
+        entry = self._by_id.get(report_id)
+        if entry is None:
+            # Historical report that never came through a run event
+            self._upsert({
+                "id": report_id,
+                "runId": None,
+                "name": path.name,
+                "path": str(path),
+                "pdfPath": None,
+                "status": run_row[2],
+                "prompt": run_row[1],
+                "createdAt": run_row[4],
+            })
+
+    def _is_current(self, path: Path, stat: os.stat_result) -> bool:
+        row = self._conn.execute(
+            "SELECT size, mtime_ns FROM report_files WHERE path = ?", (str(path),)
+        ).fetchone()
+        return row is not None and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns
+
+    def ingest_file(self, path: Path) -> bool:
+        """Index one JSON report if it is new or changed.
+
+        Returns:
+            True if the file was (re)indexed
+        """
+        path = Path(path)
+        stat = path.stat()
+        with self._lock:
+            if self._is_current(path, stat):
+                return False
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        with self._lock:
+            self._ingest(path, stat, data)
+            self._conn.commit()
+        return True
+
+    def sync(self, reports_dir: Path = REPORTS_DIR) -> Dict[str, int]:
+        """Bring the index up to date with reports_dir.
+
+        Only files whose size or mtime changed are parsed; reports whose file
+        disappeared are dropped from the aggregates and release their
+        screenshot blobs.
+
+        Returns:
+            Counts of scanned, indexed, unchanged, failed and removed files
+        """
+        with self._lock:
+            known = {
+                row["path"]: (row["size"], row["mtime_ns"])
+                for row in self._conn.execute("SELECT path, size, mtime_ns FROM report_files")
+            }
+        counts = {"scanned": 0, "indexed": 0, "unchanged": 0, "failed": 0, "removed": 0}
+        seen = set()
+        pending: List[Tuple[Path, os.stat_result, Dict[str, Any]]] = []
+
+        def flush() -> None:
+            with self._lock:
+                for item in pending:
+                    self._ingest(*item)
+                self._conn.commit()
+            counts["indexed"] += len(pending)
+            pending.clear()
+
+        for path in Path(reports_dir).glob(REPORT_FILE_GLOB):
+            counts["scanned"] += 1
+            seen.add(str(path))
+            try:
+                stat = path.stat()
+                if known.get(str(path)) == (stat.st_size, stat.st_mtime_ns):
+                    counts["unchanged"] += 1
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                # Missing or still being written; picked up on the next sync
+                counts["failed"] += 1
+                continue
+            pending.append((path, stat, data))
+            if len(pending) >= INGEST_BATCH_SIZE:
+                flush()
+        if pending:
+            flush()
+
+        removed = [path for path in known if path not in seen and Path(path).parent == Path(reports_dir)]
+        if removed:
+            forgotten = []
+            with self._lock:
+                for path in removed:
+                    row = self._conn.execute(
+                        "SELECT report_id FROM report_files WHERE path = ?", (path,)
+                    ).fetchone()
+                    if row is not None:
+                        self._forget_report(row["report_id"])
+                        forgotten.append(row["report_id"])
+                    self._conn.execute("DELETE FROM report_files WHERE path = ?", (path,))
+                self._conn.commit()
+            # After the commit: the blob store writes to the same database
+            for report_id in forgotten:
+                blob_store.release(f"report:{report_id}")
+            counts["removed"] = len(removed)
+        return counts
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _query(self, sql: str, params: Iterable[Any]) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, list(params)).fetchall()]
+
+    @staticmethod
+    def _day_range(since: Optional[str], until: Optional[str]) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        if since:
+            clauses.append("day >= ?")
+            params.append(since[:10])
+        if until:
+            clauses.append("day <= ?")
+            params.append(until[:10])
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def prompt_stats(
+        self, since: Optional[str] = None, until: Optional[str] = None, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Prompts ordered by failure count (e.g. "which prompts failed most this week")."""
+        where, params = self._day_range(since, until)
+        return self._query(
+            f"SELECT prompt, SUM(runs) AS runs, SUM(failures) AS failures FROM rollup_prompts{where} "
+            "GROUP BY prompt HAVING SUM(runs) > 0 ORDER BY failures DESC, runs DESC LIMIT ?",
+            [*params, limit],
+        )
+
+    def action_stats(self, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-action step counts, failures and average / max latency."""
+        where, params = self._day_range(since, until)
+        rows = self._query(
+            f"SELECT action, SUM(steps) AS steps, SUM(failures) AS failures, "
+            f"SUM(timed_steps) AS timed, SUM(total_ms) AS total_ms, MAX(max_ms) AS maxMs "
+            f"FROM rollup_actions{where} GROUP BY action HAVING SUM(steps) > 0 ORDER BY steps DESC",
+            params,
+        )
+        for row in rows:
+            timed = row.pop("timed")
+            total_ms = row.pop("total_ms")
+            row["avgMs"] = round(total_ms / timed, 1) if timed else None
+        return rows
+
+    def locator_stats(
+        self, since: Optional[str] = None, until: Optional[str] = None, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Locators with the most failed steps."""
+        where, params = self._day_range(since, until)
+        return self._query(
+            f"SELECT strategy, value, SUM(failures) AS failures FROM rollup_locators{where} "
+            "GROUP BY strategy, value HAVING SUM(failures) > 0 ORDER BY failures DESC LIMIT ?",
+            [*params, limit],
+        )
+
+    def search(
+        self,
+        status: Optional[str] = None,
+        prompt: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """Indexed runs, newest first, filtered by status / prompt substring / time."""
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if prompt:
+            clauses.append("prompt LIKE ?")
+            params.append(f"%{prompt}%")
+        if since:
+            clauses.append("start_time >= ?")
+            params.append(since)
+        if until:
+            clauses.append("start_time <= ?")
+            params.append(until)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        return self._query(
+            "SELECT report_id AS id, prompt, status, start_time AS startTime, duration_ms AS durationMs, "
+            f"total_steps AS totalSteps, failed_steps AS failedSteps FROM report_runs{where} "
+            "ORDER BY start_time DESC LIMIT ?",
+            [*params, limit],
+        )
+
+
+report_index = ReportIndex()
+
+
+__all__ = ["ReportIndex", "report_index", "summarize_report"]
@@ -2,12 +2,158 @@
 Test Report Management Module
 
 Handles creation, tracking, and saving of test execution reports in JSON format.
+
+Steps are appended to a JSONL journal as they happen (fsync'd in batches);
+the full JSON report is written every REPORT_SNAPSHOT_EVERY steps (so a
+readable report exists mid-run) and when the report is finalized.
+All report I/O runs on a background writer thread so disk latency stays off
+the automation loop; finalize() and flush() wait for it to be durable.
 """
 import json
 from datetime import datetime
 import os
+import queue
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+
+from timing import step_timer
+
+# fsync the step journal after this many records or seconds, whichever first
+REPORT_JOURNAL_FSYNC_EVERY = int(os.getenv('REPORT_JOURNAL_FSYNC_EVERY', '10'))
+REPORT_JOURNAL_FSYNC_INTERVAL = float(os.getenv('REPORT_JOURNAL_FSYNC_INTERVAL', '1.0'))
+JOURNAL_SUFFIX = '.journal.jsonl'
+# Set REPORT_BACKGROUND_WRITER=0 to do report I/O inline on the caller thread
+REPORT_BACKGROUND_WRITER = os.getenv('REPORT_BACKGROUND_WRITER', 'true').lower() in ('1', 'true', 'yes')
+REPORT_WRITER_QUEUE_SIZE = int(os.getenv('REPORT_WRITER_QUEUE_SIZE', '1000'))
+# main.py requests a full JSON snapshot every this many steps (0 disables)
+REPORT_SNAPSHOT_EVERY = int(os.getenv('REPORT_SNAPSHOT_EVERY', '10'))
+
+
+def journal_path_for(report_path: Path) -> Path:
+    """Path of the step journal that belongs to a JSON report."""
+    return report_path.with_name(report_path.stem + JOURNAL_SUFFIX)
+
+
+def _write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ReportWriter:
+    """Owns the journal file and JSON snapshots for one TestReport.
+
+    Callers enqueue work on a bounded queue (blocking when it is full); the
+    writer thread drains whatever is queued in one go, so a burst of journal
+    records becomes a single write and any number of pending save requests
+    become a single snapshot.
+    """
+
+    def __init__(self, report: "TestReport", background: bool = REPORT_BACKGROUND_WRITER):
+        self._report = report
+        self._background = background
+        self._queue: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=REPORT_WRITER_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._journal = None
+        self._pending_fsync = 0
+        self._synced_at = time.monotonic()
+        self.journal_writes = 0
+        self.snapshots = 0
+        self.coalesced_saves = 0
+
+    def _submit(self, kind: str, payload: Any = None) -> None:
+        if not self._background:
+            self._process([(kind, payload)])
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="report-writer", daemon=True)
+            self._thread.start()
+        self._queue.put((kind, payload))
+
+    def append(self, line: str) -> None:
+        self._submit("line", line)
+
+    def request_save(self) -> None:
+        self._submit("save")
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until everything queued so far is written and fsync'd."""
+        done = threading.Event()
+        self._submit("flush", done)
+        return done.wait(timeout)
+
+    def close(self, remove_journal: bool = False, timeout: float = 10.0) -> None:
+        done = threading.Event()
+        self._submit("close", (done, remove_journal))
+        done.wait(timeout)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._process(batch)
+            except Exception as e:
+                print(f"[WARN]  Report writer error: {e}")
+                # Never leave a flush()/close() caller hanging
+                for kind, payload in batch:
+                    if kind == "flush":
+                        payload.set()
+                    elif kind == "close":
+                        payload[0].set()
+
+    def _process(self, batch: List[Tuple[str, Any]]) -> None:
+        lines = [payload for kind, payload in batch if kind == "line"]
+        if lines:
+            if self._journal is None:
+                self._journal = open(self._report.journal_path, 'a', encoding='utf-8')
+            self._journal.write(''.join(lines))
+            self._journal.flush()
+            self._pending_fsync += len(lines)
+            self.journal_writes += 1
+
+        saves = sum(1 for kind, _ in batch if kind == "save")
+        if saves:
+            self._report._write_snapshot()
+            self.snapshots += 1
+            self.coalesced_saves += saves - 1
+
+        barriers = [payload for kind, payload in batch if kind in ("flush", "close")]
+        if barriers or self._pending_fsync >= REPORT_JOURNAL_FSYNC_EVERY or (
+                self._pending_fsync and time.monotonic() - self._synced_at >= REPORT_JOURNAL_FSYNC_INTERVAL):
+            self._fsync()
+
+        for kind, payload in batch:
+            if kind == "flush":
+                payload.set()
+            elif kind == "close":
+                done, remove_journal = payload
+                if self._journal is not None:
+                    self._journal.close()
+                    self._journal = None
+                if remove_journal:
+                    try:
+                        self._report.journal_path.unlink()
+                    except FileNotFoundError:
+                        pass
+                done.set()
+
+    def _fsync(self) -> None:
+        if self._journal is None or self._pending_fsync == 0:
+            return
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._pending_fsync = 0
+        self._synced_at = time.monotonic()
 
 
 class TestReport:
@@ -38,6 +184,51 @@ class TestReport:
         
         self.step_counter = 0
         self.session_report_filename: Optional[Path] = None
+        self._journal_started = False
+        self._writer = ReportWriter(self)
+        step_timer.reset()
+
+    def _report_path(self) -> Path:
+        if self.session_report_filename is None:
+            # Create new report file name at start of session
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.session_report_filename = self.reports_dir / f"test_report_{timestamp}.json"
+        return self.session_report_filename
+
+    @property
+    def journal_path(self) -> Path:
+        return journal_path_for(self._report_path())
+
+    def _append_journal(self, record: Dict[str, Any]) -> None:
+        """Queue one record for the step journal (written in the background)."""
+        if not self._journal_started:
+            self._journal_started = True
+            self._writer.append(json.dumps({
+                "type": "meta",
+                "user_prompt": self.report["user_prompt"],
+                "start_time": self.report["start_time"],
+            }, ensure_ascii=False) + '\n')
+        self._writer.append(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def sync_journal(self) -> None:
+        """Force journaled steps to disk."""
+        self._writer.flush()
+
+    def flush(self) -> bool:
+        """Wait until all queued report I/O is durable on disk.
+
+        Returns:
+            False if the writer did not finish within its timeout
+        """
+        return self._writer.flush()
+
+    def _write_snapshot(self) -> None:
+        # Shallow copies are taken under the GIL; step dicts are never
+        # mutated after being appended, so this is a consistent snapshot.
+        snapshot = dict(self.report)
+        snapshot["steps"] = list(self.report["steps"])
+        snapshot["reflections"] = list(self.report["reflections"])
+        _write_json_atomic(self._report_path(), snapshot)
     
     def add_reflection(self, step_number: int, reflection_text: str):
         """Add a reflection analysis for a failed step.
@@ -46,11 +237,13 @@ class TestReport:
             step_number: The step number that failed
             reflection_text: Claude's reflection analysis
         """
-        self.report["reflections"].append({
+        reflection = {
             "step": step_number,
             "timestamp": datetime.now().isoformat(),
             "reflection": reflection_text
-        })
+        }
+        self.report["reflections"].append(reflection)
+        self._append_journal({"type": "reflection", "reflection": reflection})
     
     def add_step(self, action_name: str, args: Dict[str, Any], result: Any, success: bool, is_assertion: bool = False, description: Optional[str] = None):
         """Add a step to the report.
@@ -86,6 +279,7 @@ class TestReport:
                 return value
 
         sanitized_result = _sanitize(result)
+        timings = step_timer.end_step()
         
         step_info = {
             "step": self.step_counter,
@@ -107,6 +301,8 @@ class TestReport:
             "claude_reasoning": None,
             "recovery_attempts": None
         }
+        if timings is not None:
+            step_info["timings"] = timings
         
         # Extract enhanced data from result if available
         if isinstance(result, dict):
@@ -134,25 +330,22 @@ class TestReport:
         self.report["steps"].append(step_info)
         self.report["total_steps"] = self.step_counter
         
-        # Save report after each step (for real-time updates)
-        self.save()
+        # Journal the step instead of rewriting the whole report
+        self._append_journal({"type": "step", "step": step_info})
     
     def save(self) -> Path:
-        """Save the report to a JSON file.
+        """Request a write of the full JSON report (compaction of the journal).
+        
+        Saves are coalesced by the background writer; call flush() (or
+        finalize()) when the file must be on disk.
         
         Returns:
-            Path to the saved report file
+            Path to the report file
         """
-        if self.session_report_filename is None:
-            # Create new report file at start of session
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            self.session_report_filename = self.reports_dir / f"test_report_{timestamp}.json"
-        
-        # Update the same file throughout the session
-        with open(self.session_report_filename, 'w', encoding='utf-8') as f:
-            json.dump(self.report, f, indent=2, ensure_ascii=False)
-        
-        return self.session_report_filename
+        with step_timer.span("report_save"):
+            report_path = self._report_path()
+            self._writer.request_save()
+        return report_path
     
     def finalize(self, status: str = "completed", error: Optional[str] = None) -> Path:
         """Finalize the report and save it.
@@ -178,6 +371,9 @@ class TestReport:
                 status = "failed"
         
         self.report["status"] = status
+        timings = step_timer.summary()
+        if timings is not None:
+            self.report["timings"] = timings
         
         # Only set error if there's an actual error and status is error/failed
         if error and status in ("error", "failed"):
@@ -190,7 +386,14 @@ class TestReport:
             # Store it as a warning instead
             self.report["warning"] = error
         
-        return self.save()
+        # Drain pending writes, then write the final report on this thread so
+        # it is durable before the path is printed for the runner.
+        self._writer.flush()
+        report_path = self._report_path()
+        self._write_snapshot()
+        # The JSON report now holds everything the journal did
+        self._writer.close(remove_journal=True)
+        return report_path
 
     def add_skipped_steps(self, planned_steps: Any, start_from_step_index: int) -> None:
         """Append planned steps as SKIPPED from the given step index (1-based).
@@ -218,7 +421,8 @@ class TestReport:
                     self.report["steps"].append(step_info)
                     self.report["skipped_steps"] += 1
                     self.report["total_steps"] = self.step_counter
-                self.save()
+                    self._append_journal({"type": "step", "step": step_info})
+                self.sync_journal()
                 return
             
             # Get executed step descriptions for comparison
@@ -285,6 +489,7 @@ class TestReport:
                     self.report["steps"].append(step_info)
                     self.report["skipped_steps"] += 1
                     self.report["total_steps"] = self.step_counter
+                    self._append_journal({"type": "step", "step": step_info})
                     appended_any = True
 
             # If no planned steps matched, add a generic skipped step
@@ -311,7 +516,8 @@ class TestReport:
                     self.report["steps"].append(step_info)
                     self.report["skipped_steps"] += 1
                     self.report["total_steps"] = self.step_counter
-            self.save()
+                    self._append_journal({"type": "step", "step": step_info})
+            self.sync_journal()
         except Exception:
             # Do not block on reporting errors
             pass
@@ -344,3 +550,104 @@ class TestReport:
         
         return '\n'.join(lines) if lines else "No steps recorded."
 
+
+def compact_journal(journal_path: Path, status: str = "interrupted") -> Optional[Path]:
+    """Rebuild the JSON report from an orphaned step journal (e.g. after a crash).
+
+    Args:
+        journal_path: Path to a *.journal.jsonl file
+        status: Status to record, since the run never finalized
+
+    Returns:
+        Path to the written JSON report, or None if the journal is unusable
+    """
+    report: Dict[str, Any] = {
+        "user_prompt": "",
+        "start_time": None,
+        "end_time": None,
+        "steps": [],
+        "total_steps": 0,
+        "successful_steps": 0,
+        "failed_steps": 0,
+        "skipped_steps": 0,
+        "status": status,
+        "reflections": []
+    }
+    try:
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn final line from a crash mid-write
+                    continue
+                kind = record.get("type")
+                if kind == "meta":
+                    report["user_prompt"] = record.get("user_prompt", "")
+                    report["start_time"] = record.get("start_time")
+                elif kind == "step":
+                    report["steps"].append(record["step"])
+                elif kind == "reflection":
+                    report["reflections"].append(record["reflection"])
+    except OSError:
+        return None
+
+    for step in report["steps"]:
+        status_value = step.get("status")
+        if status_value == "PASS":
+            report["successful_steps"] += 1
+        elif status_value == "SKIPPED":
+            report["skipped_steps"] += 1
+        else:
+            report["failed_steps"] += 1
+    report["total_steps"] = len(report["steps"])
+
+    name = journal_path.name
+    if not name.endswith(JOURNAL_SUFFIX):
+        return None
+    report_path = journal_path.with_name(name[:-len(JOURNAL_SUFFIX)] + '.json')
+    _write_json_atomic(report_path, report)
+    return report_path
+
+
+def recover_orphaned_journals(
+    reports_dir: Path,
+    modified_since: Optional[float] = None,
+    modified_before: Optional[float] = None,
+) -> List[Path]:
+    """Compact step journals left behind by runs that never finalized.
+
+    A finalized run removes its journal, so any journal still on disk belongs
+    to a run that crashed or was killed (or to one still running, which the
+    time bounds are there to exclude). Each is compacted into its JSON report
+    and then removed.
+
+    Args:
+        reports_dir: Directory holding reports and journals
+        modified_since: Only journals last written at or after this time (epoch seconds)
+        modified_before: Only journals last written before this time (epoch seconds)
+
+    Returns:
+        Paths of the recovered JSON reports
+    """
+    recovered: List[Path] = []
+    for journal_path in sorted(Path(reports_dir).glob(f"test_report_*{JOURNAL_SUFFIX}")):
+        try:
+            mtime = journal_path.stat().st_mtime
+        except OSError:
+            continue
+        if modified_since is not None and mtime < modified_since:
+            continue
+        if modified_before is not None and mtime >= modified_before:
+            continue
+        report_path = compact_journal(journal_path)
+        if report_path is None:
+            print(f"[WARN]  Could not recover report from journal {journal_path.name}")
+            continue
+        try:
+            journal_path.unlink()
+        except OSError:
+            pass
+        print(f"[INFO]  Recovered interrupted report {report_path.name}")
+        recovered.append(report_path)
+    return recovered
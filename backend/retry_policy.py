@@ -0,0 +1,379 @@
+"""
+Retry Policy Module
+
+Declarative retry policies for tool calls. A failed call's error is
+classified (not_found, stale, session_crash, timeout, other) and the tool's
+policy walks its strategies in order, running only those that can help with
+that error class. Every policy has a time budget: a strategy starts only if
+its worst-case duration fits in what is left, and waits inside a strategy are
+clamped to the remaining budget, so a step never spends more than the first
+call plus the budget.
+
+The outcome is attached to the result as result["retry"] (strategies run,
+skipped and why, elapsed and budget) and counted per strategy in
+automation_retry_strategies_total.
+"""
+from __future__ import annotations
+
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+import appium_tools
+from metrics import RETRY_STRATEGIES
+from session_health import SESSION_CRASH_PATTERN
+from timing import step_timer, timed_sleep
+
+RETRY_BUDGET_SECONDS = float(os.getenv("AUTOMATION_RETRY_BUDGET", "20"))
+# Pause before each retry strategy, to let animations settle
+RETRY_SETTLE_SECONDS = float(os.getenv("AUTOMATION_RETRY_SETTLE", "0.3"))
+
+NOT_FOUND = "not_found"
+STALE = "stale"
+SESSION_CRASH = "session_crash"
+TIMEOUT = "timeout"
+OTHER = "other"
+
+# Checked in order; the first class with a matching pattern wins
+_ERROR_PATTERNS: Tuple[Tuple[str, "re.Pattern[str]"], ...] = (
+    (SESSION_CRASH, SESSION_CRASH_PATTERN),
+    (STALE, re.compile(r"stale element|staleelementreference|no longer attached", re.IGNORECASE)),
+    (NOT_FOUND, re.compile(
+        r"not found|nosuchelement|could not be located|unable to (?:find|locate)|no element",
+        re.IGNORECASE,
+    )),
+    (TIMEOUT, re.compile(r"timed? ?out|timeout", re.IGNORECASE)),
+)
+
+
+def is_success(result: Any) -> bool:
+    """Whether a tool result counts as success (non-dict, non-error results do)."""
+    if isinstance(result, dict):
+        success_value = result.get("success")
+        if success_value is True or str(success_value).lower() == "true":
+            return True
+        if success_value is False or str(success_value).lower() == "false":
+            return False
+    if isinstance(result, str) and result.startswith("Error:"):
+        return False
+    return True
+
+
+def error_text(result: Any) -> str:
+    if isinstance(result, dict):
+        return str(result.get("error") or result.get("message") or "Action returned success: false")
+    return str(result)
+
+
+def classify_error(error: Any) -> str:
+    """Error class of an error message or failed tool result."""
+    text = error if isinstance(error, str) else error_text(error)
+    for error_class, pattern in _ERROR_PATTERNS:
+        if pattern.search(text):
+            return error_class
+    return OTHER
+
+
+@dataclass
+class RetryContext:
+    """What a strategy needs to retry one tool call."""
+
+    function_name: str
+    function_args: Dict[str, Any]
+    available_functions: Dict[str, Callable]
+    deadline: float
+    round_trips_before: Tuple[int, int]
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.perf_counter())
+
+    def timeout_ms(self, preferred_ms: int, reserve_seconds: float = 2.0) -> int:
+        """preferred_ms clamped to the budget left after reserve_seconds."""
+        return max(0, min(preferred_ms, int((self.remaining() - reserve_seconds) * 1000)))
+
+    def call(self, function_name: Optional[str] = None, **args: Any) -> Any:
+        """Call a tool; without a name, repeats the original call."""
+        if function_name is None:
+            return self.available_functions[self.function_name](**self.function_args)
+        function = self.available_functions.get(function_name) or getattr(appium_tools, function_name)
+        return function(**args)
+
+
+@dataclass(frozen=True)
+class Strategy:
+    """One way of retrying a failed call.
+
+    run() returns the new result, or None when its preparation failed and the
+    call was not repeated. max_seconds is its worst case apart from waits,
+    which are clamped to the budget left.
+    """
+
+    name: str
+    handles: FrozenSet[str]
+    run: Callable[[RetryContext], Any]
+    max_seconds: float = 2.0
+    applies: Optional[Callable[[RetryContext], bool]] = None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    strategies: Tuple[Strategy, ...] = ()
+    budget_seconds: float = RETRY_BUDGET_SECONDS
+
+
+def _retry_as_is(ctx: RetryContext) -> Any:
+    return ctx.call()
+
+
+def _recover_session(ctx: RetryContext) -> Any:
+    if not appium_tools._try_recover_session():
+        return None
+    return ctx.call()
+
+
+def _scroll_into_view(ctx: RetryContext) -> Any:
+    print("  [FALLBACK] Scrolling to element before retrying...")
+    scroll_result = appium_tools.scroll_to_element(
+        strategy=ctx.function_args.get("strategy", "id"), value=ctx.function_args.get("value", "")
+    )
+    if not is_success(scroll_result):
+        return None
+    timed_sleep(0.2)
+    return ctx.call()
+
+
+def _wait_then_retry(ctx: RetryContext) -> Any:
+    timeout_ms = ctx.timeout_ms(10000)
+    print(f"  [FALLBACK] Waiting up to {timeout_ms}ms for element, then retrying...")
+    wait_result = appium_tools.wait_for_element(
+        strategy=ctx.function_args.get("strategy", "id"), value=ctx.function_args.get("value", ""),
+        timeoutMs=timeout_ms,
+    )
+    if not is_success(wait_result):
+        return None
+    timed_sleep(0.2)
+    return ctx.call()
+
+
+def _ensure_focus_and_type(ctx: RetryContext) -> Any:
+    print("  [FALLBACK] Trying ensure_focus_and_type instead of send_keys...")
+    return ctx.call(
+        "ensure_focus_and_type",
+        strategy=ctx.function_args.get("strategy", "id"),
+        value=ctx.function_args.get("value", ""),
+        text=ctx.function_args.get("text", ""),
+        timeoutMs=ctx.timeout_ms(10000),
+        hideKeyboard=False,
+    )
+
+
+def _click_then_retry(ctx: RetryContext) -> Any:
+    print("  [FALLBACK] Clicking element first, then retrying...")
+    click_result = appium_tools.click(
+        strategy=ctx.function_args.get("strategy", "id"), value=ctx.function_args.get("value", "")
+    )
+    if not is_success(click_result):
+        return None
+    timed_sleep(0.2)
+    return ctx.call()
+
+
+def alternate_click_selectors(value: str) -> List[Dict[str, str]]:
+    """Alternate selectors to try for known problematic click targets."""
+    normalized_value = (value or "").strip().lower()
+    if normalized_value in {"compose", "compose button"}:
+        # Gmail compose floating action button
+        return [
+            {"strategy": "id", "value": "com.google.android.gm:id/compose_button"},
+            {"strategy": "id", "value": "com.google.android.gm:id/compose_button_icon"},
+            {"strategy": "text", "value": "Compose"},
+            {"strategy": "content-desc", "value": "Compose new email"},
+        ]
+    if normalized_value in {"new message", "new mail", "new email"}:
+        return [{"strategy": "id", "value": "com.google.android.gm:id/compose_button"}]
+    return []
+
+
+def _alternate_selectors(ctx: RetryContext) -> Any:
+    strategy = ctx.function_args.get("strategy", "id")
+    value = ctx.function_args.get("value", "")
+    print("  [FALLBACK] Trying alternate selectors for click target...")
+    result = None
+    for alt in alternate_click_selectors(value):
+        if ctx.remaining() <= 0:
+            break
+        print(f"    ↳ Trying {alt['strategy']}={alt['value']}")
+        result = ctx.call("click", strategy=alt["strategy"], value=alt["value"])
+        if is_success(result):
+            appium_tools.learn_click_locator(strategy, value, alt, ctx.round_trips_before)
+            break
+    return result
+
+
+def _back_out_and_retry(ctx: RetryContext) -> Any:
+    print("  [FALLBACK] Pressing back to exit current view before reattempting click...")
+    result = None
+    for _ in range(2):
+        if ctx.remaining() < 1.0:
+            break
+        ctx.call("press_back_button")
+        timed_sleep(0.4)
+        result = ctx.call()
+        if is_success(result):
+            break
+    return result
+
+
+RETRY_AS_IS = Strategy("retry", frozenset({STALE, TIMEOUT}), _retry_as_is, max_seconds=5.0)
+RETRY_ANY = Strategy("retry", frozenset({STALE, TIMEOUT, OTHER}), _retry_as_is, max_seconds=5.0)
+RECOVER_SESSION = Strategy("recover_session", frozenset({SESSION_CRASH}), _recover_session, max_seconds=15.0)
+SCROLL_INTO_VIEW = Strategy("scroll_into_view", frozenset({NOT_FOUND}), _scroll_into_view, max_seconds=8.0)
+WAIT_THEN_RETRY = Strategy("wait_then_retry", frozenset({NOT_FOUND, TIMEOUT}), _wait_then_retry, max_seconds=3.0)
+ENSURE_FOCUS = Strategy(
+    "ensure_focus_and_type", frozenset({NOT_FOUND, OTHER}), _ensure_focus_and_type, max_seconds=3.0,
+    applies=lambda ctx: ctx.function_name == "send_keys" and "ensure_focus_and_type" in ctx.available_functions,
+)
+CLICK_THEN_RETRY = Strategy("click_then_retry", frozenset({STALE, OTHER}), _click_then_retry, max_seconds=5.0)
+ALTERNATE_SELECTORS = Strategy(
+    "alternate_selectors", frozenset({NOT_FOUND}), _alternate_selectors, max_seconds=4.0,
+    applies=lambda ctx: bool(alternate_click_selectors(ctx.function_args.get("value", ""))),
+)
+BACK_OUT = Strategy(
+    "back_out", frozenset({NOT_FOUND}), _back_out_and_retry, max_seconds=6.0,
+    applies=lambda ctx: (ctx.function_args.get("value") or "").strip().lower()
+    in {"compose", "compose button", "compose new email"},
+)
+
+NO_RETRY = RetryPolicy()
+DEFAULT_POLICY = RetryPolicy((RECOVER_SESSION, RETRY_ANY))
+
+POLICIES: Dict[str, RetryPolicy] = {
+    # Assertions report what they see; retrying would hide a failure
+    "wait_for_element": NO_RETRY,
+    "wait_for_text_ocr": NO_RETRY,
+    "assert_activity": NO_RETRY,
+    "get_page_source": NO_RETRY,
+    "click": RetryPolicy((
+        RECOVER_SESSION, RETRY_ANY, SCROLL_INTO_VIEW, WAIT_THEN_RETRY, ALTERNATE_SELECTORS, BACK_OUT,
+    )),
+    "send_keys": RetryPolicy((RECOVER_SESSION, RETRY_AS_IS, SCROLL_INTO_VIEW, ENSURE_FOCUS, CLICK_THEN_RETRY)),
+    "ensure_focus_and_type": RetryPolicy((RECOVER_SESSION, RETRY_AS_IS, SCROLL_INTO_VIEW, CLICK_THEN_RETRY)),
+}
+
+
+def policy_for(function_name: str) -> RetryPolicy:
+    return POLICIES.get(function_name, DEFAULT_POLICY)
+
+
+def execute_with_policy(
+    function_name: str,
+    function_args: Dict[str, Any],
+    available_functions: Dict[str, Callable],
+    policy: Optional[RetryPolicy] = None,
+) -> Any:
+    """Call a tool and, if it fails, retry it according to its policy.
+
+    Args:
+        function_name: Tool to call
+        function_args: Arguments for the tool
+        available_functions: Tool name to callable
+        policy: Overrides the tool's registered policy
+
+    Returns:
+        The last result; failures after retrying carry result["retry"]
+    """
+    policy = policy or policy_for(function_name)
+    started = time.perf_counter()
+    round_trips_before = appium_tools.round_trip_mark()
+    result = available_functions[function_name](**function_args)
+    if is_success(result) or not policy.strategies:
+        return result
+
+    ctx = RetryContext(
+        function_name, function_args, available_functions,
+        deadline=time.perf_counter() + policy.budget_seconds,
+        round_trips_before=round_trips_before,
+    )
+    tried: List[Dict[str, Any]] = []
+    skipped: List[Dict[str, str]] = []
+    attempts = 1
+    for strategy in policy.strategies:
+        if is_success(result):
+            break
+        error_class = classify_error(result)
+        if error_class not in strategy.handles:
+            skipped.append({"strategy": strategy.name, "reason": f"does not handle {error_class}"})
+            continue
+        if strategy.applies is not None and not strategy.applies(ctx):
+            skipped.append({"strategy": strategy.name, "reason": "not applicable"})
+            continue
+        if ctx.remaining() < strategy.max_seconds + RETRY_SETTLE_SECONDS:
+            skipped.append({"strategy": strategy.name, "reason": "budget exhausted"})
+            step_timer.count("retry_budget_exhausted")
+            RETRY_STRATEGIES.labels(strategy.name, error_class, "skipped_budget").inc()
+            continue
+
+        print(f"  [RETRY] {strategy.name} for {function_name} ({error_class}, {ctx.remaining():.1f}s left)")
+        step_timer.count("tool_retries")
+        timed_sleep(RETRY_SETTLE_SECONDS)
+        strategy_started = time.perf_counter()
+        outcome = strategy.run(ctx)
+        if outcome is not None:
+            result = outcome
+            attempts += 1
+        succeeded = outcome is not None and is_success(outcome)
+        status = "success" if succeeded else ("prep_failed" if outcome is None else "failed")
+        tried.append({
+            "strategy": strategy.name,
+            "errorClass": error_class,
+            "outcome": status,
+            "ms": round((time.perf_counter() - strategy_started) * 1000.0, 1),
+        })
+        RETRY_STRATEGIES.labels(strategy.name, error_class, status).inc()
+
+    retry_info = {
+        "errorClass": classify_error(result) if not is_success(result) else None,
+        "tried": tried,
+        "skipped": skipped,
+        "elapsedMs": round((time.perf_counter() - started) * 1000.0, 1),
+        "budgetMs": round(policy.budget_seconds * 1000.0, 1),
+    }
+    if is_success(result):
+        if tried:
+            print(f"  [SUCCESS] {function_name} succeeded via {tried[-1]['strategy']}")
+            if isinstance(result, dict):
+                result["retry"] = retry_info
+        return result
+
+    print(f"  [FAILED] {function_name} failed after {attempts} attempts ({retry_info['errorClass']})")
+    failure_message = error_text(result)
+    if not isinstance(result, dict):
+        result = {"success": False, "error": failure_message}
+    result["success"] = False
+    result["error"] = result.get("error", failure_message)
+    if attempts > 1:
+        result["retryAttempts"] = attempts
+        result["failureReason"] = result.get("failureReason", f"Action failed after {attempts} attempts")
+    result["retry"] = retry_info
+    return result
+
+
+__all__ = [
+    "NOT_FOUND",
+    "OTHER",
+    "POLICIES",
+    "RETRY_BUDGET_SECONDS",
+    "SESSION_CRASH",
+    "STALE",
+    "TIMEOUT",
+    "RetryContext",
+    "RetryPolicy",
+    "Strategy",
+    "alternate_click_selectors",
+    "classify_error",
+    "execute_with_policy",
+    "is_success",
+    "policy_for",
+]
@@ -0,0 +1,235 @@
+"""
+Run Store Module
+
+SQLite-backed persistence for automation runs. Summary columns (status,
+timestamps, device, report) are indexed for listing; the full run payload
+(logs, screenshots, events) is kept as a JSON blob and only loaded on demand.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent
+RUNS_DB_PATH = Path(os.getenv("AUTOMATION_RUNS_DB", str(BASE_DIR / "runs.db")))
+# How long a writer waits for another connection's lock on runs.db
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("AUTOMATION_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    prompt TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    device_type TEXT,
+    report_path TEXT,
+    detail TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_created ON runs (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_status_created ON runs (status, created_at DESC, id DESC);
+"""
+
+_SUMMARY_COLUMNS = "id, prompt, status, created_at, updated_at, device_type, report_path"
+
+
+def connect(db_path: Path | str = RUNS_DB_PATH) -> sqlite3.Connection:
+    """Open a connection to runs.db (or another store file), shared across threads.
+
+    Several modules keep their own connection to the same file, so every one
+    uses WAL (readers never block the writer) and waits up to
+    SQLITE_BUSY_TIMEOUT_MS for a lock instead of failing at once.
+    """
+    db_path = Path(db_path)
+    if str(db_path) != ":memory:":
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=SQLITE_BUSY_TIMEOUT_MS / 1000.0, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class RunStoreError(ValueError):
+    """Raised for malformed queries (e.g. an invalid cursor)."""
+
+
+def encode_cursor(created_at: str, run_id: str) -> str:
+    raw = f"{created_at}|{run_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, run_id = raw.split("|", 1)
+    except Exception as exc:
+        raise RunStoreError("Invalid cursor") from exc
+    return created_at, run_id
+
+
+class RunStore:
+    """Persists run summaries and details in a single SQLite table."""
+
+    def __init__(self, db_path: Path | str = RUNS_DB_PATH) -> None:
+        self.db_path = Path(db_path)
+        # One shared connection; API handlers run in a threadpool so guard it.
+        self._conn = connect(self.db_path)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def save(self, summary: Dict[str, Any], detail: Dict[str, Any]) -> None:
+        """Insert or update a run.
+
+        Args:
+            summary: Indexed columns (id, prompt, status, created_at, updated_at,
+                device_type, report_path); timestamps as sortable ISO strings
+            detail: Full run payload, stored as JSON
+        """
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO runs ({_SUMMARY_COLUMNS}, detail) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    summary["id"],
+                    summary["prompt"],
+                    summary["status"],
+                    summary["created_at"],
+                    summary["updated_at"],
+                    summary.get("device_type"),
+                    summary.get("report_path"),
+                    json.dumps(detail, ensure_ascii=False, default=str),
+                ),
+            )
+            self._conn.commit()
+
+    def exists(self, run_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return row is not None
+
+    def load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Return the full stored payload for a run, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, detail FROM runs WHERE id = ?", (run_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            detail = json.loads(row["detail"])
+        except (TypeError, ValueError):
+            return None
+        # The status column is authoritative (see mark_interrupted)
+        detail["status"] = row["status"]
+        return detail
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """List run summaries newest first using keyset pagination.
+
+        Args:
+            status: Optional status filter
+            limit: Page size (clamped to MAX_PAGE_SIZE)
+            cursor: Opaque cursor returned by a previous call
+
+        Returns:
+            Tuple of (summary rows, next cursor or None)
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        clauses: List[str] = []
+        params: List[Any] = []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if cursor:
+            created_at, run_id = decode_cursor(cursor)
+            clauses.append("(created_at < ? OR (created_at = ? AND id < ?))")
+            params.extend([created_at, created_at, run_id])
+
+        sql = f"SELECT {_SUMMARY_COLUMNS} FROM runs"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        return rows, next_cursor
+
+    def mark_interrupted(self, statuses: Tuple[str, ...] = ("pending", "running")) -> int:
+        """Flag runs left active by a previous process as failed.
+
+        Returns:
+            Number of rows updated
+        """
+        placeholders = ", ".join("?" for _ in statuses)
+        with self._lock:
+            cur = self._conn.execute(
+                f"UPDATE runs SET status = 'failed' WHERE status IN ({placeholders})",
+                statuses,
+            )
+            self._conn.commit()
+        return cur.rowcount
+
+    def delete(self, run_id: str) -> bool:
+        """Remove a run; returns False if there was none."""
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+            self._conn.commit()
+        return cur.rowcount > 0
+
+    def prune(self, created_before: str, statuses: Tuple[str, ...] = ("completed", "failed", "cancelled")) -> List[str]:
+        """Delete finished runs created before a timestamp.
+
+        Args:
+            created_before: ISO timestamp in the created_at column format
+            statuses: Only runs in these statuses are deleted
+
+        Returns:
+            Ids of the deleted runs
+        """
+        placeholders = ", ".join("?" for _ in statuses)
+        where = f"created_at < ? AND status IN ({placeholders})"
+        with self._lock:
+            run_ids = [
+                row["id"] for row in self._conn.execute(f"SELECT id FROM runs WHERE {where}", (created_before, *statuses))
+            ]
+            self._conn.execute(f"DELETE FROM runs WHERE {where}", (created_before, *statuses))
+            self._conn.commit()
+        return run_ids
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+__all__ = [
+    "DEFAULT_PAGE_SIZE",
+    "MAX_PAGE_SIZE",
+    "RUNS_DB_PATH",
+    "RunStore",
+    "RunStoreError",
+    "SQLITE_BUSY_TIMEOUT_MS",
+    "connect",
+]
@@ -0,0 +1,140 @@
+"""
+Screen History Module
+
+Screen state in the conversation as references instead of text. Every page
+source the orchestrator shows the model is stored once as a snapshot, and
+the message carries a {"type": "screen", "snapshot_id", "label"} block in its
+content list. render_messages() turns those blocks into text only when a
+Bedrock request is assembled: the newest screen gets the full budget and each
+older one a smaller share, so the history is never searched for XML or
+rewritten in place. Renders are memoised per (snapshot, budget), and a
+snapshot's budget only changes when a newer screen arrives.
+"""
+from __future__ import annotations
+
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+# Each older screen is rendered at this fraction of the next newer one's budget
+SCREEN_BUDGET_DECAY = float(os.getenv("AUTOMATION_SCREEN_BUDGET_DECAY", "0.5"))
+# Floor so an old screen still shows its most important elements
+SCREEN_MIN_BUDGET = int(os.getenv("AUTOMATION_SCREEN_MIN_BUDGET", "2000"))
+# Snapshots kept for rendering (pruned messages stop referencing old ones)
+MAX_SNAPSHOTS = int(os.getenv("AUTOMATION_SCREEN_SNAPSHOTS", "64"))
+
+SCREEN_BLOCK_TYPE = "screen"
+
+
+def is_screen_block(block: Any) -> bool:
+    return isinstance(block, dict) and block.get("type") == SCREEN_BLOCK_TYPE
+
+
+class ScreenHistory:
+    """Page-source snapshots referenced from messages, rendered per request."""
+
+    def __init__(
+        self,
+        truncate: Callable[[str, int], str],
+        decay: float = SCREEN_BUDGET_DECAY,
+        min_budget: int = SCREEN_MIN_BUDGET,
+        max_snapshots: int = MAX_SNAPSHOTS,
+    ) -> None:
+        """Create an empty history.
+
+        Args:
+            truncate: (text, max_length) -> text cut to the budget (truncate_xml)
+            decay: Budget ratio between a screen and the next newer one
+            min_budget: Smallest budget any screen is rendered at
+            max_snapshots: Snapshots kept before the oldest are dropped
+        """
+        self._truncate = truncate
+        self.decay = decay
+        self.min_budget = min_budget
+        self.max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[int, str]" = OrderedDict()
+        self._renders: Dict[Tuple[int, int], str] = {}
+        self._next_id = 1
+
+    def add(self, text: str, label: str) -> Dict[str, Any]:
+        """Store a screen and return the content block referencing it.
+
+        Args:
+            text: Page source (compressed, or a diff) exactly as captured
+            label: Heading shown to the model, e.g. "XML Page Source (compressed)"
+        """
+        snapshot_id = self._next_id
+        self._next_id += 1
+        self._snapshots[snapshot_id] = text or ""
+        while len(self._snapshots) > self.max_snapshots:
+            dropped, _ = self._snapshots.popitem(last=False)
+            self._renders = {key: value for key, value in self._renders.items() if key[0] != dropped}
+        return {"type": SCREEN_BLOCK_TYPE, "snapshot_id": snapshot_id, "label": label}
+
+    def budget(self, age: int, newest_budget: int) -> int:
+        """Render budget of the screen age places behind the newest one."""
+        return max(min(self.min_budget, newest_budget), int(newest_budget * (self.decay ** age)))
+
+    def render(self, block: Dict[str, Any], budget: int) -> str:
+        """Text for one screen block at budget (memoised).
+
+        A smaller budget is cut from the closest larger render of the same
+        snapshot rather than from the full page source.
+        """
+        snapshot_id = block.get("snapshot_id")
+        label = block.get("label", "Screen")
+        body = self._renders.get((snapshot_id, budget))
+        if body is None:
+            text = self._snapshots.get(snapshot_id)
+            if text is None:
+                return f"[{label}]: (no longer available)"
+            larger = [key[1] for key in self._renders if key[0] == snapshot_id and key[1] > budget]
+            source = self._renders[(snapshot_id, min(larger))] if larger else text
+            body = self._truncate(source, budget)
+            self._renders[(snapshot_id, budget)] = body
+        return f"[{label}]:\n{body}"
+
+    def render_messages(self, messages: List[Dict[str, Any]], newest_budget: int) -> List[Dict[str, Any]]:
+        """Request-ready copy of messages with screen blocks rendered as text.
+
+        Screens are ranked by recency (a snapshot referenced twice keeps one
+        age); messages without screen blocks are passed through unchanged.
+
+        Args:
+            messages: Conversation holding screen blocks
+            newest_budget: Character budget of the most recent screen
+        """
+        ages: Dict[int, int] = {}
+        for message in reversed(messages):
+            content = message.get("content")
+            if not isinstance(content, list):
+                continue
+            for block in reversed(content):
+                if is_screen_block(block) and block.get("snapshot_id") not in ages:
+                    ages[block.get("snapshot_id")] = len(ages)
+
+        if not ages:
+            return messages
+        rendered_messages = []
+        for message in messages:
+            content = message.get("content")
+            if not isinstance(content, list) or not any(is_screen_block(block) for block in content):
+                rendered_messages.append(message)
+                continue
+            rendered_content = []
+            for block in content:
+                if is_screen_block(block):
+                    budget = self.budget(ages[block.get("snapshot_id")], newest_budget)
+                    block = {"type": "text", "text": self.render(block, budget)}
+                rendered_content.append(block)
+            rendered_messages.append({**message, "content": rendered_content})
+        return rendered_messages
+
+
+__all__ = [
+    "MAX_SNAPSHOTS",
+    "SCREEN_BUDGET_DECAY",
+    "SCREEN_MIN_BUDGET",
+    "ScreenHistory",
+    "is_screen_block",
+]
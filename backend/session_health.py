@@ -0,0 +1,217 @@
+"""
+Session Health Module
+
+Background monitor for the Appium session behind the MCP server. While the
+automation loop is idle (typically waiting on the LLM), a daemon thread sends
+a cheap heartbeat through the instrumentation server; when it reports that
+UiAutomator2/WDA died, a replacement session is built right away on a
+background thread. A tool call that then hits the crash only waits for that
+standby to finish (usually already done) instead of re-initializing inline.
+Tool requests are wrapped in in_flight(); no heartbeat is sent while one is
+running (a slow wait_for_element is not a dead session), and a heartbeat
+error that overlapped a tool request is left for that request to report.
+
+Appium cannot hold a second live session on the same device (a new session
+restarts the instrumentation server), so the warm standby is built the moment
+the crash is seen rather than kept alongside the active session.
+
+is_session_crashed_error() is the one place crash messages are recognised.
+"""
+from __future__ import annotations
+
+import contextlib
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from metrics import SESSION_FAILOVER_WAIT, SESSION_RECOVERIES
+
+# Heartbeat after this much MCP idle time (0 disables the monitor)
+SESSION_HEARTBEAT_SECONDS = float(os.getenv("AUTOMATION_SESSION_HEARTBEAT", "5"))
+SESSION_RECOVERY_TIMEOUT = float(os.getenv("AUTOMATION_SESSION_RECOVERY_TIMEOUT", "60"))
+
+SESSION_CRASH_PATTERN = re.compile(
+    r"instrumentation process is not running|cannot be proxied to uiautomator2|probably crashed"
+    r"|session.*crashed|instrumentation.*crashed|invalid session id|no such session"
+    r"|session is either terminated or not started",
+    re.IGNORECASE,
+)
+
+
+def is_session_crashed_error(error_msg: Any) -> bool:
+    """Check if an error message indicates the Appium session crashed."""
+    if not error_msg:
+        return False
+    return bool(SESSION_CRASH_PATTERN.search(str(error_msg)))
+
+
+class SessionMonitor:
+    """Heartbeat thread plus single-flight background session recovery."""
+
+    def __init__(self, interval: float = SESSION_HEARTBEAT_SECONDS) -> None:
+        self.interval = interval
+        self.session_id: Optional[str] = None
+        self._heartbeat: Optional[Callable[[], Optional[str]]] = None
+        self._reinitialize: Optional[Callable[[], Optional[str]]] = None
+        self._lock = threading.Lock()
+        self._healthy = threading.Event()
+        self._healthy.set()
+        self._recovering = False
+        self._last_recovery_ok = True
+        self._last_recovered_at = 0.0
+        self._last_activity = time.monotonic()
+        # Tool requests currently running / started so far
+        self._in_flight = 0
+        self._calls_started = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, Any] = {
+            "heartbeats": 0,
+            "heartbeats_skipped_busy": 0,
+            "crashes_detected_by_heartbeat": 0,
+            "crashes_reported_by_tools": 0,
+            "recoveries": 0,
+            "recovery_failures": 0,
+            "last_recovery_ms": None,
+        }
+
+    def start(
+        self,
+        session_id: Optional[str],
+        heartbeat: Callable[[], Optional[str]],
+        reinitialize: Callable[[], Optional[str]],
+    ) -> None:
+        """Start watching a session.
+
+        Args:
+            session_id: Current session (None if it was created elsewhere)
+            heartbeat: Returns None if the session answered, else the error text
+            reinitialize: Creates a new session and returns its id (None on failure)
+        """
+        self.session_id = session_id
+        self._heartbeat = heartbeat
+        self._reinitialize = reinitialize
+        self.touch()
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="session-health", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def touch(self) -> None:
+        """Note MCP traffic; heartbeats are only sent after interval of silence."""
+        self._last_activity = time.monotonic()
+
+    @contextlib.contextmanager
+    def in_flight(self) -> Iterator[None]:
+        """Mark a tool request as running for the duration of the block."""
+        with self._lock:
+            self._in_flight += 1
+            self._calls_started += 1
+        self.touch()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self.touch()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval / 2):
+            if self._recovering or self._heartbeat is None:
+                continue
+            with self._lock:
+                busy = self._in_flight > 0
+                calls_before = self._calls_started
+            if busy:
+                self.stats["heartbeats_skipped_busy"] += 1
+                continue
+            if time.monotonic() - self._last_activity < self.interval:
+                continue
+            error = self._heartbeat()
+            self.stats["heartbeats"] += 1
+            if error is None:
+                self.touch()
+                continue
+            with self._lock:
+                overlapped = self._in_flight > 0 or self._calls_started != calls_before
+            if overlapped:
+                # A tool request ran meanwhile; it reports a real crash itself
+                self.stats["heartbeats_skipped_busy"] += 1
+            elif is_session_crashed_error(error):
+                print(f"[WARN] Session heartbeat failed, preparing a standby session: {error}")
+                self.stats["crashes_detected_by_heartbeat"] += 1
+                self._start_recovery("heartbeat")
+
+    def _start_recovery(self, trigger: str) -> None:
+        with self._lock:
+            if self._recovering:
+                return
+            self._recovering = True
+            self._healthy.clear()
+        threading.Thread(target=self._recover, args=(trigger,), name="session-recovery", daemon=True).start()
+
+    def _recover(self, trigger: str) -> None:
+        started = time.perf_counter()
+        new_session_id = None
+        try:
+            if self._reinitialize is not None:
+                new_session_id = self._reinitialize()
+        except Exception as exc:
+            print(f"[WARN] Session recovery failed: {exc}")
+        elapsed_ms = round((time.perf_counter() - started) * 1000.0, 1)
+        outcome = "success" if new_session_id else "failed"
+        with self._lock:
+            if new_session_id:
+                self.session_id = new_session_id
+                self.stats["recoveries"] += 1
+                self._last_recovered_at = time.monotonic()
+            else:
+                self.stats["recovery_failures"] += 1
+            self.stats["last_recovery_ms"] = elapsed_ms
+            self._last_recovery_ok = bool(new_session_id)
+            self._recovering = False
+            self._healthy.set()
+        SESSION_RECOVERIES.labels(trigger, outcome).inc()
+        self.touch()
+        print(f"[INFO] Session recovery ({trigger}) {outcome} in {elapsed_ms}ms")
+
+    def recover(self, timeout: float = SESSION_RECOVERY_TIMEOUT) -> bool:
+        """Called when a tool call hit a crash: wait for a healthy session.
+
+        Joins a recovery already started by the heartbeat, or starts one.
+
+        Returns:
+            True if a working session is available
+        """
+        waited_from = time.perf_counter()
+        with self._lock:
+            recovering = self._recovering
+            recently_recovered = (
+                self._last_recovery_ok and time.monotonic() - self._last_recovered_at < max(self.interval, 1.0)
+            )
+        if not recovering and not recently_recovered:
+            self.stats["crashes_reported_by_tools"] += 1
+            self._start_recovery("tool_error")
+        if not self._healthy.wait(timeout):
+            print(f"[WARN] No healthy session after {timeout:.0f}s")
+            return False
+        SESSION_FAILOVER_WAIT.observe(time.perf_counter() - waited_from)
+        return self._last_recovery_ok
+
+
+session_monitor = SessionMonitor()
+
+
+__all__ = [
+    "SESSION_CRASH_PATTERN",
+    "SESSION_HEARTBEAT_SECONDS",
+    "SessionMonitor",
+    "is_session_crashed_error",
+    "session_monitor",
+]
@@ -0,0 +1,12 @@
+"""Backend tests import the modules the way main.py does: from backend/ directly."""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Keep run/report indexes out of backend/runs.db
+os.environ.setdefault("AUTOMATION_RUNS_DB", os.path.join(tempfile.mkdtemp(prefix="automation-tests-"), "runs.db"))
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
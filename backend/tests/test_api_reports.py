@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+api_server = pytest.importorskip("api_server")
+
+
+@pytest.fixture
+def reports_dir(tmp_path, monkeypatch):
+    reports = tmp_path / "reports"
+    reports.mkdir()
+    (reports / "test_report_1.json").write_text("{}", encoding="utf-8")
+    (tmp_path / "secret.json").write_text("{}", encoding="utf-8")
+    monkeypatch.setattr(api_server, "_reports_path", reports)
+    return reports
+
+
+def test_report_ids_resolve_inside_the_reports_directory(reports_dir):
+    assert api_server._report_json_path("test_report_1") == (reports_dir / "test_report_1.json").resolve()
+    for report_id in ("../secret", "../../x", "sub/../../secret", "/etc/passwd", "..", ".hidden", ""):
+        assert api_server._report_json_path(report_id) is None, report_id
+
+
+def test_indexed_paths_outside_the_reports_directory_are_rejected(reports_dir, monkeypatch):
+    outside = reports_dir.parent / "secret.json"
+    monkeypatch.setattr(api_server.report_index, "get", lambda report_id: {"id": report_id, "path": str(outside)})
+    assert api_server._report_json_path("test_report_1") is None
+
+
+def test_pdf_regeneration_does_not_read_outside_reports(reports_dir, monkeypatch):
+    rendered = []
+
+    async def regenerate(sources):
+        rendered.extend(sources)
+        return [None for _ in sources]
+
+    monkeypatch.setattr(api_server.pdf_service, "regenerate", regenerate)
+    payload = api_server.PdfRegenerateRequest(reportIds=["../secret", "test_report_1"])
+    result = asyncio.run(api_server.regenerate_report_pdfs(payload))
+
+    assert result["items"][0] == {"id": "../secret", "error": "Invalid report id"}
+    assert rendered == [(reports_dir / "test_report_1.json").resolve()]
@@ -0,0 +1,98 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from blob_store import BlobStore
+from report_index import ReportIndex
+from run_store import RunStore
+
+PNG = b"\x89PNG\r\n\x1a\nscreen"
+
+
+@pytest.fixture
+def store(tmp_path):
+    blobs = BlobStore(root=tmp_path / "blobs", db_path=tmp_path / "runs.db")
+    yield blobs
+    blobs.close()
+
+
+def _blob_path(store, blob):
+    return store.path_for(blob["digest"], ".png")
+
+
+def test_released_blob_is_collected(store):
+    blob = store.put_bytes(PNG, ".png", owner="run:a")
+    assert store.gc(grace_seconds=0)["deleted"] == 0
+
+    assert store.release("run:a") == 1
+    assert store.gc(grace_seconds=0)["deleted"] == 1
+    assert not _blob_path(store, blob).exists()
+
+
+def test_blob_shared_with_another_owner_survives_release(store):
+    blob = store.put_bytes(PNG, ".png", owner="run:a")
+    store.add_ref("report:test_report_1", blob["digest"])
+
+    store.release("run:a")
+    assert store.gc(grace_seconds=0)["deleted"] == 0
+    assert _blob_path(store, blob).exists()
+
+
+def _save_run(runs, run_id, created_at, status="completed"):
+    stamp = created_at.isoformat(timespec="microseconds")
+    runs.save(
+        {"id": run_id, "prompt": "p", "status": status, "created_at": stamp, "updated_at": stamp},
+        {"id": run_id},
+    )
+
+
+@pytest.fixture
+def manager(tmp_path, store, monkeypatch):
+    automation_manager = pytest.importorskip("automation_manager")
+    monkeypatch.setattr(automation_manager, "blob_store", store)
+    return automation_manager.AutomationManager(store=RunStore(tmp_path / "runs.db"))
+
+
+def test_deleting_a_run_releases_its_screenshots(manager, store):
+    _save_run(manager._store, "a", datetime.utcnow())
+    blob = store.put_bytes(PNG, ".png", owner="run:a")
+
+    assert manager.delete_run("a")
+    assert not manager.has_run("a")
+    assert store.gc(grace_seconds=0)["deleted"] == 1
+    assert not _blob_path(store, blob).exists()
+    assert not manager.delete_run("a")
+
+
+def test_retention_releases_only_expired_runs(manager, store):
+    _save_run(manager._store, "old", datetime.utcnow() - timedelta(days=10))
+    _save_run(manager._store, "old-running", datetime.utcnow() - timedelta(days=10), status="running")
+    _save_run(manager._store, "new", datetime.utcnow())
+    old = store.put_bytes(PNG, ".png", owner="run:old")
+    new = store.put_bytes(PNG + b"2", ".png", owner="run:new")
+
+    assert manager.prune_runs(retention_days=7) == 1
+    assert store.gc(grace_seconds=0)["deleted"] == 1
+    assert not _blob_path(store, old).exists()
+    assert _blob_path(store, new).exists()
+    assert manager.has_run("old-running")
+
+
+def test_removed_report_file_releases_its_screenshots(tmp_path, store, monkeypatch):
+    import report_index
+
+    monkeypatch.setattr(report_index, "blob_store", store)
+    reports = tmp_path / "reports"
+    reports.mkdir()
+    report = reports / "test_report_1.json"
+    report.write_text(json.dumps({"user_prompt": "p", "status": "completed", "steps": []}), encoding="utf-8")
+    blob = store.put_bytes(PNG, ".png", owner="report:test_report_1")
+    index = ReportIndex(tmp_path / "runs.db")
+    index.sync(reports)
+
+    os.unlink(report)
+    assert index.sync(reports)["removed"] == 1
+    assert store.gc(grace_seconds=0)["deleted"] == 1
+    assert not _blob_path(store, blob).exists()
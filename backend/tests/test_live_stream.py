@@ -0,0 +1,45 @@
+import asyncio
+import io
+
+import pytest
+
+from live_stream import LiveScreenStream, PngStreamParser, frame_hash
+
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+
+
+def _png(text="", compress_level=6):
+    img = Image.new("RGB", (1080, 2340), "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((40, 600, 1040, 720), outline="gray")
+    if text:
+        draw.text((60, 640), text, fill="black")
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", compress_level=compress_level)
+    return buffer.getvalue()
+
+
+def test_typed_text_is_a_new_frame():
+    stream = LiveScreenStream(serial=None)
+    assert asyncio.run(stream.publish(_png()))
+    assert asyncio.run(stream.publish(_png("b")))
+    assert asyncio.run(stream.publish(_png("bo")))
+    assert stream.frames_published == 3
+
+
+def test_same_pixels_are_skipped_even_when_encoded_differently():
+    assert frame_hash(_png("bob", compress_level=1)) == frame_hash(_png("bob", compress_level=9))
+
+    stream = LiveScreenStream(serial=None)
+    assert asyncio.run(stream.publish(_png("bob", compress_level=1)))
+    assert not asyncio.run(stream.publish(_png("bob", compress_level=9)))
+    assert stream.stats()["framesSkipped"] == 1
+
+
+def test_parser_splits_concatenated_frames_across_reads():
+    first, second = _png(), _png("x")
+    data = first + second
+    parser = PngStreamParser()
+    frames = parser.feed(data[:1000]) + parser.feed(data[1000:len(first) + 10]) + parser.feed(data[len(first) + 10:])
+    assert frames == [first, second]
@@ -0,0 +1,46 @@
+import sqlite3
+
+import pytest
+
+from locator_memory import LocatorMemory
+
+KEY = ("com.example", ".LoginActivity", "text", "Login")
+LEARNED = {"strategy": "id", "value": "com.example:id/login"}
+
+
+def test_learned_locator_round_trip(tmp_path):
+    memory = LocatorMemory(db_path=tmp_path / "state" / "runs.db")
+    memory.remember(KEY, LEARNED, cost=4)
+
+    assert memory.knows("text", "Login")
+    assert memory.lookup(KEY) == LEARNED
+    assert memory.record_hit(KEY, spent=1) == 3
+    memory.forget(KEY)
+    assert memory.lookup(KEY) is None
+
+
+def _locked(*args, **kwargs):
+    raise sqlite3.OperationalError("database is locked")
+
+
+@pytest.mark.parametrize("call", [
+    lambda memory: memory.lookup(KEY),
+    lambda memory: memory.remember(KEY, LEARNED, cost=4),
+    lambda memory: memory.record_hit(KEY, spent=1),
+    lambda memory: memory.forget(KEY),
+    lambda memory: memory.stats(),
+])
+def test_database_errors_switch_the_memory_off_instead_of_raising(tmp_path, monkeypatch, call):
+    memory = LocatorMemory(db_path=tmp_path / "runs.db")
+    monkeypatch.setattr(memory, "_connection", _locked)
+
+    call(memory)
+
+    assert not memory.enabled
+    assert memory.lookup(KEY) is None
+
+
+def test_connection_shares_the_run_store_setup(tmp_path):
+    conn = LocatorMemory(db_path=tmp_path / "missing" / "runs.db")._connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
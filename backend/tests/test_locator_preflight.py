@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+import appium_tools
+from locator_preflight import LocatorSnapshot
+
+SCREEN_WITHOUT_BUTTON = (
+    '<hierarchy><android.widget.FrameLayout>'
+    '<android.widget.TextView text="Loading" resource-id="app:id/status"/>'
+    '</android.widget.FrameLayout></hierarchy>'
+)
+SCREEN_WITH_BUTTON = (
+    '<hierarchy><android.widget.FrameLayout>'
+    '<android.widget.Button text="Continue" resource-id="app:id/continue_button"/>'
+    '</android.widget.FrameLayout></hierarchy>'
+)
+
+
+class _Response:
+    status_code = 200
+    headers = {"content-type": "application/json"}
+
+    def __init__(self, body):
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeMcp:
+    """Answers /tools/run like the MCP server; the button appears during a wait."""
+
+    def __init__(self):
+        self.calls = []
+        self.screen = SCREEN_WITHOUT_BUTTON
+
+    def post(self, url, json=None, **kwargs):
+        tool = (json or {}).get("tool") or url.rsplit("/", 1)[-1]
+        self.calls.append(tool)
+        if tool == "get_page_source":
+            return _Response({"success": True, "value": self.screen})
+        if tool == "wait_for_element":
+            self.screen = SCREEN_WITH_BUTTON
+            return _Response({"success": True})
+        return _Response({"success": True})
+
+
+@pytest.fixture
+def mcp(monkeypatch):
+    fake = FakeMcp()
+    monkeypatch.setattr(appium_tools.requests, "post", fake.post)
+    monkeypatch.setattr(appium_tools, "locator_snapshot", LocatorSnapshot(enabled=True))
+    monkeypatch.setattr(appium_tools.locator_memory, "knows", lambda strategy, value: False)
+    return fake
+
+
+def test_wait_drops_the_snapshot_so_click_reaches_the_device(mcp):
+    appium_tools.get_page_source()
+    appium_tools.wait_for_element("text", "Continue", timeoutMs=1000)
+
+    result = appium_tools.click("text", "Continue")
+
+    assert mcp.calls[-1] == "click"
+    assert isinstance(result, dict) and result["success"]
+
+
+def test_missing_element_fails_fast_on_a_fresh_snapshot(mcp):
+    appium_tools.get_page_source()
+
+    result = appium_tools.click("text", "Continue")
+
+    assert "click" not in mcp.calls
+    assert "not found in the current screen" in result
+
+
+def test_missing_element_is_sent_when_the_snapshot_is_not_fresh(mcp, monkeypatch):
+    appium_tools.get_page_source()
+    captured = appium_tools.locator_snapshot._captured_at
+    monkeypatch.setattr(time, "monotonic", lambda: captured + appium_tools.locator_snapshot.fast_fail_seconds + 1)
+
+    appium_tools.click("text", "Continue")
+
+    assert mcp.calls[-1] == "click"
+
+
+def test_disabled_by_default():
+    assert LocatorSnapshot().enabled is False
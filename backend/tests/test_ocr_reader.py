@@ -0,0 +1,98 @@
+from ocr_reader import OcrReader, present_terms
+
+LOGIN_SCREEN = b"\x89PNG login screen"
+PRODUCTS_SCREEN = b"\x89PNG products screen"
+
+OCR_RESULTS = {
+    LOGIN_SCREEN: {
+        "text": ["Username", "Password", "LOGIN"],
+        "boundingBoxes": [{"text": "LOGIN", "x": 100, "y": 900, "width": 200, "height": 60, "confidence": 0.97}],
+        "confidence": 0.95,
+    },
+    PRODUCTS_SCREEN: {
+        "text": ["PRODUCTS", "Sauce Labs Backpack", "ADD TO CART"],
+        "boundingBoxes": [],
+        "confidence": 0.9,
+    },
+}
+
+
+class FakeOcrBackend:
+    """Serves canned frames and counts captures and OCR calls."""
+
+    def __init__(self, frame=LOGIN_SCREEN):
+        self.frame = frame
+        self.captures = 0
+        self.ocr_calls = 0
+
+    def capture(self, session_id):
+        self.captures += 1
+        return self.frame
+
+    def extract(self, image, session_id):
+        self.ocr_calls += 1
+        return OCR_RESULTS.get(image)
+
+
+def _reader(backend):
+    return OcrReader(capture=backend.capture, extract=backend.extract)
+
+
+def test_many_terms_are_answered_from_one_ocr_call():
+    backend = FakeOcrBackend()
+    found = _reader(backend).find_texts(["login", "PASSWORD", "Cart", "Products"])
+
+    assert backend.ocr_calls == 1
+    assert present_terms(found) == ["login", "PASSWORD"]
+    assert found["login"]["center"] == {"x": 200, "y": 930}
+    assert found["PASSWORD"] == {"text": "Password"}
+    assert found["Cart"] is None
+
+
+def test_unchanged_screen_is_not_ocrd_again():
+    backend = FakeOcrBackend()
+    reader = _reader(backend)
+    for _ in range(5):
+        reader.find_texts(["LOGIN"])
+
+    assert backend.captures == 5
+    assert backend.ocr_calls == 1
+    assert reader.stats["cache_hits"] == 4
+
+
+def test_new_screen_is_ocrd_once_and_old_one_stays_cached():
+    backend = FakeOcrBackend()
+    reader = _reader(backend)
+    reader.find_texts(["LOGIN"])
+    backend.frame = PRODUCTS_SCREEN
+    assert present_terms(reader.find_texts(["backpack", "LOGIN"])) == ["backpack"]
+    assert present_terms(reader.find_texts(["add to cart"])) == ["add to cart"]
+    backend.frame = LOGIN_SCREEN
+    reader.find_texts(["LOGIN"])
+
+    assert backend.ocr_calls == 2
+
+
+def test_cache_is_bounded():
+    backend = FakeOcrBackend()
+    reader = OcrReader(capture=backend.capture, extract=lambda image, session_id: {"text": [image.decode()]}, cache_size=2)
+    for frame in (b"a", b"b", b"c", b"a"):
+        backend.frame = frame
+        reader.read()
+    assert reader.stats["ocr_calls"] == 4
+
+
+def test_failed_read_is_not_cached_and_wait_stops_early():
+    backend = FakeOcrBackend(frame=b"\x89PNG unknown")
+    reader = _reader(backend)
+    assert reader.find_texts(["LOGIN"]) is None
+    assert reader.wait_for_texts(["LOGIN"], timeout_seconds=30) is None
+    assert backend.ocr_calls == 2
+
+
+def test_wait_returns_once_all_terms_appear():
+    backend = FakeOcrBackend(frame=PRODUCTS_SCREEN)
+    reader = _reader(backend)
+    found = reader.wait_for_texts(["PRODUCTS", "ADD TO CART"], timeout_seconds=5, require_all=True)
+    assert present_terms(found) == ["PRODUCTS", "ADD TO CART"]
+    assert backend.ocr_calls == 1
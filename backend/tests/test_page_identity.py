@@ -0,0 +1,17 @@
+from page_identity import PageIdentityCache
+
+DETECTION = {"page_name": "Login", "identifier": "login_button", "method": "xml"}
+
+
+def test_cache_creates_its_database_directory(tmp_path):
+    cache = PageIdentityCache(db_path=tmp_path / "missing" / "runs.db")
+    cache.put("com.example", "fp", DETECTION, app_version="1.0")
+
+    assert cache.get("com.example", "fp", app_version="1.0") == DETECTION
+    assert cache.get("com.example", "fp", app_version="2.0") is None
+
+
+def test_connection_shares_the_run_store_setup(tmp_path):
+    conn = PageIdentityCache(db_path=tmp_path / "runs.db")._connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
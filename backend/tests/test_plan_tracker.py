@@ -0,0 +1,66 @@
+import ast
+
+from conftest import BACKEND_DIR
+from plan_tracker import PlanTracker, is_completion_page
+
+
+def _step(description, status="PASSED"):
+    return {"description": description, "status": status}
+
+
+def test_one_word_plan_item_needs_a_matching_step():
+    tracker = PlanTracker()
+    tracker.set_plan([{"name": "Login"}])
+    assert not tracker.all_executed
+
+    tracker.observe("Open the menu")
+    assert not tracker.all_executed
+
+    tracker.observe("Tap Login button")
+    assert tracker.all_executed
+
+
+def test_plan_is_not_done_before_enough_steps_ran():
+    tracker = PlanTracker()
+    tracker.set_plan([{"name": "Enter username"}, {"name": "Enter password"}, {"name": "Tap login"}])
+    tracker.observe("Enter username and password then tap login")
+    assert tracker.all_executed
+    assert not tracker.all_executed_and_counted
+
+    tracker.observe("Enter password")
+    tracker.observe("Tap login")
+    assert tracker.all_executed_and_counted
+
+
+def test_set_plan_counts_steps_already_in_the_report():
+    tracker = PlanTracker()
+    tracker.set_plan(
+        [{"name": "Enter username"}, {"name": "Tap login"}],
+        [_step("Enter username"), _step("", status="SKIPPED"), _step("Tap login")],
+    )
+    assert tracker.executed == 2
+    assert tracker.all_executed_and_counted
+
+
+def test_completion_page_matches_whole_words_only():
+    assert is_completion_page('<TextView text="THANK YOU FOR YOUR ORDER"/>')
+    assert is_completion_page('<TextView text="Checkout: Complete!"/>')
+    assert not is_completion_page('<TextView text="Items ordered: 3"/>')
+    assert not is_completion_page('<TextView text="Profile completeness 80%"/>')
+    assert not is_completion_page("")
+
+
+def test_main_does_not_shadow_is_completion_page():
+    """A local assignment would make every call in main() raise UnboundLocalError."""
+    tree = ast.parse((BACKEND_DIR / "main.py").read_text(encoding="utf-8"))
+    main_function = next(node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name == "main")
+    assigned = {
+        node.id for node in ast.walk(main_function)
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del))
+    }
+    called = {
+        node.func.id for node in ast.walk(main_function)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+    }
+    assert "is_completion_page" in called
+    assert "is_completion_page" not in assigned
@@ -0,0 +1,64 @@
+"""Crash consistency: SIGKILL a process mid-run and check what it left on disk."""
+import json
+import signal
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from conftest import BACKEND_DIR
+from report_index import REPORT_FILE_GLOB
+from reports import JOURNAL_SUFFIX, recover_orphaned_journals
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="needs SIGKILL")
+
+WRITER = textwrap.dedent("""
+    import sys
+    from reports import TestReport
+
+    report = TestReport("crash me", reports_dir=sys.argv[1])
+    number = 0
+    while True:
+        report.add_step("click", {"value": "x" * 2000}, {"success": True}, True, description=f"Step {number}")
+        # Same cadence main.py uses, but every step, to keep snapshots in flight
+        report.save()
+        number += 1
+        if number % 50 == 0:
+            report.flush()
+            print(number, flush=True)
+""")
+
+
+@pytest.mark.parametrize("background", ["1", "0"])
+def test_killed_run_leaves_a_readable_report_or_journal(tmp_path, background):
+    process = subprocess.Popen(
+        [sys.executable, "-c", WRITER, str(tmp_path)],
+        cwd=str(BACKEND_DIR),
+        env={"PYTHONPATH": str(BACKEND_DIR), "REPORT_BACKGROUND_WRITER": background, "PATH": ""},
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        # Wait until some steps are known to be durable, then kill mid-write
+        durable = int(process.stdout.readline())
+        time.sleep(0.05)
+    finally:
+        process.send_signal(signal.SIGKILL)
+        process.wait()
+
+    # A snapshot, if any, is complete (written to a temp file and renamed)
+    for path in tmp_path.glob(REPORT_FILE_GLOB):
+        snapshot = json.loads(path.read_text(encoding="utf-8"))
+        assert snapshot["status"] == "in_progress"
+
+    journals = list(tmp_path.glob(f"*{JOURNAL_SUFFIX}"))
+    assert len(journals) == 1
+    recovered = recover_orphaned_journals(tmp_path)
+    assert len(recovered) == 1
+    report = json.loads(recovered[0].read_text(encoding="utf-8"))
+    descriptions = [step["description"] for step in report["steps"]]
+    assert len(descriptions) >= durable
+    assert descriptions == [f"Step {number}" for number in range(len(descriptions))]
+    assert report["total_steps"] == len(descriptions)
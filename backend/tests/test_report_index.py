@@ -0,0 +1,26 @@
+from report_index import ReportIndex
+
+
+def test_database_is_opened_on_first_use(tmp_path):
+    db_path = tmp_path / "state" / "nested" / "runs.db"
+    index = ReportIndex(db_path)
+    assert not db_path.exists()
+
+    index.add({"id": "test_report_1", "path": "reports/test_report_1.json"}, run_id="run-1")
+
+    assert db_path.exists()
+    assert index.for_run("run-1")["id"] == "test_report_1"
+
+
+def test_connection_uses_wal_and_a_busy_timeout(tmp_path):
+    index = ReportIndex(tmp_path / "runs.db")
+    assert index._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert index._conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+
+
+def test_entries_are_reloaded_lazily(tmp_path):
+    ReportIndex(tmp_path / "runs.db").add({"id": "test_report_1"}, run_id="run-1")
+
+    reopened = ReportIndex(tmp_path / "runs.db")
+    assert reopened.get("test_report_1")["runId"] == "run-1"
+    assert [entry["id"] for entry in reopened.all()] == ["test_report_1"]
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import os
+import textwrap
+import time
+
+import automation_runner
+from conftest import BACKEND_DIR
+from report_index import REPORT_FILE_GLOB
+import reports
+from reports import JOURNAL_SUFFIX, recover_orphaned_journals
+
+
+def _crashed_report(reports_dir, steps=3):
+    """A report whose run stopped after journaling steps, without finalize()."""
+    report = reports.TestReport("log in", reports_dir=str(reports_dir))
+    for number in range(steps):
+        report.add_step("click", {"value": f"b{number}"}, {"success": True}, True, description=f"Step {number}")
+    report.flush()
+    return report
+
+
+def test_orphaned_journal_is_compacted_into_an_indexable_report(tmp_path):
+    report = _crashed_report(tmp_path)
+    journal = report.journal_path
+    assert journal.exists()
+    assert not list(tmp_path.glob(REPORT_FILE_GLOB))
+
+    recovered = recover_orphaned_journals(tmp_path)
+
+    assert recovered == [journal.with_name(journal.name[:-len(JOURNAL_SUFFIX)] + ".json")]
+    assert list(tmp_path.glob(REPORT_FILE_GLOB)) == recovered
+    data = json.loads(recovered[0].read_text(encoding="utf-8"))
+    assert data["status"] == "interrupted"
+    assert data["user_prompt"] == "log in"
+    assert [step["description"] for step in data["steps"]] == ["Step 0", "Step 1", "Step 2"]
+    assert not journal.exists()
+
+
+def test_recovery_respects_time_bounds(tmp_path):
+    journal = _crashed_report(tmp_path).journal_path
+    old = time.time() - 3600
+    os.utime(journal, (old, old))
+
+    assert recover_orphaned_journals(tmp_path, modified_since=time.time() - 60) == []
+    assert recover_orphaned_journals(tmp_path, modified_before=old) == []
+    assert journal.exists()
+    assert len(recover_orphaned_journals(tmp_path, modified_before=time.time())) == 1
+
+
+def test_runner_recovers_the_report_of_a_crashed_run(tmp_path, monkeypatch):
+    fake_base = tmp_path / "backend"
+    reports_dir = tmp_path / "reports"
+    fake_base.mkdir()
+    (fake_base / "main.py").write_text(textwrap.dedent(f"""
+        import os
+        from reports import TestReport
+        report = TestReport("checkout", reports_dir={str(reports_dir)!r})
+        report.add_step("click", {{"value": "Add"}}, {{"success": True}}, True, description="Add to cart")
+        report.flush()
+        os._exit(1)
+    """), encoding="utf-8")
+    monkeypatch.setattr(automation_runner, "BASE_DIR", fake_base)
+    events = []
+
+    async def run():
+        runner = automation_runner.AutomationRunner(reports_dir=reports_dir)
+        try:
+            await runner.run("checkout", events.append, env_overrides={"PYTHONPATH": str(BACKEND_DIR)})
+        except automation_runner.AutomationRunnerError:
+            return
+        raise AssertionError("crashed run did not raise")
+
+    asyncio.run(run())
+
+    emitted = [event["report"] for event in events if event.get("type") == "report"]
+    assert len(emitted) == 1
+    assert emitted[0]["status"] == "interrupted"
+    data = json.loads(open(emitted[0]["path"], encoding="utf-8").read())
+    assert [step["description"] for step in data["steps"]] == ["Add to cart"]
+    assert not list(reports_dir.glob(f"*{JOURNAL_SUFFIX}"))
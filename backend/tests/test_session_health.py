@@ -0,0 +1,67 @@
+import threading
+import time
+
+from session_health import SessionMonitor
+
+CRASH = "instrumentation process is not running (probably crashed)"
+
+
+def _monitor(heartbeat, interval=0.05):
+    recoveries = []
+
+    def reinitialize():
+        recoveries.append(time.monotonic())
+        return "new-session"
+
+    monitor = SessionMonitor(interval=interval)
+    monitor.start("session", heartbeat, reinitialize)
+    return monitor, recoveries
+
+
+def test_no_heartbeat_while_a_tool_call_is_in_flight():
+    heartbeats = []
+    monitor, recoveries = _monitor(lambda: heartbeats.append(1) or CRASH)
+    try:
+        with monitor.in_flight():
+            time.sleep(0.5)
+            assert heartbeats == []
+        assert monitor.stats["heartbeats_skipped_busy"] > 0
+        assert recoveries == []
+    finally:
+        monitor.stop()
+
+
+def test_heartbeat_error_overlapping_a_tool_call_does_not_recover():
+    call_started = threading.Event()
+    release_heartbeat = threading.Event()
+
+    def slow_heartbeat():
+        call_started.wait(1)
+        release_heartbeat.wait(1)
+        return CRASH
+
+    monitor, recoveries = _monitor(slow_heartbeat)
+    try:
+        time.sleep(0.1)  # heartbeat is now waiting inside slow_heartbeat
+        with monitor.in_flight():
+            call_started.set()
+            release_heartbeat.set()
+            time.sleep(0.1)
+        monitor.stop()
+        time.sleep(0.1)
+        assert recoveries == []
+    finally:
+        monitor.stop()
+
+
+def test_idle_crash_is_recovered_in_the_background():
+    monitor, recoveries = _monitor(lambda: CRASH)
+    try:
+        deadline = time.monotonic() + 2
+        while not recoveries and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert recoveries
+        assert monitor.recover(timeout=2)
+        assert monitor.session_id == "new-session"
+    finally:
+        monitor.stop()
@@ -0,0 +1,62 @@
+import ast
+import time
+
+from conftest import BACKEND_DIR
+from timing import StepTimer, timed_sleep
+
+
+def _main_function():
+    tree = ast.parse((BACKEND_DIR / "main.py").read_text(encoding="utf-8"))
+    return next(node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name == "main")
+
+
+def _calls(node, attribute):
+    return [
+        call for call in ast.walk(node)
+        if isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute) and call.func.attr == attribute
+    ]
+
+
+def test_post_action_screenshot_is_taken_before_the_step_is_recorded():
+    """add_step() closes the step interval; later work would land in the next step."""
+    main_function = _main_function()
+    record = next(
+        call for call in _calls(main_function, "add_step")
+        if any(isinstance(arg, ast.Name) and arg.id == "is_assertion" for arg in call.args)
+    )
+    (capture,) = _calls(main_function, "capture_screenshot")
+    assert capture.lineno < record.lineno
+
+
+def test_capture_and_blob_write_are_charged_to_the_screenshot_phase():
+    main_function = _main_function()
+    screenshot_spans = [
+        node for node in ast.walk(main_function)
+        if isinstance(node, ast.With) and any(
+            isinstance(item.context_expr, ast.Call)
+            and item.context_expr.args
+            and isinstance(item.context_expr.args[0], ast.Constant)
+            and item.context_expr.args[0].value == "screenshot"
+            for item in node.items
+        )
+    ]
+    covered = {call.func.attr for span in screenshot_spans for call in _calls(span, "capture_screenshot") + _calls(span, "put_bytes")}
+    assert covered == {"capture_screenshot", "put_bytes"}
+
+
+def test_work_before_end_step_is_charged_to_that_step(monkeypatch):
+    timer = StepTimer(enabled=True)
+    monkeypatch.setattr("timing.step_timer", timer)
+    with timer.span("mcp_http"):
+        time.sleep(0.01)
+    timed_sleep(0.05)
+    with timer.span("screenshot"):
+        time.sleep(0.02)
+
+    step = timer.end_step()
+    following = timer.end_step()
+
+    assert step["phases"]["sleep"] >= 50
+    assert step["phases"]["screenshot"] >= 20
+    assert "sleep" not in following["phases"]
+    assert "screenshot" not in following["phases"]
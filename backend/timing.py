@@ -0,0 +1,207 @@
+"""
+Timing Module
+
+Span timers for the automation loop. Work is wrapped in
+`with step_timer.span("llm"):` (or a function decorated with @timed); time is
+charged to the innermost open span only, so nested phases never count twice.
+TestReport.add_step() closes the interval since the previous step and stores
+its per-phase breakdown on the step; finalize() adds run-level totals and
+percentiles.
+
+Phases used by the backend: llm, mcp_http, page_source, screenshot, ocr,
+preflight, xml_compress, sleep, report_save and tool (retry/fallback logic around tool
+calls). Time outside any span shows up as "other".
+
+With AUTOMATION_TIMING=0, span() returns a shared no-op context manager and
+@timed leaves functions undecorated.
+"""
+from __future__ import annotations
+
+import functools
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+TIMING_ENABLED = os.getenv("AUTOMATION_TIMING", "true").lower() in ("1", "true", "yes")
+PERCENTILES = (50, 90, 99)
+
+_perf_counter = time.perf_counter
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_timer", "_phase", "_started", "_children")
+
+    def __init__(self, timer: "StepTimer", phase: str) -> None:
+        self._timer = timer
+        self._phase = phase
+
+    def __enter__(self) -> "_Span":
+        self._children = 0.0
+        self._timer._stack().append(self)
+        self._started = _perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        elapsed = _perf_counter() - self._started
+        stack = self._timer._stack()
+        stack.pop()
+        if stack:
+            stack[-1]._children += elapsed
+        self._timer._charge(self._phase, elapsed - self._children)
+        return False
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class StepTimer:
+    """Accumulates phase self-times per step interval and per run."""
+
+    def __init__(self, enabled: bool = TIMING_ENABLED) -> None:
+        self.enabled = enabled
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a new run (called when a TestReport is created)."""
+        with self._lock:
+            self._phases: Dict[str, float] = {}
+            self._counts: Dict[str, int] = {}
+            self._interval_started = _perf_counter()
+            self._step_phases: Dict[str, List[float]] = {}
+            self._step_durations: List[float] = []
+            self._run_counts: Dict[str, int] = {}
+
+    def _stack(self) -> List[_Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _charge(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self._phases[phase] = self._phases.get(phase, 0.0) + seconds
+
+    def span(self, phase: str):
+        """Context manager charging its self time to phase."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, phase)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Count an event (e.g. a retry) in the current step interval."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def end_step(self) -> Optional[Dict[str, Any]]:
+        """Close the interval since the previous step.
+
+        Returns:
+            {"duration_ms", "phases": {phase: ms}, "counts"} for the step, or
+            None when timing is disabled
+        """
+        if not self.enabled:
+            return None
+        now = _perf_counter()
+        with self._lock:
+            duration = now - self._interval_started
+            phases, counts = self._phases, self._counts
+            self._phases, self._counts = {}, {}
+            self._interval_started = now
+            attributed = sum(phases.values())
+            if duration - attributed > 0:
+                phases["other"] = duration - attributed
+            for phase, seconds in phases.items():
+                self._step_phases.setdefault(phase, []).append(seconds * 1000.0)
+            for name, amount in counts.items():
+                self._run_counts[name] = self._run_counts.get(name, 0) + amount
+            self._step_durations.append(duration * 1000.0)
+        breakdown: Dict[str, Any] = {
+            "duration_ms": round(duration * 1000.0, 1),
+            "phases": {phase: round(seconds * 1000.0, 1) for phase, seconds in phases.items()},
+        }
+        if counts:
+            breakdown["counts"] = counts
+        return breakdown
+
+    def summary(self) -> Optional[Dict[str, Any]]:
+        """Run-level totals and percentiles over the recorded steps."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            step_phases = {phase: sorted(values) for phase, values in self._step_phases.items()}
+            durations = sorted(self._step_durations)
+            counts = dict(self._run_counts)
+
+        def _stats(values: List[float]) -> Dict[str, float]:
+            stats = {"total_ms": round(sum(values), 1), "steps": len(values)}
+            for pct in PERCENTILES:
+                stats[f"p{pct}_ms"] = round(percentile(values, pct), 1)
+            stats["max_ms"] = round(values[-1], 1) if values else 0.0
+            return stats
+
+        phases = {phase: _stats(values) for phase, values in step_phases.items()}
+        total = sum(durations)
+        for stats in phases.values():
+            stats["share"] = round(stats["total_ms"] / total, 4) if total else 0.0
+        return {
+            "step_duration": _stats(durations),
+            "phases": dict(sorted(phases.items(), key=lambda item: -item[1]["total_ms"])),
+            "counts": counts,
+        }
+
+
+step_timer = StepTimer()
+
+
+def timed(phase: str) -> Callable[[Callable], Callable]:
+    """Decorator charging a function's self time to phase."""
+    def decorator(func: Callable) -> Callable:
+        if not step_timer.enabled:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with step_timer.span(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_sleep(seconds: float) -> None:
+    """time.sleep() charged to the "sleep" phase."""
+    with step_timer.span("sleep"):
+        time.sleep(seconds)
+
+
+__all__ = [
+    "TIMING_ENABLED",
+    "StepTimer",
+    "percentile",
+    "step_timer",
+    "timed",
+    "timed_sleep",
+]
@@ -27,6 +27,19 @@ export interface AutomationRun {
   }>;
 }
 
+export type AutomationRunSummary = Omit<AutomationRun, "logs" | "screenshots">;
+
+export interface AutomationRunPage {
+  items: AutomationRunSummary[];
+  nextCursor?: string | null;
+}
+
+export interface ListRunsParams {
+  status?: AutomationRun["status"];
+  limit?: number;
+  cursor?: string;
+}
+
 export interface CreateRunPayload {
   prompt: string;
 }
@@ -44,6 +57,7 @@ export interface ScreenshotEntry {
   url: string;
   timestamp: string;
   step?: string | null;
+  digest?: string | null;
 }
 
 export interface ReportEntry {
@@ -120,16 +134,22 @@ export async function checkBackendHealth(
 }
 
 export async function listAutomationRuns(
+  params: ListRunsParams = {},
   signal?: AbortSignal
-): Promise<AutomationRun[]> {
-  const response = await fetch(`${apiBase}/api/runs`, { signal });
+): Promise<AutomationRunPage> {
+  const query = new URLSearchParams();
+  if (params.status) query.set("status", params.status);
+  if (params.limit) query.set("limit", String(params.limit));
+  if (params.cursor) query.set("cursor", params.cursor);
+  const suffix = query.toString() ? `?${query.toString()}` : "";
+  const response = await fetch(`${apiBase}/api/runs${suffix}`, { signal });
   if (!response.ok) {
     const message = await response.text();
     throw new Error(
       `Failed to list automation runs: ${response.status} ${message}`
     );
   }
-  return (await response.json()) as AutomationRun[];
+  return (await response.json()) as AutomationRunPage;
 }
 
 export async function getRunScreenshots(
@@ -182,6 +202,25 @@ export async function getRunReport(
   return data as ReportEntry | null;
 }
 
+export function getRunReportPdfUrl(runId: string): string {
+  return `${apiBase}/api/runs/${runId}/report.pdf`;
+}
+
+export async function downloadRunReportPdf(
+  runId: string,
+  signal?: AbortSignal
+): Promise<Blob> {
+  // Rendered on first request, then served from the backend's PDF cache
+  const response = await fetch(getRunReportPdfUrl(runId), { signal });
+  if (!response.ok) {
+    const message = await response.text();
+    throw new Error(
+      `Failed to download report PDF: ${response.status} ${message}`
+    );
+  }
+  return await response.blob();
+}
+
 export async function downloadReport(
   reportPath: string,
   signal?: AbortSignal
@@ -13,6 +13,8 @@ import {
   checkBackendHealth,
   getRunReport,
   downloadReport,
+  downloadRunReportPdf,
+  getRunReportPdfUrl,
   getApiBase,
   getDeviceInfo,
   cancelAutomationRun,
@@ -36,6 +38,7 @@ interface Report {
   status: "success" | "failed";
   path?: string;
   pdfPath?: string;
+  runId?: string;
 }
 
 interface Screenshot {
@@ -199,6 +202,13 @@ const Dashboard = () => {
 
       // First, try to find the report in the reports list
       const report = reports.find((r) => r.id === id);
+
+      // Reports from a run have an on-demand PDF endpoint
+      if (report?.runId) {
+        window.open(getRunReportPdfUrl(report.runId), "_blank");
+        toast.success("Opening PDF report...");
+        return;
+      }
       
       // Prioritize PDF if available
       if (report?.pdfPath) {
@@ -291,6 +301,21 @@ const Dashboard = () => {
         return;
       }
 
+      if (report.runId) {
+        const blob = await downloadRunReportPdf(report.runId);
+        const url = window.URL.createObjectURL(blob);
+        const link = document.createElement("a");
+        link.href = url;
+        const baseName = (report.name || `report_${id}`).replace(/\.json$/i, "");
+        link.download = `${baseName}.pdf`;
+        document.body.appendChild(link);
+        link.click();
+        document.body.removeChild(link);
+        window.URL.revokeObjectURL(url);
+        toast.success("Report downloaded successfully! (PDF format)");
+        return;
+      }
+
       let reportFileName: string | null = null;
       let isPdf = false;
 
@@ -516,6 +541,7 @@ const Dashboard = () => {
               ("success" as Report["status"]),
             path: reportPayload.path ?? undefined,
             pdfPath: reportPayload.pdfPath ?? undefined,
+            runId: payload.runId ?? undefined,
           };
           setReports((prev) => {
             const filtered = prev.filter((item) => item.id !== hydratedReport.id);